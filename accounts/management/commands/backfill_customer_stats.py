@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts.stats import backfill
+
+
+class Command(BaseCommand):
+    help = 'Recompute the CustomerStats row of every user from their orders and wishlist.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Users recomputed per transaction.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for written in backfill(chunk_size=options['chunk_size']):
+            total += written
+            self.stdout.write(f'Refreshed {total} customers so far...')
+        self.stdout.write(self.style.SUCCESS(f'Refreshed stats for {total} customers.'))
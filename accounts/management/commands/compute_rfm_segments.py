@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts.segments import CHUNK_SIZE, compute_segments
+
+
+class Command(BaseCommand):
+    help = 'Recompute the RFM segment of every customer with a paid order.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Customers read and written per batch.')
+
+    def handle(self, *args, **options):
+        counts = compute_segments(chunk_size=options['chunk_size'])
+        for segment, count in sorted(counts.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'{segment:>12}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Segmented {sum(counts.values())} customers.'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+
+from accounts.models import CustomerSegment
+from accounts.segments import SEND_BATCH, newsletter_audience, send_newsletter
+
+SEGMENTS = [value for value, _ in CustomerSegment.SEGMENT_CHOICES] + ['prospect']
+
+
+class Command(BaseCommand):
+    help = 'E-mail a newsletter to the opted-in customers of the given RFM segments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('template', help='E-mail template under templates/emails/, without extension.')
+        parser.add_argument('--subject', required=True, help='Subject line of the e-mail.')
+        parser.add_argument('--segment', action='append', choices=SEGMENTS, required=True, dest='segments',
+                            help='Segment to include; repeat for several. "prospect" selects customers '
+                                 'without a paid order.')
+        parser.add_argument('--batch-size', type=int, default=SEND_BATCH,
+                            help='Recipients loaded per query.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the audience size without sending.')
+
+    def handle(self, *args, **options):
+        try:
+            get_template(f"emails/{options['template']}.html")
+        except TemplateDoesNotExist:
+            raise CommandError(f"No e-mail template emails/{options['template']}.html")
+        if options['dry_run']:
+            audience = newsletter_audience(options['segments'])
+            self.stdout.write(f'{len(audience)} recipient(s) in {", ".join(options["segments"])}')
+            return
+        sent = send_newsletter(
+            options['segments'], options['subject'], options['template'],
+            batch_size=max(1, options['batch_size']),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} newsletter(s)'))
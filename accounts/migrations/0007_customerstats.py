@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-19 07:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_passwordresettoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('paid_order_count', models.PositiveIntegerField(default=0)),
+                ('paid_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('average_order_value', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('first_order_at', models.DateTimeField(blank=True, null=True)),
+                ('last_order_at', models.DateTimeField(blank=True, null=True)),
+                ('wishlist_size', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Customer stats',
+                'indexes': [models.Index(fields=['paid_total'], name='accounts_cu_paid_to_a8dafa_idx'), models.Index(fields=['order_count'], name='accounts_cu_order_c_3763aa_idx'), models.Index(fields=['last_order_at'], name='accounts_cu_last_or_b69cba_idx')],
+            },
+        ),
+    ]
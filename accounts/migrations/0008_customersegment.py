@@ -0,0 +1,26 @@
+# Generated by Django 4.2.11 on 2026-10-19 07:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_customerstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSegment',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='segment', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('segment', models.CharField(choices=[('champions', 'Champions'), ('loyal', 'Loyal'), ('new', 'New'), ('potential', 'Potential Loyalists'), ('at_risk', 'At Risk'), ('hibernating', 'Hibernating'), ('lost', 'Lost')], db_index=True, max_length=20)),
+                ('recency_score', models.PositiveSmallIntegerField()),
+                ('frequency_score', models.PositiveSmallIntegerField()),
+                ('monetary_score', models.PositiveSmallIntegerField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
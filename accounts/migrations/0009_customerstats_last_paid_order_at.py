@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-19 07:37
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_last_paid_order_at(apps, schema_editor):
+    CustomerStats = apps.get_model('accounts', 'CustomerStats')
+    last_paid = {}
+    for model_name in ('Order', 'ArchivedOrder'):
+        rows = (
+            apps.get_model('orders', model_name).objects.filter(payment_status='paid', user__isnull=False)
+            .order_by()
+            .values_list('user_id')
+            .annotate(last=Max('created_at'))
+        )
+        for user_id, last in rows:
+            last_paid[user_id] = max(filter(None, (last_paid.get(user_id), last)))
+    for user_id, last in last_paid.items():
+        CustomerStats.objects.filter(user_id=user_id).update(last_paid_order_at=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_customersegment'),
+        ('orders', '0004_archivedorder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerstats',
+            name='last_paid_order_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_paid_order_at, migrations.RunPython.noop),
+    ]
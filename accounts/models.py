@@ -148,6 +148,64 @@ class Wishlist(models.Model):
 		return self.products.count()
 
 
+class CustomerStats(models.Model):
+	"""
+	Denormalised lifetime figures for a customer, kept current by
+	``accounts.stats`` so customer lists can sort and filter on them without
+	aggregating orders. Live and archived orders are both counted.
+	"""
+	user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+	order_count = models.PositiveIntegerField(default=0)
+	paid_order_count = models.PositiveIntegerField(default=0)
+	paid_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+	average_order_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+	first_order_at = models.DateTimeField(null=True, blank=True)
+	last_order_at = models.DateTimeField(null=True, blank=True)
+	last_paid_order_at = models.DateTimeField(null=True, blank=True)
+	wishlist_size = models.PositiveIntegerField(default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+	class Meta:
+		app_label = 'accounts'
+		verbose_name_plural = "Customer stats"
+		indexes = [
+			models.Index(fields=['paid_total']),
+			models.Index(fields=['order_count']),
+			models.Index(fields=['last_order_at']),
+		]
+	def __str__(self):
+		return f"Stats for {self.user_id}"
+
+
+class CustomerSegment(models.Model):
+	"""
+	RFM (recency, frequency, monetary) scores of a customer with paid orders,
+	rewritten by the ``compute_rfm_segments`` batch job. Customers without a
+	row have not bought anything yet.
+	"""
+	SEGMENT_CHOICES = (
+		('champions', 'Champions'),
+		('loyal', 'Loyal'),
+		('new', 'New'),
+		('potential', 'Potential Loyalists'),
+		('at_risk', 'At Risk'),
+		('hibernating', 'Hibernating'),
+		('lost', 'Lost'),
+	)
+	user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='segment')
+	segment = models.CharField(max_length=20, choices=SEGMENT_CHOICES, db_index=True)
+	recency_score = models.PositiveSmallIntegerField()
+	frequency_score = models.PositiveSmallIntegerField()
+	monetary_score = models.PositiveSmallIntegerField()
+	computed_at = models.DateTimeField()
+	class Meta:
+		app_label = 'accounts'
+	def __str__(self):
+		return f"{self.user_id}: {self.get_segment_display()}"
+	@property
+	def rfm(self):
+		return f"{self.recency_score}{self.frequency_score}{self.monetary_score}"
+
+
 class PasswordResetToken(models.Model):
 	"""Token for password reset functionality."""
 	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='password_reset_tokens')
@@ -0,0 +1,157 @@
+"""
+RFM segmentation of customers for marketing lists.
+
+``compute_segments`` streams the ``CustomerStats`` of every customer with a
+paid order in chunks, scores recency (days since the last paid order), frequency
+(paid orders) and monetary value (paid total) from 1 to 5 by quintile in a
+single vectorised pass, and maps the scores to a named segment. Results are
+upserted into ``CustomerSegment``; customers who no longer qualify lose
+their row. ``send_newsletter`` e-mails the opted-in customers of chosen
+segments.
+"""
+from itertools import islice
+
+import numpy as np
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CustomerSegment, CustomerStats, User
+
+CHUNK_SIZE = 5000
+SEND_BATCH = 500
+QUANTILES = (0.2, 0.4, 0.6, 0.8)
+
+
+def quantile_scores(values, reverse=False):
+    """
+    Score ``values`` 1-5 by quintile; with ``reverse`` the smallest values
+    score 5. Values tied on a bin edge take the lower bin, so a mass of
+    one-off buyers does not score as frequent.
+    """
+    edges = np.quantile(values, QUANTILES)
+    scores = np.searchsorted(edges, values, side='left') + 1
+    return 6 - scores if reverse else scores
+
+
+def segment_names(recency, frequency, monetary):
+    """Vectorised mapping of score arrays to ``CustomerSegment.segment`` values."""
+    value = (frequency + monetary) / 2
+    return np.select(
+        [
+            (recency >= 4) & (value >= 4),
+            (recency >= 3) & (value >= 3),
+            (recency >= 4) & (frequency <= 1),
+            recency >= 3,
+            value >= 3,
+            recency == 2,
+        ],
+        ['champions', 'loyal', 'new', 'potential', 'at_risk', 'hibernating'],
+        default='lost',
+    )
+
+
+def _load(chunk_size):
+    """Stream ``(user_ids, days_since_last_paid_order, paid_orders, paid_total)`` arrays."""
+    rows = (
+        CustomerStats.objects.filter(
+            user__user_type='customer', paid_order_count__gt=0, last_paid_order_at__isnull=False,
+        )
+        .order_by()
+        .values_list('user_id', 'last_paid_order_at', 'paid_order_count', 'paid_total')
+        .iterator(chunk_size=chunk_size)
+    )
+    now = np.datetime64(timezone.now().replace(tzinfo=None), 's')
+    user_ids, recency, frequency, monetary = [], [], [], []
+    while chunk := list(islice(rows, chunk_size)):
+        ids, last_orders, counts, totals = zip(*chunk)
+        last = np.array([value.replace(tzinfo=None) for value in last_orders], dtype='datetime64[s]')
+        user_ids.append(np.array(ids, dtype=np.int64))
+        recency.append((now - last).astype('timedelta64[D]').astype(np.int64))
+        frequency.append(np.array(counts, dtype=np.int64))
+        monetary.append(np.array(totals, dtype=float))
+    if not user_ids:
+        return (np.array([], dtype=np.int64),) + (np.array([]),) * 3
+    return tuple(np.concatenate(parts) for parts in (user_ids, recency, frequency, monetary))
+
+
+def compute_segments(chunk_size=CHUNK_SIZE):
+    """Rescore every customer with a paid order. Returns ``{segment: customers}``."""
+    started = timezone.now()
+    user_ids, recency, frequency, monetary = _load(chunk_size)
+    counts = {}
+    with transaction.atomic():
+        if len(user_ids):
+            r = quantile_scores(recency, reverse=True)
+            f = quantile_scores(frequency)
+            m = quantile_scores(monetary)
+            names = segment_names(r, f, m)
+            for start in range(0, len(user_ids), chunk_size):
+                window = slice(start, start + chunk_size)
+                CustomerSegment.objects.bulk_create(
+                    [
+                        CustomerSegment(
+                            user_id=int(user_id), segment=str(name), recency_score=int(rs),
+                            frequency_score=int(fs), monetary_score=int(ms), computed_at=started,
+                        )
+                        for user_id, name, rs, fs, ms in zip(
+                            user_ids[window], names[window], r[window], f[window], m[window],
+                        )
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['user'],
+                    update_fields=['segment', 'recency_score', 'frequency_score', 'monetary_score', 'computed_at'],
+                )
+            segments, totals = np.unique(names, return_counts=True)
+            counts = {str(segment): int(total) for segment, total in zip(segments, totals)}
+        CustomerSegment.objects.filter(computed_at__lt=started).delete()
+    return counts
+
+
+def segment_users(segments):
+    """Customers in any of ``segments``; ``'prospect'`` selects those without a paid order."""
+    segments = list(segments)
+    customers = User.objects.filter(user_type='customer')
+    named = [segment for segment in segments if segment != 'prospect']
+    query = customers.none()
+    if named:
+        query = customers.filter(segment__segment__in=named)
+    if 'prospect' in segments:
+        query = query | customers.filter(segment__isnull=True)
+    return query
+
+
+def newsletter_audience(segments):
+    """E-mail addresses of customers in ``segments`` who accept marketing e-mail."""
+    from store.cms_models import NewsletterSubscriber
+
+    customers = segment_users(segments).exclude(email__isnull=True).exclude(email='')
+    opted_in = customers.filter(newsletter_subscribed=True).values_list('email', flat=True)
+    subscribed = NewsletterSubscriber.objects.filter(
+        is_active=True, email__in=customers.values('email'),
+    ).values_list('email', flat=True)
+    return sorted(set(opted_in) | set(subscribed))
+
+
+def send_newsletter(segments, subject, template_name, batch_size=SEND_BATCH):
+    """
+    E-mail ``templates/emails/<template_name>.html`` to the newsletter
+    audience of ``segments`` over a single mail connection, with each
+    subscriber's unsubscribe token. Returns the number of e-mails sent.
+    """
+    from store.cms_models import NewsletterSubscriber
+    from .utils import send_newsletter_email
+
+    audience = newsletter_audience(segments)
+    sent = 0
+    with get_connection() as mail:
+        for start in range(0, len(audience), batch_size):
+            emails = audience[start:start + batch_size]
+            tokens = dict(
+                NewsletterSubscriber.objects.filter(email__in=emails, is_active=True)
+                .values_list('email', 'unsubscribe_token')
+            )
+            for email in emails:
+                if send_newsletter_email(email, subject, template_name, tokens.get(email), connection=mail):
+                    sent += 1
+    return sent
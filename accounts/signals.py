@@ -1,8 +1,13 @@
 """Signal handlers for account-related events."""
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
 
+from orders.models import Order
+from orders.transitions import on_transition
+from .models import CustomerStats, Wishlist
+from .stats import schedule_refresh
+
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def user_created_handler(sender, instance, created, **kwargs):
@@ -10,3 +15,45 @@ def user_created_handler(sender, instance, created, **kwargs):
     if created and instance.email:
         from accounts.utils import send_welcome_email
         send_welcome_email(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_customer_stats(sender, instance, created, raw=False, **kwargs):
+    """Give every new user an empty stats row so customer lists can sort on it."""
+    if created and not raw:
+        CustomerStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Order)
+def order_saved_stats_handler(sender, instance, created, **kwargs):
+    """New orders change the customer's order count and dates."""
+    if created:
+        schedule_refresh(instance.user_id)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted_stats_handler(sender, instance, **kwargs):
+    schedule_refresh(instance.user_id)
+
+
+def payment_status_stats_handler(order, old_value, new_value):
+    """Payment status changes move the order in or out of the paid totals."""
+    schedule_refresh(order.user_id)
+
+
+# Registered as transition hooks rather than a post_save check so bulk status
+# updates (e.g. payment reconciliation) refresh the stats too.
+for _value, _label in Order.PAYMENT_STATUS_CHOICES:
+    on_transition(_value, payment_status_stats_handler, field='payment_status')
+
+
+@receiver(m2m_changed, sender=Wishlist.products.through)
+def wishlist_changed_stats_handler(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep ``wishlist_size`` current when products are added or removed."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_refresh(instance.user_id)
+    elif action in ('post_add', 'post_remove'):
+        schedule_refresh(*Wishlist.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+    elif action == 'pre_clear':
+        schedule_refresh(*instance.wishlisted_by.values_list('user_id', flat=True))
@@ -0,0 +1,132 @@
+"""
+Maintenance of the per-customer ``CustomerStats`` rows.
+
+A row is recomputed from scratch for the affected customers whenever one of
+their orders is created, deleted or changes payment status, or their
+wishlist changes. Recomputation is a handful of grouped queries however many
+customers are refreshed at once, and refreshes requested inside a
+transaction are collected and run once on commit. ``backfill`` rebuilds every
+row in keyset-paginated chunks.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+
+from aniscents.transactions import commit_batch
+from .models import CustomerStats, User, Wishlist
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+
+
+def compute_customer_stats(user_ids):
+    """Unsaved ``CustomerStats`` for every existing user in ``user_ids``."""
+    from orders.models import ArchivedOrder, Order
+
+    user_ids = list(User.objects.filter(pk__in=set(user_ids)).values_list('pk', flat=True))
+    if not user_ids:
+        return []
+    paid = Q(payment_status='paid')
+    figures = defaultdict(lambda: {
+        'orders': 0, 'paid': 0, 'total': ZERO, 'first': None, 'last': None, 'last_paid': None,
+    })
+    for model in (Order, ArchivedOrder):
+        rows = (
+            model.objects.filter(user_id__in=user_ids)
+            .order_by()
+            .values('user_id')
+            .annotate(
+                orders=Count('id'),
+                paid=Count('id', filter=paid),
+                total=Sum('total', filter=paid),
+                first=Min('created_at'),
+                last=Max('created_at'),
+                last_paid=Max('created_at', filter=paid),
+            )
+        )
+        for row in rows:
+            entry = figures[row['user_id']]
+            entry['orders'] += row['orders']
+            entry['paid'] += row['paid']
+            entry['total'] += row['total'] or ZERO
+            entry['first'] = min(filter(None, (entry['first'], row['first'])))
+            entry['last'] = max(filter(None, (entry['last'], row['last'])))
+            entry['last_paid'] = max(filter(None, (entry['last_paid'], row['last_paid'])), default=None)
+    wishlists = dict(
+        Wishlist.products.through.objects.filter(wishlist__user_id__in=user_ids)
+        .order_by()
+        .values_list('wishlist__user_id')
+        .annotate(count=Count('id'))
+    )
+    stats = []
+    for user_id in user_ids:
+        entry = figures[user_id]
+        stats.append(CustomerStats(
+            user_id=user_id,
+            order_count=entry['orders'],
+            paid_order_count=entry['paid'],
+            paid_total=entry['total'],
+            average_order_value=(entry['total'] / entry['paid']).quantize(CENT) if entry['paid'] else ZERO,
+            first_order_at=entry['first'],
+            last_order_at=entry['last'],
+            last_paid_order_at=entry['last_paid'],
+            wishlist_size=wishlists.get(user_id, 0),
+        ))
+    return stats
+
+
+def refresh_customer_stats(user_ids):
+    """Recompute and upsert the stats of ``user_ids``. Returns rows written."""
+    stats = compute_customer_stats(user_ids)
+    CustomerStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=[
+            'order_count', 'paid_order_count', 'paid_total', 'average_order_value',
+            'first_order_at', 'last_order_at', 'last_paid_order_at', 'wishlist_size', 'updated_at',
+        ],
+    )
+    return len(stats)
+
+
+def schedule_refresh(*user_ids):
+    """
+    Refresh the stats of ``user_ids`` once the current transaction commits
+    (immediately in autocommit mode). Calls made within one transaction are
+    merged into a single refresh.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+    pending = commit_batch('accounts.stats', set, refresh_customer_stats)
+    if pending is None:
+        refresh_customer_stats(user_ids)
+    else:
+        pending.update(user_ids)
+
+
+def get_customer_stats(user):
+    """The user's ``CustomerStats``, computed now if the row does not exist yet."""
+    try:
+        return CustomerStats.objects.get(user=user)
+    except CustomerStats.DoesNotExist:
+        refresh_customer_stats([user.pk])
+        return CustomerStats.objects.get(user=user)
+
+
+def backfill(chunk_size=1000):
+    """Rebuild the stats of every user in chunks. Yields the number of rows per chunk."""
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return
+        with transaction.atomic():
+            written = refresh_customer_stats(user_ids)
+        last_id = user_ids[-1]
+        yield written
@@ -5,7 +5,7 @@ from django.conf import settings
 from django.utils.html import strip_tags
 
 
-def send_email(subject, template_name, context, to_email, from_email=None):
+def send_email(subject, template_name, context, to_email, from_email=None, connection=None):
     """
     Send an email using a template.
     
@@ -15,6 +15,7 @@ def send_email(subject, template_name, context, to_email, from_email=None):
         context: Context dictionary for the template
         to_email: Recipient email address (string or list)
         from_email: Sender email (defaults to DEFAULT_FROM_EMAIL)
+        connection: Open mail connection to reuse (defaults to a new one)
     """
     if from_email is None:
         from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@sceanicollections.com')
@@ -38,7 +39,8 @@ def send_email(subject, template_name, context, to_email, from_email=None):
         subject=subject,
         body=text_content,
         from_email=from_email,
-        to=to_email
+        to=to_email,
+        connection=connection
     )
     email.attach_alternative(html_content, 'text/html')
     
@@ -144,6 +146,21 @@ def send_newsletter_welcome_email(email, unsubscribe_token=None):
     )
 
 
+def send_newsletter_email(email, subject, template_name, unsubscribe_token=None, connection=None):
+    """Send one newsletter issue rendered from ``template_name``."""
+    context = {
+        'email': email,
+        'unsubscribe_token': unsubscribe_token,
+    }
+    return send_email(
+        subject=subject,
+        template_name=template_name,
+        context=context,
+        to_email=email,
+        connection=connection
+    )
+
+
 def send_contact_form_email(name, email, subject, message):
     """Send contact form submission notification."""
     context = {
@@ -161,15 +178,32 @@ def send_contact_form_email(name, email, subject, message):
     )
 
 
-def send_low_stock_alert(product):
-    """Send low stock alert to admin."""
+def send_low_stock_digest_email(out_of_stock, low_stock):
+    """Send admin one email listing every product newly out of stock or low."""
     context = {
-        'product': product,
+        'out_of_stock': out_of_stock,
+        'low_stock': low_stock,
     }
     admin_email = getattr(settings, 'ADMIN_EMAIL', settings.DEFAULT_FROM_EMAIL)
     return send_email(
-        subject=f'Low Stock Alert: {product.name}',
-        template_name='low_stock_alert',
+        subject=f'Low Stock: {len(out_of_stock)} out of stock, {len(low_stock)} running low',
+        template_name='low_stock_digest',
         context=context,
         to_email=admin_email
     )
+
+
+def send_wishlist_digest_email(user, notifications, connection=None):
+    """Send one email summarising a customer's pending wishlist notifications."""
+    context = {
+        'user': user,
+        'user_name': user.get_full_name() or user.email.split('@')[0],
+        'notifications': notifications,
+    }
+    return send_email(
+        subject='Updates on your wishlist - SceaniCollections',
+        template_name='wishlist_digest',
+        context=context,
+        to_email=user.email,
+        connection=connection
+    )
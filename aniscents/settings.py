@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'dashboard.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,7 +69,7 @@ ROOT_URLCONF = 'aniscents.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'dashboard.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,6 +80,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'cart.context_processors.cart',
                 'store.context_processors.categories',
+                'dashboard.context_processors.live_events',
             ],
         },
     },
@@ -93,6 +95,25 @@ DATABASES = {
     )
 }
 
+# Redis is shared by every worker process and management command, so version
+# tokens (shipping/tax rates, review pages) and counters are seen by all of
+# them; set REDIS_URL wherever more than one process serves the site. The
+# in-process cache is only suitable for a single process.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -171,6 +192,42 @@ CART_SESSION_ID = 'cart'
 # Paystack settings
 PAYSTACK_SECRET_KEY = config('PAYSTACK_SECRET_KEY', default=env('PAYSTACK_SECRET_KEY', default=''))
 PAYSTACK_PUBLIC_KEY = config('PAYSTACK_PUBLIC_KEY', default=env('PAYSTACK_PUBLIC_KEY', default=''))
+PAYSTACK_BASE_URL = config('PAYSTACK_BASE_URL', default=env('PAYSTACK_BASE_URL', default='https://api.paystack.co'))
+
+# Payment gateway client (timeouts in seconds)
+PAYMENT_GATEWAY_CONNECT_TIMEOUT = config('PAYMENT_GATEWAY_CONNECT_TIMEOUT', default=3.05, cast=float)
+PAYMENT_GATEWAY_READ_TIMEOUT = config('PAYMENT_GATEWAY_READ_TIMEOUT', default=10, cast=float)
+PAYMENT_GATEWAY_MAX_RETRIES = config('PAYMENT_GATEWAY_MAX_RETRIES', default=2, cast=int)
+PAYMENT_GATEWAY_POOL_SIZE = config('PAYMENT_GATEWAY_POOL_SIZE', default=10, cast=int)
+PAYMENT_GATEWAY_CIRCUIT_THRESHOLD = config('PAYMENT_GATEWAY_CIRCUIT_THRESHOLD', default=5, cast=int)
+PAYMENT_GATEWAY_CIRCUIT_RESET = config('PAYMENT_GATEWAY_CIRCUIT_RESET', default=30, cast=float)
+# Seconds the admin sidebar badge counters are cached for
+ADMIN_COUNTERS_TTL = config('ADMIN_COUNTERS_TTL', default=10, cast=int)
+# Seconds a rendered product review list page is cached for (review writes retire it sooner)
+REVIEW_FRAGMENT_TTL = config('REVIEW_FRAGMENT_TTL', default=3600, cast=int)
+# Finished orders untouched for this many days move to the order archive
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+# Attempts before a stored payment event is given up on
+PAYMENT_EVENT_MAX_ATTEMPTS = config('PAYMENT_EVENT_MAX_ATTEMPTS', default=10, cast=int)
+# Per-view query counts and timings (dashboard.instrumentation)
+INSTRUMENTATION_ENABLED = config('INSTRUMENTATION_ENABLED', default=True, cast=bool)
+# Bearer token accepted by the Prometheus metrics endpoint besides an admin session
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Requests running more SQL queries than their view's budget are logged
+DEFAULT_QUERY_BUDGET = config('DEFAULT_QUERY_BUDGET', default=50, cast=int)
+QUERY_BUDGETS = {
+    'dashboard:admin_dashboard': 30,
+    'dashboard:admin_orders': 20,
+    'dashboard:admin_order_detail': 20,
+    'dashboard:admin_products': 45,
+    'dashboard:admin_customers': 20,
+    'dashboard:admin_customer_detail': 25,
+    'dashboard:admin_analytics': 35,
+    'dashboard:customer_dashboard': 35,
+    'home': 30,
+    'store:product_list': 45,
+    'store:product_detail': 45,
+}
 
 # Flutterwave settings
 FLUTTERWAVE_SECRET_KEY = config('FLUTTERWAVE_SECRET_KEY', default=env('FLUTTERWAVE_SECRET_KEY', default=''))
@@ -0,0 +1,87 @@
+"""Field-level change tracking for model instances."""
+
+
+class TrackedFieldsMixin:
+    """
+    Remember the stored values of ``tracked_fields`` when an instance is loaded
+    from the database, so changes can be detected on save without re-reading
+    the row.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_tracking()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        # Loading a deferred field refreshes just that field; unsaved edits to
+        # the others must keep their originals.
+        self.reset_tracking(fields=None if fields is None else list(fields))
+
+    def save(self, *args, **kwargs):
+        # Originals of fields deferred at load must be read before the row is
+        # overwritten, or post_save handlers would compare the new value with
+        # itself.
+        self._load_missing_originals(kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        self.reset_tracking(fields=kwargs.get('update_fields'))
+
+    def _load_missing_originals(self, fields=None):
+        """Fetch, with one query, the stored values of assigned tracked fields deferred at load."""
+        if self._state.adding or self.pk is None:
+            return
+        originals = getattr(self, '_tracked_originals', None)
+        if originals is None:
+            originals = self._tracked_originals = {}
+        missing = [
+            name for name, attname in self._tracked_attnames(fields)
+            if name not in originals and attname in self.__dict__
+        ]
+        if missing:
+            stored = type(self)._base_manager.filter(pk=self.pk).values(*missing).first() or {}
+            originals.update(stored)
+
+    def _tracked_attnames(self, fields=None):
+        names = self.tracked_fields if fields is None else [f for f in fields if f in self.tracked_fields]
+        return [(name, self._meta.get_field(name).attname) for name in names]
+
+    def reset_tracking(self, fields=None):
+        """Treat the current values of the tracked fields as the stored ones."""
+        originals = getattr(self, '_tracked_originals', None)
+        if originals is None or fields is None:
+            originals = self._tracked_originals = {}
+        for name, attname in self._tracked_attnames(fields):
+            if attname in self.__dict__:
+                originals[name] = self.__dict__[attname]
+
+    def get_original_value(self, name, default=None):
+        """Return the value ``name`` had when the instance was loaded."""
+        return getattr(self, '_tracked_originals', {}).get(name, default)
+
+    def tracked_changes(self, fields=None):
+        """
+        Return ``{field: (old, new)}`` for tracked fields that differ from the
+        stored values. Unsaved instances report no changes. Fields that were
+        deferred at load time are fetched with a single query; ``save()`` does
+        so before writing, so handlers of that save still see the change.
+        """
+        if self._state.adding or self.pk is None:
+            return {}
+        self._load_missing_originals(fields)
+        originals = self._tracked_originals
+        attnames = self._tracked_attnames(fields)
+        changes = {}
+        for name, attname in attnames:
+            if name not in originals or attname not in self.__dict__:
+                continue
+            old, new = originals[name], self.__dict__[attname]
+            if old != new:
+                changes[name] = (old, new)
+        return changes
+
+    def has_changed(self, name):
+        """Check whether a tracked field differs from its stored value."""
+        return name in self.tracked_changes(fields=[name])
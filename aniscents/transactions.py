@@ -0,0 +1,41 @@
+"""Work collected during a transaction and run once when it commits."""
+import threading
+import weakref
+
+from django.db import transaction
+
+_local = threading.local()
+
+
+def commit_batch(key, create, flush, using=None):
+    """
+    Return the batch of ``key`` work collected in the current transaction,
+    creating it with ``create()`` and scheduling ``flush(batch)`` on commit the
+    first time, so any number of calls within one transaction cost one flush.
+    Returns ``None`` outside a transaction, where callers act immediately.
+
+    The thread-local registry keeps only a weak reference to the scheduled
+    callback. The callback removes its batch when it runs, and Django drops
+    the callbacks of a rolled-back transaction or savepoint, which leaves the
+    reference dead, so a batch is never reused by a later transaction.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return None
+    batches = getattr(_local, 'batches', None)
+    if batches is None:
+        batches = _local.batches = {}
+    slot = (connection.alias, key)
+    entry = batches.get(slot)
+    if entry is not None and entry[0]() is not None:
+        return entry[1]
+    batch = create()
+
+    def run():
+        if slot in batches and batches[slot][1] is batch:
+            del batches[slot]
+        flush(batch)
+
+    transaction.on_commit(run, using=using)
+    batches[slot] = (weakref.ref(run), batch)
+    return batch
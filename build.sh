@@ -3,6 +3,8 @@ set -o errexit
 
 pip install -r requirements.txt
 python manage.py migrate
+# Analytics read only from the rollups; build them from existing history once.
+python manage.py update_analytics_rollups --backfill --if-empty
 
 # Create superuser if not exists
 python manage.py shell -c "
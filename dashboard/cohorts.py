@@ -0,0 +1,166 @@
+"""
+Monthly signup cohorts: how many of each month's new customers ordered again
+in each following month, and what they spent.
+
+Orders are streamed once per order table as ``(user, signup month, order
+month, total, payment status)`` tuples and folded into the matrix chunk by chunk with
+NumPy, so the cost is one pass over the orders of the covered months rather
+than a query per cohort. The result is cached for the rest of the day.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, DateField
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from accounts.models import User
+from orders.models import ArchivedOrder, Order
+from .timeseries import bucket_range
+
+COHORT_MONTHS = 12
+CHUNK_SIZE = 20000
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _month_numbers(dates):
+    """Months since 1970-01 for a sequence of dates, as an int64 array."""
+    return np.array(dates, dtype='datetime64[M]').astype(np.int64)
+
+
+@dataclass
+class CohortMatrix:
+    """
+    ``active[i, k]`` customers of cohort ``i`` ordered in its ``k``-th month
+    (0 = signup month) and spent ``revenue[i, k]`` on paid orders.
+    """
+    cohorts: list
+    sizes: np.ndarray
+    active: np.ndarray
+    revenue: np.ndarray
+
+    @property
+    def periods(self):
+        return self.active.shape[1]
+
+    @property
+    def retention(self):
+        """Percentage of each cohort active in each month."""
+        sizes = self.sizes[:, None].astype(float)
+        return np.divide(self.active * 100.0, sizes, out=np.zeros(self.active.shape), where=sizes > 0)
+
+    def observed(self, index):
+        """Number of months of cohort ``index`` that have started so far."""
+        return len(self.cohorts) - index
+
+    def rows(self):
+        """Template rows: one per cohort, ``None`` for months still in the future."""
+        retention = self.retention
+        rows = []
+        for index, cohort in enumerate(self.cohorts):
+            cells = []
+            for period in range(self.periods):
+                if period >= self.observed(index):
+                    cells.append(None)
+                    continue
+                cells.append({
+                    'customers': int(self.active[index, period]),
+                    'retention': round(float(retention[index, period]), 1),
+                    'revenue': round(float(self.revenue[index, period]), 2),
+                    'opacity': round(min(float(retention[index, period]) / 100, 1), 2),
+                })
+            rows.append({
+                'cohort': cohort,
+                'size': int(self.sizes[index]),
+                'revenue': round(float(self.revenue[index].sum()), 2),
+                'cells': cells,
+            })
+        return rows
+
+    def average_retention(self):
+        """Retention per month across the cohorts that have reached it, weighted by size."""
+        averages = []
+        for period in range(self.periods):
+            reached = len(self.cohorts) - period
+            sizes = self.sizes[:reached].sum()
+            averages.append(round(float(self.active[:reached, period].sum() * 100 / sizes), 1) if sizes else 0)
+        return averages
+
+
+def _order_rows(model, since):
+    return (
+        model.objects.filter(
+            user__user_type='customer',
+            user__date_joined__gte=since,
+            created_at__gte=since,
+        )
+        .exclude(status='cancelled')
+        .annotate(
+            cohort=TruncMonth('user__date_joined', output_field=DateField()),
+            month=TruncMonth('created_at', output_field=DateField()),
+        )
+        .order_by()
+        .values_list('user_id', 'cohort', 'month', 'total', 'payment_status')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def compute_cohorts(months=COHORT_MONTHS, today=None):
+    """Build the ``CohortMatrix`` for the last ``months`` signup months, including the current one."""
+    today = today or timezone.localdate()
+    first = today.replace(day=1)
+    for _ in range(months - 1):
+        first = (first - timedelta(days=1)).replace(day=1)
+    since = datetime.combine(first, time.min, timezone.get_current_timezone())
+    origin = _month_numbers([first])[0]
+    cells = months * months
+
+    sizes = np.zeros(months, dtype=np.int64)
+    signups = (
+        User.objects.filter(user_type='customer', date_joined__gte=since)
+        .annotate(cohort=TruncMonth('date_joined', output_field=DateField()))
+        .order_by()
+        .values_list('cohort')
+        .annotate(count=Count('id'))
+    )
+    for cohort, count in signups:
+        sizes[_month_numbers([cohort])[0] - origin] += count
+
+    revenue = np.zeros(cells)
+    seen = []
+    for model in (Order, ArchivedOrder):
+        rows = _order_rows(model, since)
+        while chunk := list(islice(rows, CHUNK_SIZE)):
+            users, cohorts, order_months, totals, statuses = zip(*chunk)
+            cohort = _month_numbers(cohorts) - origin
+            age = _month_numbers(order_months) - origin - cohort
+            keep = (age >= 0) & (age < months)
+            cell = cohort * months + age
+            paid_mask = keep & (np.array(statuses) == 'paid')
+            revenue += np.bincount(cell[paid_mask], weights=np.array(totals, dtype=float)[paid_mask], minlength=cells)
+            # One entry per (customer, cell), deduplicated across chunks below.
+            seen.append(np.unique(np.array(users, dtype=np.int64)[keep] * cells + cell[keep]))
+    active = np.zeros(cells, dtype=np.int64)
+    if seen:
+        active = np.bincount(np.unique(np.concatenate(seen)) % cells, minlength=cells)
+
+    return CohortMatrix(
+        cohorts=bucket_range(first, today, 'month'),
+        sizes=sizes,
+        active=active.reshape(months, months),
+        revenue=revenue.reshape(months, months),
+    )
+
+
+def get_cohorts(months=COHORT_MONTHS):
+    """``compute_cohorts`` cached until the end of the day."""
+    today = timezone.localdate()
+    key = f'dashboard:cohorts:{months}:{today.isoformat()}'
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = compute_cohorts(months, today)
+        cache.set(key, matrix, CACHE_TIMEOUT)
+    return matrix
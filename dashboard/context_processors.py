@@ -0,0 +1,10 @@
+from .live import live_events_available
+
+
+def live_events(request):
+    """
+    Whether the admin pages can open the live event stream (ASGI only).
+    """
+    return {
+        'live_events': live_events_available(request),
+    }
@@ -0,0 +1,53 @@
+"""
+Badge counters for the admin sidebar.
+
+The six counters are computed with one conditional-aggregation query per
+table and cached for ``ADMIN_COUNTERS_TTL`` seconds. Saves and deletes of the
+underlying models drop the cached value (see ``dashboard.signals``), so
+badges stay current without every admin page render paying for them.
+"""
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+CACHE_KEY = 'dashboard:sidebar_counters'
+
+
+def start_of_today():
+    """Midnight today in the current time zone, for index-friendly date filters."""
+    return datetime.combine(timezone.localdate(), time.min, timezone.get_current_timezone())
+
+
+def compute_sidebar_counters():
+    from accounts.models import User
+    from feedback.models import Feedback
+    from orders.models import Order
+    from store.models import Product
+
+    today = start_of_today()
+    counters = Order.objects.aggregate(
+        pending_orders_count=Count('id', filter=Q(status='pending')),
+        today_orders=Count('id', filter=Q(created_at__gte=today)),
+        today_revenue=Sum('total', filter=Q(created_at__gte=today, payment_status='paid')),
+    )
+    counters['today_revenue'] = counters['today_revenue'] or 0
+    counters['low_stock_count'] = Product.objects.filter(stock_quantity__lte=5, stock_quantity__gt=0).count()
+    counters['new_feedback_count'] = Feedback.objects.filter(status='new').count()
+    counters['new_customers'] = User.objects.filter(date_joined__gte=today, user_type='customer').count()
+    return counters
+
+
+def get_sidebar_counters():
+    """Return the sidebar counters, from the cache when fresh."""
+    counters = cache.get(CACHE_KEY)
+    if counters is None:
+        counters = compute_sidebar_counters()
+        cache.set(CACHE_KEY, counters, settings.ADMIN_COUNTERS_TTL)
+    return counters
+
+
+def invalidate_sidebar_counters():
+    cache.delete(CACHE_KEY)
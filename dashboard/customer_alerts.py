@@ -0,0 +1,147 @@
+"""
+Price-drop and back-in-stock notifications for customers with the product on
+their wishlist.
+
+Price drops and restocks are collected per transaction and handled once on
+commit, so repricing or restocking a whole catalogue in one request costs a
+single pass: one query finds the wishlisters of every affected product and
+their ``CustomerNotification`` rows are inserted with ``bulk_create`` in
+chunks. Nothing is e-mailed here; the rows wait with ``sent_email`` unset
+until ``send_digests`` (the ``send_wishlist_digests`` command) mails each
+customer one digest of everything pending.
+"""
+from decimal import Decimal
+from itertools import groupby, islice
+
+from django.core.mail import get_connection
+from django.utils import timezone
+
+from aniscents.transactions import commit_batch
+from .models import CustomerNotification
+
+CHUNK_SIZE = 1000
+DIGEST_USERS = 200
+ALERT_TYPES = ('price_drop', 'back_in_stock')
+
+
+def _price_drop(product, old_price, new_price):
+    discount = (old_price - new_price) / old_price * 100
+    return {
+        'notification_type': 'price_drop',
+        'title': f"Price Drop! {product.name}",
+        'message': f"{product.name} price has dropped by {discount:.0f}%! Now ₦{new_price:,.2f} (was ₦{old_price:,.2f})",
+        'data': {
+            'product_id': product.id,
+            'product_name': product.name,
+            'old_price': str(old_price),
+            'new_price': str(new_price),
+            'discount_percentage': round(float(discount), 2),
+        },
+        'action_url': product.get_absolute_url(),
+        'action_label': "Shop Now",
+    }
+
+
+def _back_in_stock(product):
+    return {
+        'notification_type': 'back_in_stock',
+        'title': f"Back in Stock: {product.name}",
+        'message': f"{product.name} from your wishlist is available again.",
+        'data': {'product_id': product.id, 'product_name': product.name},
+        'action_url': product.get_absolute_url(),
+        'action_label': "Shop Now",
+    }
+
+
+def generate_alerts(price_drops=None, restocked=()):
+    """
+    Notify wishlisters of ``price_drops`` (``{product_id: (old, new)}``) and
+    ``restocked`` product ids. Returns the number of notifications created.
+    """
+    from accounts.models import Wishlist
+    from store.models import Product
+
+    price_drops = {pk: prices for pk, prices in (price_drops or {}).items() if 0 <= prices[1] < prices[0]}
+    product_ids = set(price_drops) | set(restocked)
+    if not product_ids:
+        return 0
+    products = Product.objects.filter(pk__in=product_ids, is_available=True).only('id', 'name', 'slug').in_bulk()
+    templates = {}
+    for pk, product in products.items():
+        templates[pk] = []
+        if pk in price_drops:
+            templates[pk].append(_price_drop(product, *price_drops[pk]))
+        if pk in restocked:
+            templates[pk].append(_back_in_stock(product))
+    wishers = (
+        Wishlist.products.through.objects.filter(product_id__in=products, wishlist__user__is_active=True)
+        .order_by()
+        .values_list('product_id', 'wishlist__user_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    notifications = (
+        CustomerNotification(user_id=user_id, **fields)
+        for product_id, user_id in wishers
+        for fields in templates[product_id]
+    )
+    created = 0
+    while chunk := list(islice(notifications, CHUNK_SIZE)):
+        CustomerNotification.objects.bulk_create(chunk)
+        created += len(chunk)
+    return created
+
+
+def schedule_alerts(price_drops=None, restocked=()):
+    """
+    Queue ``generate_alerts`` for when the current transaction commits
+    (immediately in autocommit mode). Calls within one transaction are merged;
+    a product repriced twice keeps its first old price and its last new one.
+    """
+    price_drops = {pk: tuple(Decimal(str(price)) for price in prices) for pk, prices in (price_drops or {}).items()}
+    restocked = set(restocked)
+    if not price_drops and not restocked:
+        return
+    batch = commit_batch('dashboard.customer_alerts', lambda: ({}, set()), lambda pending: generate_alerts(*pending))
+    if batch is None:
+        generate_alerts(price_drops, restocked)
+        return
+    drops, stocked = batch
+    for pk, (old, new) in price_drops.items():
+        drops[pk] = (drops[pk][0] if pk in drops else old, new)
+    stocked.update(restocked)
+
+
+def send_digests(users=DIGEST_USERS):
+    """
+    E-mail every customer with pending price-drop or back-in-stock
+    notifications one digest of them, ``users`` customers per round trip,
+    over a single mail connection. Returns the number of e-mails sent.
+    """
+    from accounts.utils import send_wishlist_digest_email
+
+    pending = CustomerNotification.objects.filter(
+        notification_type__in=ALERT_TYPES, sent_email=False,
+    ).exclude(user__email='')
+    sent = 0
+    last_user = 0
+    with get_connection() as mail:
+        while True:
+            user_ids = list(
+                pending.filter(user_id__gt=last_user).order_by('user_id')
+                .values_list('user_id', flat=True).distinct()[:users]
+            )
+            if not user_ids:
+                return sent
+            last_user = user_ids[-1]
+            rows = (
+                pending.filter(user_id__in=user_ids)
+                .select_related('user')
+                .order_by('user_id', '-created_at')
+            )
+            delivered = []
+            for _, group in groupby(rows, key=lambda notification: notification.user_id):
+                notifications = list(group)
+                if send_wishlist_digest_email(notifications[0].user, notifications, connection=mail):
+                    delivered.extend(notification.pk for notification in notifications)
+                    sent += 1
+            CustomerNotification.objects.filter(pk__in=delivered).update(sent_email=True, sent_at=timezone.now())
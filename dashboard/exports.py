@@ -0,0 +1,122 @@
+"""
+Streaming CSV / JSON Lines exports of orders, customers and products.
+
+Rows are produced lazily from ``QuerySet.iterator(chunk_size=...)`` and
+written one at a time, so memory use stays flat however many rows are
+exported. The same generators back the admin download views and the
+``export_data`` management command.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Prefetch, Sum
+from django.db.models.functions import Coalesce
+
+from accounts.models import User
+from orders.models import Order, OrderItem
+from store.models import Product
+from .filters import filter_customers, filter_orders, filter_products
+
+CHUNK_SIZE = 2000
+
+ORDER_FIELDS = [
+    'order_number', 'created_at', 'status', 'payment_status', 'payment_method',
+    'customer_email', 'customer_first_name', 'customer_last_name', 'customer_phone',
+    'shipping_method', 'shipping_city', 'shipping_state', 'shipping_country',
+    'subtotal', 'shipping_fee', 'tax_amount', 'discount_amount', 'gift_wrapping_fee', 'total',
+    'transaction_id', 'paid_at', 'shipped_at', 'delivered_at',
+]
+ITEM_FIELDS = ['product_name', 'product_sku', 'variant_name', 'unit_price', 'quantity', 'total']
+CUSTOMER_FIELDS = [
+    'id', 'email', 'first_name', 'last_name', 'phone', 'date_joined', 'is_active',
+    'order_count', 'paid_order_count', 'lifetime_total', 'first_order_at', 'last_order_at', 'rfm_segment',
+]
+PRODUCT_FIELDS = [
+    'id', 'sku', 'name', 'brand', 'category', 'price', 'stock_quantity', 'low_stock_threshold',
+    'is_available', 'variant_count', 'variant_stock', 'purchase_count',
+]
+
+
+class Echo:
+    """File-like object whose ``write`` just returns the value, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def _order_rows(params):
+    items = OrderItem.objects.only('order_id', *ITEM_FIELDS).order_by('id')
+    orders = filter_orders(Order.objects.all(), params).only(*ORDER_FIELDS).order_by('-created_at')
+    for order in orders.prefetch_related(Prefetch('items', queryset=items)).iterator(chunk_size=CHUNK_SIZE):
+        row = {field: getattr(order, field) for field in ORDER_FIELDS}
+        row['shipping_country'] = str(row['shipping_country'])
+        row['items'] = [{field: getattr(item, field) for field in ITEM_FIELDS} for item in order.items.all()]
+        yield row
+
+
+def _customer_rows(params):
+    customers = filter_customers(User.objects.filter(user_type='customer'), params).annotate(
+        order_count=Coalesce('stats__order_count', 0),
+        paid_order_count=Coalesce('stats__paid_order_count', 0),
+        lifetime_total=F('stats__paid_total'),
+        first_order_at=F('stats__first_order_at'),
+        last_order_at=F('stats__last_order_at'),
+        rfm_segment=F('segment__segment'),
+    ).order_by('id')
+    for row in customers.values(*CUSTOMER_FIELDS).iterator(chunk_size=CHUNK_SIZE):
+        row['lifetime_total'] = row['lifetime_total'] or 0
+        yield row
+
+
+def _product_rows(params):
+    products = filter_products(Product.objects.all(), params).annotate(
+        variant_count=Count('variants'),
+        variant_stock=Sum('variants__stock_quantity'),
+    ).order_by('id')
+    fields = [f for f in PRODUCT_FIELDS if f not in ('brand', 'category')]
+    for row in products.values(*fields, brand_name=F('brand__name'), category_name=F('category__name')).iterator(chunk_size=CHUNK_SIZE):
+        row['brand'] = row.pop('brand_name')
+        row['category'] = row.pop('category_name')
+        row['variant_stock'] = row['variant_stock'] or 0
+        yield row
+
+
+DATASETS = {
+    'orders': _order_rows,
+    'customers': _customer_rows,
+    'products': _product_rows,
+}
+
+
+def _flatten_orders(rows):
+    """One CSV row per order item; orders without items get a single row."""
+    for row in rows:
+        items = row.pop('items')
+        for item in items or [{}]:
+            yield {**row, **{f'item_{field}': value for field, value in item.items()}}
+
+
+def header(dataset):
+    if dataset == 'orders':
+        return ORDER_FIELDS + [f'item_{field}' for field in ITEM_FIELDS]
+    return CUSTOMER_FIELDS if dataset == 'customers' else PRODUCT_FIELDS
+
+
+def export_lines(dataset, params=None, fmt='csv'):
+    """
+    Yield the export of ``dataset`` as text lines in ``fmt`` ('csv' or 'jsonl'),
+    filtered by the query-string style ``params`` of the matching admin page.
+    """
+    rows = DATASETS[dataset](params or {})
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+        return
+    if dataset == 'orders':
+        rows = _flatten_orders(rows)
+    columns = header(dataset)
+    writer = csv.DictWriter(Echo(), fieldnames=columns, extrasaction='ignore')
+    yield writer.writerow(dict(zip(columns, columns)))
+    for row in rows:
+        yield writer.writerow(row)
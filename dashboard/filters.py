@@ -0,0 +1,101 @@
+"""
+Query-string filters shared by the admin list pages and their exports, so an
+export always contains exactly what the list page shows.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_orders(orders, params):
+    """Apply the ``status``, ``payment``, ``q``, ``from`` and ``to`` filters of ``admin_orders``."""
+    status_filter = params.get('status')
+    payment_filter = params.get('payment')
+    search_query = params.get('q')
+    date_from = _parse_date(params.get('from'))
+    date_to = _parse_date(params.get('to'))
+
+    if status_filter:
+        orders = orders.filter(status=status_filter)
+    if payment_filter:
+        orders = orders.filter(payment_status=payment_filter)
+    if search_query:
+        orders = orders.filter(
+            Q(order_number__icontains=search_query) |
+            Q(customer_first_name__icontains=search_query) |
+            Q(customer_last_name__icontains=search_query) |
+            Q(customer_email__icontains=search_query)
+        )
+    # Whole local days, expressed as datetime bounds so the created_at index is usable.
+    tz = timezone.get_current_timezone()
+    if date_from:
+        orders = orders.filter(created_at__gte=datetime.combine(date_from, time.min, tz))
+    if date_to:
+        orders = orders.filter(created_at__lt=datetime.combine(date_to + timedelta(days=1), time.min, tz))
+    return orders
+
+
+def filter_products(products, params):
+    """Apply the ``category`` and ``stock`` filters of ``admin_products``."""
+    category_filter = params.get('category')
+    stock_filter = params.get('stock')
+    if category_filter:
+        products = products.filter(category_id=category_filter)
+    if stock_filter == 'low':
+        products = products.filter(stock_quantity__lte=5, stock_quantity__gt=0)
+    elif stock_filter == 'out':
+        products = products.filter(stock_quantity=0)
+    elif stock_filter == 'in':
+        products = products.filter(stock_quantity__gt=5)
+    return products
+
+
+def _parse_decimal(value):
+    try:
+        return Decimal(value)
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+
+
+def filter_customers(customers, params):
+    """
+    Apply the ``q`` search, the ``orders`` (``none``/``one``/``repeat``),
+    ``min_spent`` and ``active_since`` filters, which read the
+    ``CustomerStats`` row, and the RFM ``segment`` filter of ``admin_customers``.
+    """
+    search_query = params.get('q')
+    segment = params.get('segment')
+    orders_filter = params.get('orders')
+    min_spent = _parse_decimal(params.get('min_spent'))
+    active_since = _parse_date(params.get('active_since'))
+    if search_query:
+        customers = customers.filter(
+            Q(first_name__icontains=search_query) |
+            Q(last_name__icontains=search_query) |
+            Q(email__icontains=search_query)
+        )
+    if orders_filter == 'none':
+        customers = customers.filter(Q(stats__order_count=0) | Q(stats__isnull=True))
+    elif orders_filter == 'one':
+        customers = customers.filter(stats__order_count=1)
+    elif orders_filter == 'repeat':
+        customers = customers.filter(stats__order_count__gt=1)
+    if min_spent is not None:
+        customers = customers.filter(stats__paid_total__gte=min_spent)
+    if active_since:
+        tz = timezone.get_current_timezone()
+        customers = customers.filter(stats__last_order_at__gte=datetime.combine(active_since, time.min, tz))
+    if segment == 'prospect':
+        customers = customers.filter(segment__isnull=True)
+    elif segment:
+        customers = customers.filter(segment__segment=segment)
+    return customers
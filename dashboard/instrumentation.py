@@ -0,0 +1,265 @@
+"""
+Per-view query counts and timings for every request.
+
+``InstrumentationMiddleware`` installs a ``connection.execute_wrapper`` for
+the duration of a request and records, under the resolved view name, the
+number of SQL queries, time spent in the database, time spent rendering
+templates (through ``InstrumentedDjangoTemplates``) and total latency.
+Each process keeps the last ``RING_SIZE`` samples per view in a ring buffer
+plus running totals; ``view_stats`` summarises them for the admin
+performance page and ``prometheus_text`` exposes them for scraping.
+
+Views whose query count exceeds their budget in ``settings.QUERY_BUDGETS``
+(or ``DEFAULT_QUERY_BUDGET``) are logged with the most repeated statement,
+which is usually the N+1 culprit.
+
+The registry is per process. With several workers each scrape of the
+metrics endpoint reaches whichever worker accepts it, so every series
+carries a ``pid`` label: a worker's counters never appear to reset because
+another worker answered, and ``sum by (view)`` combines the workers. The
+admin performance page likewise shows only the process serving it.
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+RING_SIZE = 200
+UNRESOLVED = '<unresolved>'
+
+_local = threading.local()
+
+
+class RequestRecorder:
+    """``execute_wrapper`` collecting the queries of one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def most_repeated(self):
+        if not self.statements:
+            return '', 0
+        return self.statements.most_common(1)[0]
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        recorder = getattr(_local, 'recorder', None)
+        if recorder is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing top-level renders for the current request."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+@dataclass
+class ViewMetrics:
+    samples: deque = field(default_factory=lambda: deque(maxlen=RING_SIZE))
+    requests: int = 0
+    queries: int = 0
+    db_time: float = 0.0
+    template_time: float = 0.0
+    latency: float = 0.0
+    over_budget: int = 0
+
+
+class Registry:
+    """Running totals and recent samples per view, shared by the threads of a process."""
+
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, queries, db_time, template_time, latency, over_budget):
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.samples.append((queries, db_time, template_time, latency))
+            metrics.requests += 1
+            metrics.queries += queries
+            metrics.db_time += db_time
+            metrics.template_time += template_time
+            metrics.latency += latency
+            metrics.over_budget += over_budget
+
+    def snapshot(self):
+        """``{view: ViewMetrics}`` copied under the lock."""
+        with self._lock:
+            return {
+                view: ViewMetrics(deque(metrics.samples, maxlen=RING_SIZE), metrics.requests, metrics.queries,
+                                  metrics.db_time, metrics.template_time, metrics.latency, metrics.over_budget)
+                for view, metrics in self._views.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = Registry()
+
+
+def query_budget(view):
+    """The query budget of ``view``, or ``None`` when it has none."""
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view, getattr(settings, 'DEFAULT_QUERY_BUDGET', None))
+
+
+def _start(recorder):
+    """Attach ``recorder`` to the current thread's connection and template renders."""
+    _local.recorder = recorder
+    connection.execute_wrappers.append(recorder)
+
+
+def _stop(recorder):
+    connection.execute_wrappers.remove(recorder)
+    _local.recorder = None
+
+
+class InstrumentationMiddleware:
+    """
+    Works in both sync and async stacks. Under ASGI the recorder is attached
+    in the request's thread-sensitive sync thread, where Django runs the
+    ORM and sync views for that request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', True):
+            return self.get_response(request)
+        recorder = RequestRecorder()
+        started = time.perf_counter()
+        _start(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _stop(recorder)
+        self.record(request, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', True):
+            return await self.get_response(request)
+        recorder = RequestRecorder()
+        started = time.perf_counter()
+        await sync_to_async(_start)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_stop)(recorder)
+        self.record(request, recorder, time.perf_counter() - started)
+        return response
+
+    def record(self, request, recorder, latency):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else UNRESOLVED
+        budget = query_budget(view)
+        over_budget = budget is not None and recorder.queries > budget
+        if over_budget:
+            statement, repeats = recorder.most_repeated()
+            logger.warning(
+                'Query budget exceeded by %s %s: %d queries (budget %d); most repeated (%dx): %s',
+                view, request.path, recorder.queries, budget, repeats, statement[:300],
+            )
+        registry.record(view, recorder.queries, recorder.db_time, recorder.template_time, latency, over_budget)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def view_stats():
+    """One row per view, slowest first: totals since start plus figures over the recent samples."""
+    rows = []
+    for view, metrics in registry.snapshot().items():
+        queries, db_times, template_times, latencies = zip(*metrics.samples)
+        rows.append({
+            'view': view,
+            'requests': metrics.requests,
+            'over_budget': metrics.over_budget,
+            'budget': query_budget(view),
+            'avg_queries': round(sum(queries) / len(queries), 1),
+            'max_queries': max(queries),
+            'avg_db_ms': round(sum(db_times) / len(db_times) * 1000, 1),
+            'avg_template_ms': round(sum(template_times) / len(template_times) * 1000, 1),
+            'avg_ms': round(sum(latencies) / len(latencies) * 1000, 1),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 1),
+        })
+    rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return rows
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text():
+    """The registry of this process in the Prometheus text exposition format."""
+    snapshot = registry.snapshot()
+    pid = os.getpid()
+    counters = [
+        ('django_view_requests_total', 'Requests handled per view.', 'requests'),
+        ('django_view_queries_total', 'SQL queries executed per view.', 'queries'),
+        ('django_view_db_seconds_total', 'Time spent in SQL per view.', 'db_time'),
+        ('django_view_template_seconds_total', 'Time spent rendering templates per view.', 'template_time'),
+        ('django_view_query_budget_exceeded_total', 'Requests over their query budget per view.', 'over_budget'),
+    ]
+    lines = []
+    for name, help_text, attribute in counters:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for view, metrics in snapshot.items():
+            lines.append(f'{name}{{view="{_label(view)}",pid="{pid}"}} {getattr(metrics, attribute)}')
+    name = 'django_view_latency_seconds'
+    lines += [f'# HELP {name} Request latency per view; quantiles over the recent requests.', f'# TYPE {name} summary']
+    for view, metrics in snapshot.items():
+        label = f'view="{_label(view)}",pid="{pid}"'
+        latencies = [sample[3] for sample in metrics.samples]
+        for quantile in (0.5, 0.95, 0.99):
+            lines.append(f'{name}{{{label},quantile="{quantile}"}} {_percentile(latencies, quantile):.6f}')
+        lines.append(f'{name}_sum{{{label}}} {metrics.latency:.6f}')
+        lines.append(f'{name}_count{{{label}}} {metrics.requests}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,179 @@
+"""
+Live admin events (new orders, admin notifications, sidebar counter changes)
+pushed to connected browsers over server-sent events.
+
+Every process keeps one in-memory ``Hub`` of connected streams. Published
+messages carry only the event type and an object id, so they stay far below
+the 8000-byte ``NOTIFY`` limit; each stream loads the details it is allowed
+to see when the event reaches it. On PostgreSQL, ``publish`` issues
+``pg_notify`` once the writer's transaction has committed, and a failure is
+logged rather than raised, so live events can never roll back the write that
+raised them. A single ``LISTEN`` thread per process fans the messages out to
+its hub, so events raised by any worker or management command reach every
+stream. Other databases deliver to the publishing process's hub on commit.
+No stream ever polls the database to look for changes.
+
+Streams need an ASGI server: under WSGI a streaming response with an async
+iterator is drained to the end before anything is sent, so an endless
+stream would hold a worker thread forever. ``live_events_available`` tells
+views and templates whether the current request can be streamed.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'dashboard_live'
+QUEUE_SIZE = 100
+KEEPALIVE = 15
+
+
+def live_events_available(request):
+    """Whether ``request`` is served over ASGI, so an event stream can be held open."""
+    return isinstance(request, ASGIRequest)
+
+
+class Hub:
+    """Fan-out of messages to the asyncio queues of connected streams."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def deliver(self, message):
+        """Queue ``message`` for every stream. Safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:  # loop closed
+                self.unsubscribe((loop, queue))
+
+
+def _offer(queue, message):
+    # A stream that cannot keep up loses events rather than blocking the rest.
+    if not queue.full():
+        queue.put_nowait(message)
+
+
+hub = Hub()
+
+
+def _uses_notify():
+    return connection.vendor == 'postgresql'
+
+
+def _notify(message):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, message])
+    except DatabaseError:
+        logger.exception('Could not publish live event %s', message)
+
+
+def publish(event, object_id=None):
+    """Send ``event`` about ``object_id`` to every connected admin stream once the transaction commits."""
+    message = json.dumps({'event': event, 'id': object_id})
+    if _uses_notify():
+        transaction.on_commit(lambda: _notify(message))
+    elif len(hub):
+        transaction.on_commit(lambda: hub.deliver(message))
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _listen():
+    from django.db import connections
+    while True:
+        try:
+            wrapper = connections['default']
+            raw = wrapper.get_new_connection(wrapper.get_connection_params())
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if select.select([raw], [], [], 60) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    hub.deliver(raw.notifies.pop(0).payload)
+        except Exception:
+            logger.exception('Live event listener failed; reconnecting')
+            time.sleep(5)
+
+
+def ensure_listener():
+    """Start this process's LISTEN thread (PostgreSQL only) if not running."""
+    global _listener
+    if not _uses_notify() or (_listener is not None and _listener.is_alive()):
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen, name='dashboard-live-listener', daemon=True)
+            _listener.start()
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+async def event_stream(initial=(), loaders=None):
+    """
+    Async generator of SSE frames: ``initial`` ``(event, data)`` pairs first,
+    then published events, with keep-alive comments while idle. ``loaders``
+    maps event types to async callables taking the published object id and
+    returning the event data, or ``None`` to skip the event for this stream;
+    events without a loader are not sent.
+    """
+    loaders = loaders or {}
+    subscriber = hub.subscribe()
+    queue = subscriber[1]
+    try:
+        for event, data in initial:
+            yield format_event(event, data)
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            # Drain whatever else is queued so a burst of identical events
+            # (counter changes above all) costs one load.
+            messages = [message]
+            while not queue.empty():
+                messages.append(queue.get_nowait())
+            for payload in dict.fromkeys(messages):
+                payload = json.loads(payload)
+                loader = loaders.get(payload['event'])
+                if loader is None:
+                    continue
+                data = await loader(payload.get('id'))
+                if data is not None:
+                    yield format_event(payload['event'], data)
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from dashboard.exports import DATASETS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream orders, customers or products to CSV or JSON Lines, with the admin list filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--output', '-o', help='File to write to (default: stdout).')
+        parser.add_argument('--status', help='Order status.')
+        parser.add_argument('--payment', help='Order payment status.')
+        parser.add_argument('--q', help='Search text, as in the admin search box.')
+        parser.add_argument('--from', dest='from', metavar='YYYY-MM-DD', help='Orders created on or after this date.')
+        parser.add_argument('--to', metavar='YYYY-MM-DD', help='Orders created on or before this date.')
+        parser.add_argument('--category', help='Product category id.')
+        parser.add_argument('--stock', choices=['in', 'low', 'out'], help='Product stock level.')
+
+    def handle(self, *args, **options):
+        params = {
+            key: options[key]
+            for key in ('status', 'payment', 'q', 'from', 'to', 'category', 'stock')
+            if options[key]
+        }
+        lines = export_lines(options['dataset'], params, options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as handle:
+                handle.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.customer_alerts import DIGEST_USERS, send_digests
+
+
+class Command(BaseCommand):
+    help = 'E-mail each customer one digest of their pending price-drop and back-in-stock notifications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DIGEST_USERS,
+                            help='Customers loaded per query.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for pending notifications instead of exiting.')
+        parser.add_argument('--interval', type=float, default=300.0,
+                            help='Seconds to sleep between passes when looping.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_digests(users=max(1, options['batch_size']))
+            if sent:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} wishlist digest(s)'))
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,79 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from accounts.models import User
+from dashboard.models import AnalyticsData
+from dashboard.rollups import DATA_TYPES, backfill, process_dirty_dates
+from orders.models import ArchivedOrder, Order
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}, expected YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = 'Recompute the analytics rollups for dates marked dirty, or backfill a date range.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Maximum number of dirty dates to process per pass.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for dirty dates instead of exiting.')
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help='Seconds to sleep between passes when looping.')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Rebuild every rollup between --start and --end.')
+        parser.add_argument('--start', metavar='YYYY-MM-DD',
+                            help='First date to backfill (default: first order or sign-up).')
+        parser.add_argument('--end', metavar='YYYY-MM-DD', help='Last date to backfill (default: today).')
+        parser.add_argument('--chunk-days', type=int, default=90,
+                            help='Days of data recomputed per backfill transaction.')
+        parser.add_argument('--if-empty', action='store_true',
+                            help='Only backfill when no rollups exist yet (the initial backfill on deploy).')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            return self.backfill(options)
+        while True:
+            processed = process_dirty_dates(limit=options['limit'])
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f'Recomputed rollups for {processed} dirty date(s)'))
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
+
+    def backfill(self, options):
+        if options['if_empty'] and AnalyticsData.objects.filter(data_type__in=DATA_TYPES).exists():
+            self.stdout.write('Rollups already exist; nothing to backfill.')
+            return
+        end = _date(options['end']) if options['end'] else timezone.localdate()
+        if options['start']:
+            start = _date(options['start'])
+        else:
+            firsts = [
+                Order.objects.aggregate(first=Min('created_at'))['first'],
+                ArchivedOrder.objects.aggregate(first=Min('created_at'))['first'],
+                User.objects.filter(user_type='customer').aggregate(first=Min('date_joined'))['first'],
+            ]
+            firsts = [timezone.localdate(value) for value in firsts if value]
+            if not firsts:
+                self.stdout.write('Nothing to backfill.')
+                return
+            start = min(firsts)
+        if start > end:
+            raise CommandError('--start is after --end.')
+        total = 0
+        for period, first, last, rows in backfill(start, end, chunk_days=max(1, options['chunk_days'])):
+            total += rows
+            self.stdout.write(f'{period} {first}..{last}: {rows} rows')
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total} rollup rows for {start}..{end}'))
@@ -0,0 +1,66 @@
+"""
+Headline metrics for the admin dashboard pages.
+
+Each group is computed with conditional aggregation (``Count``/``Sum`` with
+``filter=Q(...)``), so every table is read by a single query however many
+figures are taken from it. The same functions back the admin views and the
+``admin/metrics/`` JSON endpoint.
+"""
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+
+from accounts.models import User
+from orders.models import Order
+from store.models import Product
+from .counters import start_of_today
+
+LOW_STOCK_LEVEL = 5
+
+
+def order_metrics():
+    today = Q(created_at__gte=start_of_today())
+    paid = Q(payment_status='paid')
+    metrics = Order.objects.aggregate(
+        count=Count('id'),
+        today=Count('id', filter=today),
+        pending=Count('id', filter=Q(status='pending')),
+        confirmed_processing=Count('id', filter=Q(status__in=['confirmed', 'processing'])),
+        shipped=Count('id', filter=Q(status='shipped')),
+        delivered=Count('id', filter=Q(status='delivered')),
+        awaiting_payment=Count('id', filter=Q(payment_status='pending')),
+        total_sales=Sum('total', filter=paid),
+        today_sales=Sum('total', filter=paid & today),
+    )
+    metrics['total_sales'] = metrics['total_sales'] or 0
+    metrics['today_sales'] = metrics['today_sales'] or 0
+    return metrics
+
+
+def product_metrics():
+    return Product.objects.aggregate(
+        count=Count('id'),
+        in_stock=Count('id', filter=Q(stock_quantity__gt=LOW_STOCK_LEVEL)),
+        low_stock=Count('id', filter=Q(stock_quantity__lte=LOW_STOCK_LEVEL, stock_quantity__gt=0)),
+        out_of_stock=Count('id', filter=Q(stock_quantity=0)),
+    )
+
+
+def customer_metrics():
+    today = start_of_today()
+    month_start = today.replace(day=1)
+    has_orders = Exists(Order.objects.filter(user=OuterRef('pk')))
+    return User.objects.filter(user_type='customer').aggregate(
+        count=Count('id'),
+        new_today=Count('id', filter=Q(date_joined__gte=today)),
+        new_this_month=Count('id', filter=Q(date_joined__gte=month_start)),
+        active_today=Count('id', filter=Q(last_login__gte=today)),
+        with_orders=Count('id', filter=Q(has_orders)),
+    )
+
+
+def dashboard_metrics():
+    """All metric groups, keyed by table."""
+    return {
+        'orders': order_metrics(),
+        'products': product_metrics(),
+        'customers': customer_metrics(),
+    }
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.11 on 2026-10-19 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_read_state(apps, schema_editor):
+    # The old flag was shared, so every recipient inherits it.
+    AdminNotification = apps.get_model('dashboard', 'AdminNotification')
+    AdminNotificationRecipient = apps.get_model('dashboard', 'AdminNotificationRecipient')
+    read_at = AdminNotification.objects.filter(pk=OuterRef('notification_id')).values('read_at')[:1]
+    AdminNotificationRecipient.objects.filter(notification__is_read=True).update(
+        is_read=True, read_at=Subquery(read_at),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dashboard', '0002_analyticsdirtydate'),
+    ]
+
+    operations = [
+        # The automatic M2M table becomes the explicit through model as is.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='AdminNotificationRecipient',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('notification', models.ForeignKey(db_column='adminnotification_id', on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='dashboard.adminnotification')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='admin_notification_receipts', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'dashboard_adminnotification_users',
+                        'unique_together': {('notification', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='adminnotification',
+                    name='users',
+                    field=models.ManyToManyField(limit_choices_to={'user_type__in': ['admin', 'staff']}, related_name='admin_notifications', through='dashboard.AdminNotificationRecipient', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='adminnotificationrecipient',
+            name='is_read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='adminnotificationrecipient',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='adminnotificationrecipient',
+            index=models.Index(fields=['user', 'is_read'], name='dashboard_a_user_id_1a2adf_idx'),
+        ),
+        migrations.RunPython(copy_read_state, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='adminnotification',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='adminnotification',
+            name='read_at',
+        ),
+    ]
@@ -96,7 +96,8 @@ class AdminNotification(models.Model):
     users = models.ManyToManyField(
         settings.AUTH_USER_MODEL, 
         related_name='admin_notifications',
-        limit_choices_to={'user_type__in': ['admin', 'staff']}
+        limit_choices_to={'user_type__in': ['admin', 'staff']},
+        through='AdminNotificationRecipient',
     )
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES)
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
@@ -104,35 +105,24 @@ class AdminNotification(models.Model):
     message = models.TextField()
     data = models.JSONField(default=dict, blank=True)
     # Status
-    is_read = models.BooleanField(default=False)
     is_actionable = models.BooleanField(default=True)
     action_url = models.URLField(blank=True)
     action_label = models.CharField(max_length=50, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    read_at = models.DateTimeField(null=True, blank=True)
     class Meta:
         ordering = ['-created_at']
     def __str__(self):
         return f"{self.get_notification_type_display()}: {self.title}"
     def mark_as_read(self, user):
         """Mark notification as read for specific user."""
-        from django.db.models import Q
-        # Check if this user was targeted
-        if self.users.filter(id=user.id).exists():
-            # Create a through model or mark as read for all
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.save()
+        from .notifications import mark_read
+        return mark_read(user, [self.pk]) > 0
     @classmethod
     def create_order_notification(cls, order, users=None):
         """Create notification for new order."""
-        from accounts.models import User
-        if users is None:
-            users = User.objects.filter(
-                user_type__in=['admin', 'staff'],
-                is_active=True
-            )
-        notification = cls.objects.create(
+        from .notifications import notify
+        return notify(
+            users,
             notification_type='order',
             priority='high' if order.total > 50000 else 'medium',
             title=f"New Order #{order.order_number}",
@@ -146,18 +136,12 @@ class AdminNotification(models.Model):
             action_url=f"/admin/orders/order/{order.id}/change/",
             action_label="View Order"
         )
-        notification.users.set(users)
-        return notification
     @classmethod
     def create_inventory_notification(cls, product, users=None):
         """Create notification for low inventory."""
-        from accounts.models import User
-        if users is None:
-            users = User.objects.filter(
-                user_type__in=['admin', 'staff'],
-                is_active=True
-            )
-        notification = cls.objects.create(
+        from .notifications import notify
+        return notify(
+            users,
             notification_type='inventory',
             priority='medium',
             title=f"Low Inventory: {product.name}",
@@ -171,8 +155,30 @@ class AdminNotification(models.Model):
             action_url=f"/admin/store/product/{product.id}/change/",
             action_label="Update Inventory"
         )
-        notification.users.set(users)
-        return notification
+
+
+class AdminNotificationRecipient(models.Model):
+    """Delivery of an admin notification to one admin, with that admin's read state."""
+    # Reuses the table Django created for the former automatic M2M.
+    notification = models.ForeignKey(
+        AdminNotification,
+        on_delete=models.CASCADE,
+        related_name='recipients',
+        db_column='adminnotification_id'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='admin_notification_receipts'
+    )
+    is_read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+    class Meta:
+        db_table = 'dashboard_adminnotification_users'
+        unique_together = ('notification', 'user')
+        indexes = [models.Index(fields=['user', 'is_read'])]
+    def __str__(self):
+        return f"{self.notification_id} -> {self.user_id}"
 
 class CustomerDashboard(models.Model):
     """Customer dashboard settings and preferences."""
@@ -376,50 +382,17 @@ class AnalyticsData(models.Model):
         return None
     @classmethod
     def update_sales_data(cls, date=None):
-        """Update sales analytics data."""
-        from orders.models import Order
-        from django.db.models import Sum, Count
-        from django.utils import timezone
+        """Recompute all rollups for the periods containing ``date`` (default today)."""
+        from .rollups import refresh
         if date is None:
-            date = timezone.now().date()
-        # Daily sales
-        daily_sales = Order.objects.filter(
-            created_at__date=date,
-            payment_status='paid'
-        ).aggregate(
-            total_sales=Sum('total'),
-            order_count=Count('id')
-        )
-        cls.objects.update_or_create(
-            data_type='sales',
-            period='daily',
-            date=date,
-            defaults={
-                'value': daily_sales['total_sales'] or 0,
-                'breakdown': {
-                    'order_count': daily_sales['order_count'] or 0,
-                    'average_order_value': (daily_sales['total_sales'] or 0) / (daily_sales['order_count'] or 1)
-                }
-            }
-        )
-        # Monthly sales
-        monthly_sales = Order.objects.filter(
-            created_at__year=date.year,
-            created_at__month=date.month,
-            payment_status='paid'
-        ).aggregate(
-            total_sales=Sum('total'),
-            order_count=Count('id')
-        )
-        cls.objects.update_or_create(
-            data_type='sales',
-            period='monthly',
-            date=date.replace(day=1),
-            defaults={
-                'value': monthly_sales['total_sales'] or 0,
-                'breakdown': {
-                    'order_count': monthly_sales['order_count'] or 0,
-                    'average_order_value': (monthly_sales['total_sales'] or 0) / (monthly_sales['order_count'] or 1)
-                }
-            }
-        )
+            date = timezone.localdate()
+        refresh(date, date)
+
+class AnalyticsDirtyDate(models.Model):
+    """Local date whose analytics rollups need recomputing (see dashboard.rollups)."""
+    date = models.DateField(unique=True)
+    marked_at = models.DateTimeField(default=timezone.now)
+    class Meta:
+        ordering = ['date']
+    def __str__(self):
+        return f"Dirty analytics date {self.date}"
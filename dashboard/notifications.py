@@ -0,0 +1,114 @@
+"""
+Fan-out and per-admin read state of ``AdminNotification``.
+
+``notify`` writes a notification and all of its ``AdminNotificationRecipient``
+rows in two statements, however many admins receive it. Each admin's unread
+count is kept in the shared cache and adjusted with atomic increments once
+the write commits (up by the rows delivered, down by the rows marked read),
+so badges never run a ``COUNT`` on a hot path; a missing key is simply
+recomputed on the next read. Marking read is a single ``UPDATE`` per request.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .live import publish
+from .models import AdminNotification, AdminNotificationRecipient
+
+UNREAD_KEY = 'dashboard:unread:{}'
+UNREAD_TTL = 24 * 60 * 60
+
+
+def _unread_key(user_id):
+    return UNREAD_KEY.format(user_id)
+
+
+def _adjust_unread(user_ids, delta):
+    """Add ``delta`` to the cached unread counts of ``user_ids`` that are cached."""
+    for user_id in user_ids:
+        key = _unread_key(user_id)
+        try:
+            if cache.incr(key, delta) < 0:
+                cache.delete(key)
+        except ValueError:  # not cached; recomputed on the next read
+            pass
+
+
+def invalidate_unread(user_ids):
+    cache.delete_many([_unread_key(user_id) for user_id in user_ids])
+
+
+def default_recipients():
+    """Ids of the active admin and staff users."""
+    from accounts.models import User
+    return list(
+        User.objects.filter(user_type__in=['admin', 'staff'], is_active=True).values_list('pk', flat=True)
+    )
+
+
+def notify(users=None, **fields):
+    """
+    Create an ``AdminNotification`` from ``fields`` for ``users`` (users or
+    ids; every active admin and staff user by default) and push it to the
+    live admin streams.
+    """
+    if users is None:
+        user_ids = default_recipients()
+    else:
+        user_ids = list(dict.fromkeys(getattr(user, 'pk', user) for user in users))
+    with transaction.atomic():
+        notification = AdminNotification.objects.create(**fields)
+        delivered = AdminNotificationRecipient.objects.bulk_create([
+            AdminNotificationRecipient(notification=notification, user_id=user_id) for user_id in user_ids
+        ])
+        transaction.on_commit(lambda: _adjust_unread([row.user_id for row in delivered], 1))
+        publish('notification', notification.pk)
+    return notification
+
+
+def unread_count(user):
+    """Number of notifications ``user`` has not read yet."""
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = AdminNotificationRecipient.objects.filter(user=user, is_read=False).count()
+        cache.set(key, count, UNREAD_TTL)
+    return count
+
+
+def delivery(user, notification_id):
+    """``user``'s delivery of notification ``notification_id``, or ``None`` if not a recipient."""
+    return (
+        AdminNotificationRecipient.objects.filter(user=user, notification_id=notification_id)
+        .select_related('notification')
+        .first()
+    )
+
+
+def recent_notifications(user, limit=20):
+    """The latest ``limit`` deliveries to ``user``, with their notifications."""
+    return (
+        AdminNotificationRecipient.objects.filter(user=user)
+        .select_related('notification')
+        .order_by('-pk')[:limit]
+    )
+
+
+def mark_read(user, notification_ids):
+    """Mark ``notification_ids`` read for ``user``. Returns how many were unread."""
+    updated = AdminNotificationRecipient.objects.filter(
+        user=user, notification_id__in=notification_ids, is_read=False,
+    ).update(is_read=True, read_at=timezone.now())
+    if updated:
+        transaction.on_commit(lambda: _adjust_unread([user.pk], -updated))
+    return updated
+
+
+def mark_all_read(user):
+    """Mark every notification read for ``user``. Returns how many were unread."""
+    updated = AdminNotificationRecipient.objects.filter(user=user, is_read=False).update(
+        is_read=True, read_at=timezone.now(),
+    )
+    if updated:
+        transaction.on_commit(lambda: _adjust_unread([user.pk], -updated))
+    return updated
@@ -0,0 +1,246 @@
+"""
+Incremental maintenance of the ``AnalyticsData`` rollups.
+
+Saving or deleting an order, or a customer signing up, marks that local date
+dirty (``AnalyticsDirtyDate``). ``process_dirty_dates`` recomputes only the
+daily, weekly, monthly, quarterly and yearly buckets containing dirty dates;
+``backfill`` rebuilds a whole date range in chunks. Archived orders are
+included, so archiving never changes the figures.
+
+Rows per bucket:
+
+* ``sales``: paid order total; ``order_count`` and ``average_order_value``.
+* ``revenue``: paid plus refunded order total; ``net`` and ``refunded``.
+* ``orders``: orders placed; ``paid`` and a per-status ``statuses`` count.
+* ``customers``: customer sign-ups; ``ordering_customers``.
+* ``products``: units sold on paid orders; ``line_items`` and ``products``.
+
+No page-view data is recorded, so no ``traffic`` rows are produced.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from accounts.models import User
+from orders.models import ArchivedOrder, Order, OrderItem
+from .models import AnalyticsData, AnalyticsDirtyDate
+from .timeseries import bucket_range, bucket_start, next_bucket
+
+# AnalyticsData.period -> truncation kind
+PERIODS = {
+    'daily': 'day',
+    'weekly': 'week',
+    'monthly': 'month',
+    'quarterly': 'quarter',
+    'yearly': 'year',
+}
+APPROX_DAYS = {'day': 1, 'week': 7, 'month': 30, 'quarter': 91, 'year': 365}
+DATA_TYPES = ('sales', 'revenue', 'orders', 'customers', 'products')
+ZERO = Decimal('0')
+
+
+def mark_dirty(*dates):
+    """Queue local ``dates`` for recomputation by the next rollup run."""
+    now = timezone.now()
+    AnalyticsDirtyDate.objects.bulk_create(
+        [AnalyticsDirtyDate(date=date, marked_at=now) for date in set(dates) if date],
+        update_conflicts=True,
+        unique_fields=['date'],
+        update_fields=['marked_at'],
+    )
+
+
+def _aware(day):
+    return datetime.combine(day, time.min, timezone.get_current_timezone())
+
+
+def _bucket(field, kind):
+    return Trunc(field, kind, output_field=DateField())
+
+
+def _measure(kind, lower, upper):
+    """
+    Raw figures per bucket start between the aware datetimes ``lower`` and
+    ``upper``, as ``{data_type: {bucket: (value, breakdown)}}``.
+    """
+    paid = Q(payment_status='paid')
+    refunded = Q(payment_status='refunded')
+    orders = defaultdict(lambda: {'orders': 0, 'paid': 0, 'sales': ZERO, 'refunded': ZERO, 'statuses': {}})
+    for model in (Order, ArchivedOrder):
+        rows = (
+            model.objects.filter(created_at__gte=lower, created_at__lt=upper)
+            .annotate(bucket=_bucket('created_at', kind))
+            .order_by()
+            .values('bucket', 'status')
+            .annotate(
+                count=Count('id'),
+                paid=Count('id', filter=paid),
+                sales=Sum('total', filter=paid),
+                refunded=Sum('total', filter=refunded),
+            )
+        )
+        for row in rows:
+            entry = orders[row['bucket']]
+            entry['orders'] += row['count']
+            entry['paid'] += row['paid']
+            entry['sales'] += row['sales'] or ZERO
+            entry['refunded'] += row['refunded'] or ZERO
+            entry['statuses'][row['status']] = entry['statuses'].get(row['status'], 0) + row['count']
+
+    signups = dict(
+        User.objects.filter(user_type='customer', date_joined__gte=lower, date_joined__lt=upper)
+        .annotate(bucket=_bucket('date_joined', kind))
+        .order_by()
+        .values_list('bucket')
+        .annotate(count=Count('id'))
+    )
+    ordering = defaultdict(set)
+    for model in (Order, ArchivedOrder):
+        pairs = (
+            model.objects.filter(created_at__gte=lower, created_at__lt=upper, user__isnull=False)
+            .annotate(bucket=_bucket('created_at', kind))
+            .order_by()
+            .values_list('bucket', 'user_id')
+            .distinct()
+        )
+        for bucket, user_id in pairs:
+            ordering[bucket].add(user_id)
+
+    units = defaultdict(lambda: {'units': 0, 'lines': 0, 'products': set()})
+    items = (
+        OrderItem.objects.filter(order__payment_status='paid', order__created_at__gte=lower, order__created_at__lt=upper)
+        .annotate(bucket=_bucket('order__created_at', kind))
+        .order_by()
+        .values_list('bucket', 'product_id')
+        .annotate(units=Sum('quantity'), lines=Count('id'))
+    )
+    for bucket, product_id, quantity, lines in items:
+        entry = units[bucket]
+        entry['units'] += quantity or 0
+        entry['lines'] += lines
+        entry['products'].add(product_id)
+    archived = ArchivedOrder.objects.filter(
+        payment_status='paid', created_at__gte=lower, created_at__lt=upper,
+    ).values_list('created_at', 'items')
+    for created_at, archived_items in archived:
+        entry = units[bucket_start(timezone.localdate(created_at), kind)]
+        for item in archived_items:
+            entry['units'] += item.get('quantity') or 0
+            entry['lines'] += 1
+            entry['products'].add(item.get('product_id'))
+
+    figures = {data_type: {} for data_type in DATA_TYPES}
+    for bucket, entry in orders.items():
+        sales, refunded = entry['sales'], entry['refunded']
+        figures['sales'][bucket] = (sales, {
+            'order_count': entry['paid'],
+            'average_order_value': str((sales / entry['paid']).quantize(Decimal('0.01'))) if entry['paid'] else '0',
+        })
+        figures['revenue'][bucket] = (sales + refunded, {'net': str(sales), 'refunded': str(refunded)})
+        figures['orders'][bucket] = (entry['orders'], {'paid': entry['paid'], 'statuses': entry['statuses']})
+    for bucket in set(signups) | set(ordering):
+        figures['customers'][bucket] = (signups.get(bucket, 0), {'ordering_customers': len(ordering.get(bucket, ()))})
+    for bucket, entry in units.items():
+        figures['products'][bucket] = (entry['units'], {
+            'line_items': entry['lines'],
+            'products': len(entry['products'] - {None}),
+        })
+    return figures
+
+
+def compute_period(period, start, end):
+    """
+    Unsaved ``AnalyticsData`` rows for every ``period`` bucket overlapping
+    ``start``..``end``, plus the bucket after it (whose ``previous_value``
+    depends on the last one). Future buckets are skipped.
+    """
+    kind = PERIODS[period]
+    today = timezone.localdate()
+    first = bucket_start(start, kind)
+    prior = bucket_start(first - timedelta(days=1), kind)
+    last = min(next_bucket(bucket_start(end, kind), kind), bucket_start(today, kind))
+    buckets = bucket_range(prior, last, kind)
+    figures = _measure(kind, _aware(prior), _aware(next_bucket(buckets[-1], kind)))
+    rows = []
+    for previous, bucket in zip(buckets, buckets[1:]):
+        for data_type in DATA_TYPES:
+            value, breakdown = figures[data_type].get(bucket, (0, {}))
+            rows.append(AnalyticsData(
+                data_type=data_type,
+                period=period,
+                date=bucket,
+                value=value,
+                previous_value=figures[data_type].get(previous, (0, {}))[0],
+                breakdown=breakdown,
+                is_final=next_bucket(bucket, kind) <= today,
+            ))
+    return rows
+
+
+def save_rows(rows):
+    AnalyticsData.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['data_type', 'period', 'date'],
+        update_fields=['value', 'previous_value', 'breakdown', 'calculated_at', 'is_final'],
+    )
+    return len(rows)
+
+
+def refresh(start, end, periods=PERIODS):
+    """Recompute every period's buckets overlapping ``start``..``end``. Returns rows written."""
+    written = 0
+    for period in periods:
+        written += save_rows(compute_period(period, start, end))
+    return written
+
+
+def _runs(buckets, kind):
+    """Group sorted bucket starts into ``(first, last)`` runs of consecutive buckets."""
+    runs = []
+    for bucket in buckets:
+        if runs and next_bucket(runs[-1][1], kind) == bucket:
+            runs[-1][1] = bucket
+        else:
+            runs.append([bucket, bucket])
+    return runs
+
+
+def process_dirty_dates(limit=None):
+    """
+    Recompute the buckets containing dirty dates and clear them. Dates marked
+    again while this runs stay dirty for the next run. Returns the number of
+    dates processed.
+    """
+    started = timezone.now()
+    dirty = AnalyticsDirtyDate.objects.filter(marked_at__lte=started).order_by('date')
+    dates = list(dirty.values_list('date', flat=True)[:limit] if limit else dirty.values_list('date', flat=True))
+    if not dates:
+        return 0
+    with transaction.atomic():
+        for period, kind in PERIODS.items():
+            buckets = sorted({bucket_start(date, kind) for date in dates})
+            for first, last in _runs(buckets, kind):
+                save_rows(compute_period(period, first, last))
+        AnalyticsDirtyDate.objects.filter(date__in=dates, marked_at__lte=started).delete()
+    return len(dates)
+
+
+def backfill(start, end, chunk_days=90):
+    """
+    Rebuild all rollups for ``start``..``end``, each period in chunks of about
+    ``chunk_days`` worth of buckets. Yields ``(period, first, last, rows)`` per chunk.
+    """
+    for period, kind in PERIODS.items():
+        buckets = bucket_range(start, end, kind)
+        step = max(1, chunk_days // APPROX_DAYS[kind])
+        for index in range(0, len(buckets), step):
+            chunk = buckets[index:index + step]
+            with transaction.atomic():
+                rows = save_rows(compute_period(period, chunk[0], chunk[-1]))
+            yield period, chunk[0], chunk[-1], rows
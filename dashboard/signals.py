@@ -0,0 +1,91 @@
+"""Signal handlers keeping cached dashboard data and live admin streams current."""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from feedback.models import Feedback
+from orders.models import Order
+from orders.transitions import on_transition
+from store.inventory import stock_levels_changed
+from store.models import Product
+from .counters import invalidate_sidebar_counters
+from .customer_alerts import schedule_alerts
+from .live import publish
+from .models import AdminNotification
+from .notifications import invalidate_unread
+from .rollups import mark_dirty
+
+
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Feedback)
+def sidebar_source_changed(sender, **kwargs):
+    invalidate_sidebar_counters()
+    publish('counters')
+
+
+@receiver(post_save, sender=Order)
+def order_placed(sender, instance, created, **kwargs):
+    if created:
+        publish('order', instance.pk)
+
+
+@receiver(pre_delete, sender=AdminNotification)
+def admin_notification_deleted(sender, instance, **kwargs):
+    # Deleting an unread notification lowers its recipients' unread counts.
+    user_ids = list(instance.recipients.filter(is_read=False).values_list('user_id', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_unread(user_ids))
+
+
+@receiver(post_save, sender=get_user_model())
+def customer_joined(sender, instance, created, **kwargs):
+    # Logins save the user too; only new customers affect the counters.
+    if created and instance.user_type == 'customer':
+        invalidate_sidebar_counters()
+        publish('counters')
+        mark_dirty(timezone.localdate(instance.date_joined))
+
+
+@receiver(post_delete, sender=get_user_model())
+def customer_removed(sender, instance, **kwargs):
+    if instance.user_type == 'customer':
+        mark_dirty(timezone.localdate(instance.date_joined))
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    # Rollups bucket orders by the day they were placed.
+    if instance.created_at:
+        mark_dirty(timezone.localdate(instance.created_at))
+
+
+def payment_status_changed(order, old_value, new_value):
+    """Paid totals of the order's day change with its payment status."""
+    if order.created_at:
+        mark_dirty(timezone.localdate(order.created_at))
+
+
+# Registered as transition hooks so bulk payment updates (reconcile_payments
+# uses bulk_update, which sends no post_save) mark their days dirty too.
+for _value, _label in Order.PAYMENT_STATUS_CHOICES:
+    on_transition(_value, payment_status_changed, field='payment_status')
+
+
+@receiver(stock_levels_changed)
+def stock_levels_crossed(sender, back_in_stock, **kwargs):
+    # Bulk stock updates bypass post_save, so refresh the badges here, once per
+    # batch. Low-stock reports are batched by store.stock_alerts.send_digest.
+    invalidate_sidebar_counters()
+    publish('counters')
+    if back_in_stock:
+        schedule_alerts(restocked={getattr(item, 'product_id', item.pk) for item in back_in_stock})
+
+
+@receiver(post_save, sender=Product)
+def product_repriced(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    change = None if created or raw else instance.tracked_changes(fields=update_fields).get('price')
+    if change and None not in change:
+        schedule_alerts(price_drops={instance.pk: change})
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import User
+from orders.models import Order
+from store.models import Category, Product
+from .metrics import dashboard_metrics
+
+
+class DashboardMetricsQueryTests(TestCase):
+    """The headline metrics read each table once, however much data there is."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin',
+        )
+        customers = User.objects.bulk_create([
+            User(username=f'customer{i}', email=f'customer{i}@example.com', user_type='customer')
+            for i in range(5)
+        ])
+        category = Category.objects.create(name='Perfumes', slug='perfumes')
+        Product.objects.bulk_create([
+            Product(
+                name=f'Scent {i}', slug=f'scent-{i}', sku=f'SKU-{i}', category=category,
+                concentration='edp', size_ml=100, price=Decimal('100.00'), stock_quantity=i,
+            )
+            for i in range(8)
+        ])
+        statuses = ['pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled']
+        Order.objects.bulk_create([
+            Order(
+                user=customers[i % len(customers)], order_number=f'TEST-{i}',
+                status=statuses[i % len(statuses)], payment_status='paid' if i % 2 else 'pending',
+                customer_email='customer@example.com', customer_phone='1',
+                customer_first_name='Ada', customer_last_name='Obi',
+                shipping_full_name='Ada Obi', shipping_address='1 Road', shipping_city='Lagos',
+                shipping_state='Lagos', shipping_postal_code='100001', shipping_country='NG',
+                shipping_phone='1', payment_method='paystack', total=Decimal('100.00') + i,
+            )
+            for i in range(12)
+        ])
+
+    def test_dashboard_metrics_query_count(self):
+        # One conditional aggregate per table: orders, products, customers.
+        with self.assertNumQueries(3):
+            metrics = dashboard_metrics()
+        self.assertEqual(metrics['orders']['count'], 12)
+        self.assertEqual(metrics['products']['count'], 8)
+        self.assertEqual(metrics['customers']['count'], 5)
+
+    def test_admin_metrics_view_query_count(self):
+        self.client.force_login(self.admin)
+        # Session and user lookups, the three aggregates, then the session
+        # save (SESSION_SAVE_EVERY_REQUEST) in its savepoint.
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('dashboard:admin_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['orders']['count'], 12)
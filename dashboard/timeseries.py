@@ -0,0 +1,187 @@
+"""
+Revenue and order time series for the admin analytics charts.
+
+Series are read from the ``AnalyticsData`` rollups maintained by
+``dashboard.rollups``, so a chart costs one query per series however many
+orders it covers. Buckets without a rollup row are filled with zeros, so the
+chart always has one point per bucket.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+
+from .models import AnalyticsData
+
+GRANULARITIES = ('day', 'week', 'month')
+LABEL_FORMATS = {'day': '%b %d', 'week': 'Wk %b %d', 'month': '%b %Y'}
+# Truncation kind -> AnalyticsData.period
+ROLLUP_PERIODS = {'day': 'daily', 'week': 'weekly', 'month': 'monthly', 'quarter': 'quarterly', 'year': 'yearly'}
+
+
+def bucket_start(day, granularity):
+    """The first day of the bucket containing ``day``."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(weeks=1)
+    if granularity in ('month', 'quarter'):
+        for _ in range(1 if granularity == 'month' else 3):
+            day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return day
+    if granularity == 'year':
+        return day.replace(year=day.year + 1, month=1, day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_range(start, end, granularity):
+    """Bucket start dates covering ``start``..``end`` inclusive."""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+@dataclass
+class Series:
+    granularity: str
+    start: date
+    end: date
+    buckets: list = field(default_factory=list)
+    revenue: list = field(default_factory=list)
+    orders: list = field(default_factory=list)
+    paid_orders: list = field(default_factory=list)
+
+    @property
+    def labels(self):
+        return [bucket.strftime(LABEL_FORMATS[self.granularity]) for bucket in self.buckets]
+
+    @property
+    def aov(self):
+        return [
+            revenue / paid if paid else Decimal('0')
+            for revenue, paid in zip(self.revenue, self.paid_orders)
+        ]
+
+    @property
+    def total_revenue(self):
+        return sum(self.revenue, Decimal('0'))
+
+    @property
+    def total_orders(self):
+        return sum(self.orders)
+
+    @property
+    def total_paid_orders(self):
+        return sum(self.paid_orders)
+
+    @property
+    def average_order_value(self):
+        paid = self.total_paid_orders
+        return self.total_revenue / paid if paid else Decimal('0')
+
+    def as_dict(self):
+        return {
+            'granularity': self.granularity,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'labels': self.labels,
+            'buckets': [bucket.isoformat() for bucket in self.buckets],
+            'revenue': [float(value) for value in self.revenue],
+            'orders': self.orders,
+            'aov': [float(value) for value in self.aov],
+        }
+
+
+def sales_series(start, end, granularity='day'):
+    """
+    Revenue (paid orders), order count and AOV per bucket between the dates
+    ``start`` and ``end`` inclusive, read from the rollups in a single query.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unknown granularity {granularity!r}')
+    series = Series(granularity, start, end, buckets=bucket_range(start, end, granularity))
+    rows = AnalyticsData.objects.filter(
+        period=ROLLUP_PERIODS[granularity],
+        data_type__in=['sales', 'orders'],
+        date__gte=series.buckets[0],
+        date__lte=series.buckets[-1],
+    ).values_list('data_type', 'date', 'value', 'breakdown')
+    by_bucket = defaultdict(dict)
+    for data_type, bucket, value, breakdown in rows:
+        by_bucket[bucket][data_type] = (value, breakdown)
+    for bucket in series.buckets:
+        sales, breakdown = by_bucket[bucket].get('sales', (Decimal('0'), {}))
+        orders, _ = by_bucket[bucket].get('orders', (0, {}))
+        series.revenue.append(sales)
+        series.orders.append(int(orders))
+        series.paid_orders.append(breakdown.get('order_count', 0))
+    return series
+
+
+def period_totals(data_type, start, end, compare=False):
+    """
+    Sum of the daily ``data_type`` rollups for ``start``..``end``; with
+    ``compare``, a ``(current, previous)`` pair including the period before.
+    """
+    prev_start, _ = previous_period(start, end)
+    totals = AnalyticsData.objects.filter(
+        data_type=data_type,
+        period='daily',
+        date__gte=prev_start if compare else start,
+        date__lte=end,
+    ).aggregate(
+        current=Sum('value', filter=Q(date__gte=start)),
+        previous=Sum('value', filter=Q(date__lt=start)),
+    )
+    current, previous = totals['current'] or 0, totals['previous'] or 0
+    return (current, previous) if compare else current
+
+
+def status_totals():
+    """All-time order counts per status, summed from the yearly rollups."""
+    totals = defaultdict(int)
+    for breakdown in AnalyticsData.objects.filter(data_type='orders', period='yearly').values_list('breakdown', flat=True):
+        for status, count in breakdown.get('statuses', {}).items():
+            totals[status] += count
+    return dict(totals)
+
+
+def previous_period(start, end):
+    """The range of the same length immediately before ``start``..``end``."""
+    length = end - start + timedelta(days=1)
+    return start - length, start - timedelta(days=1)
+
+
+def compare_series(start, end, granularity='day'):
+    """Return ``(current, previous)`` series for a range and the period before it."""
+    prev_start, prev_end = previous_period(start, end)
+    return (
+        sales_series(start, end, granularity),
+        sales_series(prev_start, prev_end, granularity),
+    )
+
+
+def default_granularity(days):
+    if days <= 92:
+        return 'day'
+    return 'week' if days <= 366 else 'month'
+
+
+def growth(current, previous):
+    """Percentage change from ``previous`` to ``current`` (0 without a baseline)."""
+    return (current - previous) / previous * 100 if previous > 0 else 0
@@ -38,6 +38,7 @@ urlpatterns = [
     path('admin/orders/<int:order_id>/notes/', views.admin_update_order_notes, name='admin_update_order_notes'),
     path('admin/products/', views.admin_products, name='admin_products'),
     path('admin/products/<int:product_id>/stock/', views.admin_update_stock, name='admin_update_stock'),
+    path('admin/products/inventory/', views.admin_bulk_inventory, name='admin_bulk_inventory'),
     path('admin/customers/', views.admin_customers, name='admin_customers'),
     path('admin/customers/<int:customer_id>/', views.admin_customer_detail, name='admin_customer_detail'),
     path('admin/customers/<int:customer_id>/toggle-status/', views.admin_toggle_customer_status, name='admin_toggle_customer_status'),
@@ -45,6 +46,14 @@ urlpatterns = [
     path('admin/feedback/<int:feedback_id>/status/', views.admin_feedback_status, name='admin_feedback_status'),
     path('admin/feedback/<int:feedback_id>/respond/', views.admin_feedback_respond, name='admin_feedback_respond'),
     path('admin/analytics/', views.admin_analytics, name='admin_analytics'),
+    path('admin/analytics/series/', views.admin_sales_series, name='admin_sales_series'),
+    path('admin/metrics/', views.admin_metrics, name='admin_metrics'),
+    path('admin/performance/', views.admin_performance, name='admin_performance'),
+    path('admin/performance/metrics/', views.admin_performance_metrics, name='admin_performance_metrics'),
+    path('admin/live/', views.admin_live_events, name='admin_live_events'),
+    path('admin/notifications/', views.admin_notifications, name='admin_notifications'),
+    path('admin/notifications/read/', views.admin_notifications_read, name='admin_notifications_read'),
+    path('admin/export/<str:dataset>/', views.admin_export, name='admin_export'),
     path('admin/settings/', views.admin_settings, name='admin_settings'),
     path('admin/settings/profile/', views.admin_update_profile, name='admin_update_profile'),
     path('admin/settings/password/', views.admin_change_password, name='admin_change_password'),
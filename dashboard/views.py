@@ -1,18 +1,34 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Sum, Count, Avg, Q
+from django.db.models import Sum, Count, Avg, F, Q
 from django.core.paginator import Paginator
 from datetime import timedelta
+import hmac
 import json
 
-from orders.models import Order
+from orders.archive import get_order, user_order_history
+from orders.models import ArchivedOrder, Order
 from store.models import Product, Category, ProductImage
+from store.inventory import InventoryFormatError, apply_stock_changes, edit_stock, parse_rows, save_without_stock, summarize
 from store.cms_models import ShopPageContent, SiteSettings, HeroSection, HomepageSection, PromotionalBanner, PageContent
-from accounts.models import User, Wishlist
+from accounts.models import CustomerSegment, CustomerStats, User, Wishlist
+from accounts.stats import get_customer_stats
 from feedback.models import Feedback
+from .cohorts import get_cohorts
+from .counters import get_sidebar_counters
+from .exports import DATASETS, export_lines
+from .filters import filter_customers, filter_orders, filter_products
+from .instrumentation import prometheus_text, view_stats
+from .live import ensure_listener, event_stream, live_events_available
+from .notifications import delivery, mark_all_read, mark_read, recent_notifications, unread_count
+from .metrics import customer_metrics, dashboard_metrics, order_metrics, product_metrics
+from .timeseries import GRANULARITIES, compare_series, default_granularity, growth, period_totals, sales_series, status_totals
 def customer_required(function=None):
 	"""
 	Decorator for views that require the user to be a customer.
@@ -40,15 +56,7 @@ def admin_required(function=None):
 
 def get_admin_sidebar_context():
 	"""Get common context data for admin sidebar badges."""
-	today = timezone.now().date()
-	return {
-		'pending_orders_count': Order.objects.filter(status='pending').count(),
-		'low_stock_count': Product.objects.filter(stock_quantity__lte=5, stock_quantity__gt=0).count(),
-		'new_feedback_count': Feedback.objects.filter(status='new').count(),
-		'today_orders': Order.objects.filter(created_at__date=today).count(),
-		'today_revenue': Order.objects.filter(created_at__date=today, payment_status='paid').aggregate(total=Sum('total'))['total'] or 0,
-		'new_customers': User.objects.filter(date_joined__date=today, user_type='customer').count(),
-	}
+	return get_sidebar_counters()
 
 
 from django.contrib.auth.decorators import login_required
@@ -61,15 +69,22 @@ def customer_dashboard(request):
 	user = request.user
 	orders = Order.objects.filter(user=user)
 	
-	# Order statistics
-	total_orders = orders.count()
-	delivered_orders_count = orders.filter(status='delivered').count()
+	archived = ArchivedOrder.objects.filter(user=user).aggregate(
+		count=Count('id'),
+		delivered=Count('id', filter=Q(status='delivered')),
+		cancelled=Count('id', filter=Q(status='cancelled')),
+		spent=Sum('total', filter=Q(payment_status='paid')),
+	)
+	
+	# Order statistics (archived orders are all delivered, cancelled or refunded)
+	total_orders = orders.count() + archived['count']
+	delivered_orders_count = orders.filter(status='delivered').count() + archived['delivered']
 	pending_processing_orders_count = orders.filter(status__in=['pending', 'processing', 'confirmed']).count()
 	shipped_orders_count = orders.filter(status='shipped').count()
-	cancelled_orders_count = orders.filter(status='cancelled').count()
+	cancelled_orders_count = orders.filter(status='cancelled').count() + archived['cancelled']
 	
 	# Financial statistics
-	total_spent = orders.filter(payment_status='paid').aggregate(total=Sum('total'))['total'] or 0
+	total_spent = (orders.filter(payment_status='paid').aggregate(total=Sum('total'))['total'] or 0) + (archived['spent'] or 0)
 	
 	# Recent orders (last 5)
 	recent_orders = orders.order_by('-created_at')[:5]
@@ -85,6 +100,10 @@ def customer_dashboard(request):
 	if hasattr(user, 'wishlist') and user.wishlist:
 		wishlist_items = user.wishlist.products.all()[:4]
 	
+	# Products bought before, for one-click reorder
+	from orders.purchases import buy_again
+	buy_again_items = buy_again(user)
+	
 	# Account completion percentage
 	profile_fields = [user.first_name, user.last_name, user.phone, user.email]
 	completed_fields = sum(1 for f in profile_fields if f)
@@ -105,6 +124,7 @@ def customer_dashboard(request):
 		'orders_in_transit': orders_in_transit,
 		'pending_orders': pending_orders,
 		'wishlist_items': wishlist_items,
+		'buy_again_items': buy_again_items,
 		'profile_completion': profile_completion,
 		'address_count': address_count,
 		'title': 'My Dashboard',
@@ -114,8 +134,8 @@ def customer_dashboard(request):
 
 @customer_required
 def customer_orders(request):
-	orders = Order.objects.filter(user=request.user).order_by('-created_at')
-	pending_orders_count = orders.filter(status='pending').count()
+	orders = user_order_history(request.user)
+	pending_orders_count = sum(1 for order in orders if order.status == 'pending')
 	context = {
 		'orders': orders,
 		'pending_orders_count': pending_orders_count,
@@ -220,30 +240,21 @@ def customer_addresses(request):
 
 @admin_required
 def admin_dashboard(request):
-	today = timezone.now().date()
-	total_orders = Order.objects.count()
-	recent_orders = Order.objects.filter(created_at__date=today).count()
-	pending_orders = Order.objects.filter(status='pending').count()
-	total_sales = Order.objects.filter(payment_status='paid').aggregate(total=Sum('total'))['total'] or 0
-	today_sales = Order.objects.filter(created_at__date=today, payment_status='paid').aggregate(total=Sum('total'))['total'] or 0
-	total_products = Product.objects.count()
-	low_stock_products = Product.objects.filter(stock_quantity__lte=5, stock_quantity__gt=0).count()
-	out_of_stock_products = Product.objects.filter(stock_quantity=0).count()
-	total_customers = User.objects.filter(user_type='customer').count()
-	new_customers_today = User.objects.filter(date_joined__date=today, user_type='customer').count()
+	metrics = dashboard_metrics()
+	orders, products, customers = metrics['orders'], metrics['products'], metrics['customers']
 	recent_orders_list = Order.objects.order_by('-created_at')[:10]
 	best_sellers = Product.objects.order_by('-purchase_count')[:5]
 	context = {
-		'total_orders': total_orders,
-		'recent_orders': recent_orders,
-		'pending_orders': pending_orders,
-		'total_sales': total_sales,
-		'today_sales': today_sales,
-		'total_products': total_products,
-		'low_stock_products': low_stock_products,
-		'out_of_stock_products': out_of_stock_products,
-		'total_customers': total_customers,
-		'new_customers_today': new_customers_today,
+		'total_orders': orders['count'],
+		'recent_orders': orders['today'],
+		'pending_orders': orders['pending'],
+		'total_sales': orders['total_sales'],
+		'today_sales': orders['today_sales'],
+		'total_products': products['count'],
+		'low_stock_products': products['low_stock'],
+		'out_of_stock_products': products['out_of_stock'],
+		'total_customers': customers['count'],
+		'new_customers_today': customers['new_today'],
 		'recent_orders_list': recent_orders_list,
 		'best_sellers': best_sellers,
 		'title': 'Admin Dashboard',
@@ -254,29 +265,13 @@ def admin_dashboard(request):
 
 @admin_required
 def admin_orders(request):
-	orders = Order.objects.all().order_by('-created_at')
+	orders = filter_orders(Order.objects.all(), request.GET).annotate(item_count=Count('items')).order_by('-created_at')
 	status_filter = request.GET.get('status')
 	payment_filter = request.GET.get('payment')
 	search_query = request.GET.get('q')
 	
-	if status_filter:
-		orders = orders.filter(status=status_filter)
-	if payment_filter:
-		orders = orders.filter(payment_status=payment_filter)
-	if search_query:
-		orders = orders.filter(
-			Q(order_number__icontains=search_query) |
-			Q(customer_name__icontains=search_query) |
-			Q(customer_email__icontains=search_query)
-		)
-	
 	# Stats
-	total_orders = Order.objects.count()
-	pending_count = Order.objects.filter(status='pending').count()
-	processing_count = Order.objects.filter(status__in=['confirmed', 'processing']).count()
-	shipped_count = Order.objects.filter(status='shipped').count()
-	delivered_count = Order.objects.filter(status='delivered').count()
-	awaiting_payment_count = Order.objects.filter(payment_status='pending').count()
+	stats = order_metrics()
 	
 	# Pagination
 	paginator = Paginator(orders, 20)
@@ -285,12 +280,12 @@ def admin_orders(request):
 	
 	context = {
 		'orders': orders,
-		'total_orders': total_orders,
-		'pending_count': pending_count,
-		'processing_count': processing_count,
-		'shipped_count': shipped_count,
-		'delivered_count': delivered_count,
-		'awaiting_payment_count': awaiting_payment_count,
+		'total_orders': stats['count'],
+		'pending_count': stats['pending'],
+		'processing_count': stats['confirmed_processing'],
+		'shipped_count': stats['shipped'],
+		'delivered_count': stats['delivered'],
+		'awaiting_payment_count': stats['awaiting_payment'],
 		'current_status': status_filter,
 		'current_payment': payment_filter,
 		'search_query': search_query,
@@ -302,23 +297,12 @@ def admin_orders(request):
 
 @admin_required
 def admin_products(request):
-	products = Product.objects.all().order_by('-created_at')
+	products = filter_products(Product.objects.all(), request.GET).order_by('-created_at')
 	category_filter = request.GET.get('category')
-	if category_filter:
-		products = products.filter(category_id=category_filter)
 	stock_filter = request.GET.get('stock')
-	if stock_filter == 'low':
-		products = products.filter(stock_quantity__lte=5, stock_quantity__gt=0)
-	elif stock_filter == 'out':
-		products = products.filter(stock_quantity=0)
-	elif stock_filter == 'in':
-		products = products.filter(stock_quantity__gt=5)
 	
 	# Stats
-	total_products = Product.objects.count()
-	in_stock_count = Product.objects.filter(stock_quantity__gt=5).count()
-	low_stock_count = Product.objects.filter(stock_quantity__lte=5, stock_quantity__gt=0).count()
-	out_of_stock_count = Product.objects.filter(stock_quantity=0).count()
+	stats = product_metrics()
 	
 	# Categories for filter
 	categories = Category.objects.all()
@@ -331,10 +315,10 @@ def admin_products(request):
 	context = {
 		'products': products,
 		'categories': categories,
-		'total_products': total_products,
-		'in_stock_count': in_stock_count,
-		'low_stock_count': low_stock_count,
-		'out_of_stock_count': out_of_stock_count,
+		'total_products': stats['count'],
+		'in_stock_count': stats['in_stock'],
+		'low_stock_count': stats['low_stock'],
+		'out_of_stock_count': stats['out_of_stock'],
 		'stock_filter': stock_filter,
 		'category_filter': category_filter,
 		'title': 'Manage Products',
@@ -345,44 +329,27 @@ def admin_products(request):
 
 @admin_required
 def admin_customers(request):
-	customers = User.objects.filter(user_type='customer').order_by('-date_joined')
+	customers = User.objects.filter(user_type='customer').select_related('stats', 'segment').order_by('-date_joined')
 	
-	# Sorting
+	# Sorting (on the indexed CustomerStats columns)
 	sort = request.GET.get('sort', 'newest')
 	if sort == 'oldest':
 		customers = customers.order_by('date_joined')
 	elif sort == 'name':
 		customers = customers.order_by('first_name', 'last_name')
 	elif sort == 'orders':
-		customers = customers.annotate(order_count=Count('orders')).order_by('-order_count')
+		customers = customers.order_by(F('stats__order_count').desc(nulls_last=True), '-date_joined')
 	elif sort == 'spent':
-		customers = customers.annotate(total_spent=Sum('orders__total')).order_by('-total_spent')
-	
-	# Add total_spent annotation
-	customers = customers.annotate(
-		total_spent=Sum('orders__total', filter=Q(orders__payment_status='paid')),
-		order_count=Count('orders')
-	)
+		customers = customers.order_by(F('stats__paid_total').desc(nulls_last=True), '-date_joined')
+	elif sort == 'recent':
+		customers = customers.order_by(F('stats__last_order_at').desc(nulls_last=True), '-date_joined')
 	
 	# Search
 	search_query = request.GET.get('q')
-	if search_query:
-		customers = customers.filter(
-			Q(first_name__icontains=search_query) |
-			Q(last_name__icontains=search_query) |
-			Q(email__icontains=search_query)
-		)
+	customers = filter_customers(customers, request.GET)
 	
 	# Stats
-	today = timezone.now().date()
-	total_customers = User.objects.filter(user_type='customer').count()
-	active_today = User.objects.filter(user_type='customer', last_login__date=today).count()
-	new_this_month = User.objects.filter(
-		user_type='customer', 
-		date_joined__month=today.month,
-		date_joined__year=today.year
-	).count()
-	customers_with_orders = User.objects.filter(user_type='customer', orders__isnull=False).distinct().count()
+	stats = customer_metrics()
 	
 	# Pagination
 	paginator = Paginator(customers, 20)
@@ -391,11 +358,14 @@ def admin_customers(request):
 	
 	context = {
 		'customers': customers,
-		'total_customers': total_customers,
-		'active_today': active_today,
-		'new_this_month': new_this_month,
-		'customers_with_orders': customers_with_orders,
+		'total_customers': stats['count'],
+		'active_today': stats['active_today'],
+		'new_this_month': stats['new_this_month'],
+		'customers_with_orders': stats['with_orders'],
 		'sort': sort,
+		'orders_filter': request.GET.get('orders', ''),
+		'segment_filter': request.GET.get('segment', ''),
+		'segment_choices': CustomerSegment.SEGMENT_CHOICES,
 		'search_query': search_query,
 		'title': 'Manage Customers',
 		'admin_active': 'customers',
@@ -403,46 +373,37 @@ def admin_customers(request):
 	}
 	return render(request, 'dashboard/admin/customers.html', context)
 
+def _analytics_days(request):
+	try:
+		days = int(request.GET.get('days', 30))
+	except (TypeError, ValueError):
+		days = 30
+	return min(max(days, 1), 730)
+
 @admin_required
 def admin_analytics(request):
-	today = timezone.now().date()
-	days = int(request.GET.get('days', 30))
-	start_date = today - timedelta(days=days)
-	
-	# Calculate metrics
-	orders = Order.objects.filter(created_at__date__gte=start_date)
-	paid_orders = orders.filter(payment_status='paid')
-	
-	total_revenue = paid_orders.aggregate(total=Sum('total'))['total'] or 0
-	total_orders = orders.count()
-	avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-	new_customers = User.objects.filter(user_type='customer', date_joined__date__gte=start_date).count()
-	
-	# Previous period for comparison
-	prev_start = start_date - timedelta(days=days)
-	prev_orders = Order.objects.filter(created_at__date__gte=prev_start, created_at__date__lt=start_date)
-	prev_revenue = prev_orders.filter(payment_status='paid').aggregate(total=Sum('total'))['total'] or 0
-	prev_order_count = prev_orders.count()
-	prev_customers = User.objects.filter(user_type='customer', date_joined__date__gte=prev_start, date_joined__date__lt=start_date).count()
+	today = timezone.localdate()
+	days = _analytics_days(request)
+	interval = request.GET.get('interval')
+	if interval not in GRANULARITIES:
+		interval = default_granularity(days)
+	start_date = today - timedelta(days=days - 1)
+	
+	# Headline figures from the daily rollups, the chart at the chosen interval
+	daily, previous_daily = compare_series(start_date, today, 'day')
+	if interval == 'day':
+		current, previous = daily, previous_daily
+	else:
+		current, previous = compare_series(start_date, today, interval)
+	total_revenue = daily.total_revenue
+	total_orders = daily.total_orders
+	avg_order_value = daily.average_order_value
+	new_customers, previous_customers = period_totals('customers', start_date, today, compare=True)
 	
 	# Growth calculations
-	revenue_growth = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
-	orders_growth = ((total_orders - prev_order_count) / prev_order_count * 100) if prev_order_count > 0 else 0
-	customers_growth = ((new_customers - prev_customers) / prev_customers * 100) if prev_customers > 0 else 0
-	
-	# Sales data for chart
-	dates = []
-	sales_data = []
-	for i in range(min(7, days)):
-		date = today - timedelta(days=i)
-		daily_sales = Order.objects.filter(
-			created_at__date=date,
-			payment_status='paid'
-		).aggregate(total=Sum('total'))['total'] or 0
-		dates.append(date.strftime('%a'))
-		sales_data.append(float(daily_sales))
-	dates.reverse()
-	sales_data.reverse()
+	revenue_growth = growth(total_revenue, previous_daily.total_revenue)
+	orders_growth = growth(total_orders, previous_daily.total_orders)
+	customers_growth = growth(new_customers, previous_customers)
 	
 	# Top products
 	top_products = Product.objects.order_by('-purchase_count')[:5]
@@ -453,21 +414,25 @@ def admin_analytics(request):
 	category_data = [cat['count'] for cat in category_stats]
 	
 	# Order status distribution
-	total_all_orders = Order.objects.count()
+	status_counts = status_totals()
+	total_all_orders = sum(status_counts.values())
 	order_statuses = []
 	for status in ['pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled']:
-		count = Order.objects.filter(status=status).count()
+		count = status_counts.get(status, 0)
 		percentage = (count / total_all_orders * 100) if total_all_orders > 0 else 0
 		order_statuses.append({'status': status, 'count': count, 'percentage': round(percentage, 1)})
 	
 	# Performance metrics
 	total_customer_count = User.objects.filter(user_type='customer').count()
 	conversion_rate = (total_orders / total_customer_count * 100) if total_customer_count > 0 else 0
-	repeat_customers = User.objects.filter(user_type='customer').annotate(order_count=Count('orders')).filter(order_count__gt=1).count()
+	repeat_customers = CustomerStats.objects.filter(user__user_type='customer', order_count__gt=1).count()
 	repeat_customer_rate = (repeat_customers / total_customer_count * 100) if total_customer_count > 0 else 0
 	avg_items = Order.objects.aggregate(avg=Avg('items__quantity'))['avg'] or 0
 	customer_satisfaction = Feedback.objects.filter(rating__isnull=False).aggregate(avg=Avg('rating'))['avg'] or 0
 	
+	# Monthly signup cohorts (cached per day)
+	cohorts = get_cohorts()
+	
 	context = {
 		'total_revenue': total_revenue,
 		'total_orders': total_orders,
@@ -476,8 +441,11 @@ def admin_analytics(request):
 		'revenue_growth': revenue_growth,
 		'orders_growth': orders_growth,
 		'customers_growth': customers_growth,
-		'dates': json.dumps(dates),
-		'sales_data': json.dumps(sales_data),
+		'dates': json.dumps(current.labels),
+		'sales_data': json.dumps([float(value) for value in current.revenue]),
+		'previous_sales_data': json.dumps([float(value) for value in previous.revenue[:len(current.buckets)]]),
+		'order_counts': json.dumps(current.orders),
+		'interval': interval,
 		'top_products': top_products,
 		'category_labels': json.dumps(category_labels),
 		'category_data': json.dumps(category_data),
@@ -486,6 +454,9 @@ def admin_analytics(request):
 		'repeat_customer_rate': repeat_customer_rate,
 		'avg_items_per_order': avg_items,
 		'customer_satisfaction': customer_satisfaction,
+		'cohort_rows': cohorts.rows(),
+		'cohort_periods': range(cohorts.periods),
+		'cohort_average': cohorts.average_retention(),
 		'days': days,
 		'title': 'Analytics',
 		'admin_active': 'analytics',
@@ -498,9 +469,153 @@ def admin_analytics(request):
 # ADDITIONAL ADMIN VIEWS
 # ============================================
 
+@admin_required
+def admin_sales_series(request):
+	"""Revenue, orders and AOV per bucket as JSON, optionally with the previous period."""
+	today = timezone.localdate()
+	days = _analytics_days(request)
+	interval = request.GET.get('interval') or default_granularity(days)
+	if interval not in GRANULARITIES:
+		return JsonResponse({'error': 'Invalid interval'}, status=400)
+	start_date = today - timedelta(days=days - 1)
+	if request.GET.get('compare'):
+		current, previous = compare_series(start_date, today, interval)
+		return JsonResponse({'current': current.as_dict(), 'previous': previous.as_dict()})
+	return JsonResponse({'current': sales_series(start_date, today, interval).as_dict()})
+
+def _live_order(order_id):
+	"""Data of an ``order`` live event."""
+	order = Order.objects.filter(pk=order_id).first()
+	if order is None:
+		return None
+	return {
+		'id': order.pk,
+		'order_number': order.order_number,
+		'customer_name': order.customer_name,
+		'total': order.total,
+		'url': reverse('dashboard:admin_order_detail', args=[order.pk]),
+	}
+
+def _live_notification(user, notification_id):
+	"""Data of a ``notification`` live event, for its recipients only."""
+	received = delivery(user, notification_id)
+	if received is None:
+		return None
+	return {
+		'id': received.notification_id,
+		'type': received.notification.notification_type,
+		'priority': received.notification.priority,
+		'title': received.notification.title,
+		'message': received.notification.message,
+		'url': received.notification.action_url,
+		'unread': unread_count(user),
+	}
+
+
+async def admin_live_events(request):
+	"""Server-sent events stream of new orders, admin notifications and sidebar counters."""
+	is_admin = await sync_to_async(lambda: request.user.is_authenticated and request.user.is_admin_user)()
+	if not is_admin:
+		return HttpResponseForbidden()
+	if not live_events_available(request):
+		# Under WSGI the endless stream would pin a worker thread.
+		return HttpResponse(status=204)
+	ensure_listener()
+	user = request.user
+	loaders = {
+		'counters': sync_to_async(lambda _: get_sidebar_counters()),
+		'order': sync_to_async(_live_order),
+		'notification': sync_to_async(lambda notification_id: _live_notification(user, notification_id)),
+	}
+	initial = [
+		('counters', await loaders['counters'](None)),
+		('unread', {'count': await sync_to_async(unread_count)(user)}),
+	]
+	response = StreamingHttpResponse(
+		event_stream(initial=initial, loaders=loaders),
+		content_type='text/event-stream',
+	)
+	response['Cache-Control'] = 'no-cache'
+	response['X-Accel-Buffering'] = 'no'
+	return response
+
+@admin_required
+def admin_notifications(request):
+	"""The signed-in admin's latest notifications and unread count as JSON."""
+	deliveries = recent_notifications(request.user)
+	return JsonResponse({
+		'unread': unread_count(request.user),
+		'notifications': [{
+			'id': delivery.notification_id,
+			'type': delivery.notification.notification_type,
+			'priority': delivery.notification.priority,
+			'title': delivery.notification.title,
+			'message': delivery.notification.message,
+			'url': delivery.notification.action_url,
+			'created_at': delivery.notification.created_at,
+			'is_read': delivery.is_read,
+		} for delivery in deliveries],
+	})
+
+@admin_required
+def admin_notifications_read(request):
+	"""Mark the posted notification ``ids``, or ``all`` of them, read for the signed-in admin."""
+	if request.method != 'POST':
+		return JsonResponse({'error': 'POST required'}, status=405)
+	if request.POST.get('all'):
+		updated = mark_all_read(request.user)
+	else:
+		try:
+			ids = [int(value) for value in request.POST.getlist('ids')]
+		except ValueError:
+			return JsonResponse({'error': 'Invalid notification id'}, status=400)
+		updated = mark_read(request.user, ids)
+	return JsonResponse({'updated': updated, 'unread': unread_count(request.user)})
+
+@admin_required
+def admin_performance(request):
+	"""Recent query counts and timings per view, as recorded by this process."""
+	stats = view_stats()
+	context = {
+		'view_stats': stats,
+		'over_budget_views': sum(1 for row in stats if row['over_budget']),
+		'title': 'Performance',
+		'admin_active': 'performance',
+		**get_admin_sidebar_context(),
+	}
+	return render(request, 'dashboard/admin/performance.html', context)
+
+def admin_performance_metrics(request):
+	"""Per-view metrics in the Prometheus text format, for admins or a ``METRICS_TOKEN`` bearer."""
+	token = getattr(settings, 'METRICS_TOKEN', '')
+	header = request.headers.get('Authorization', '')
+	authorized = bool(token) and hmac.compare_digest(header, f'Bearer {token}')
+	if not authorized and not (request.user.is_authenticated and request.user.is_admin_user):
+		return HttpResponseForbidden()
+	return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@admin_required
+def admin_metrics(request):
+	return JsonResponse(dashboard_metrics())
+
+@admin_required
+def admin_export(request, dataset):
+	"""Stream orders, customers or products as CSV or JSON Lines, using the list page filters."""
+	if dataset not in DATASETS:
+		raise Http404
+	fmt = 'jsonl' if request.GET.get('format') == 'jsonl' else 'csv'
+	content_type = 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+	filename = f"{dataset}-{timezone.now():%Y%m%d-%H%M}.{fmt}"
+	response = StreamingHttpResponse(export_lines(dataset, request.GET, fmt), content_type=content_type)
+	response['Content-Disposition'] = f'attachment; filename="{filename}"'
+	return response
+
 @admin_required
 def admin_order_detail(request, order_id):
-	order = get_object_or_404(Order, id=order_id)
+	# Archived orders are shown read-only from their snapshot
+	order = get_order(order_id)
+	if order is None:
+		raise Http404('No order found.')
 	
 	# Calculate status index for progress bar
 	status_order = ['pending', 'confirmed', 'processing', 'shipped', 'delivered']
@@ -565,12 +680,42 @@ def admin_update_stock(request, product_id):
 		new_stock = request.POST.get('stock')
 		
 		if new_stock is not None:
-			product.stock_quantity = int(new_stock)
-			product.save()
-			messages.success(request, f'Stock updated for {product.name}')
+			result, = apply_stock_changes([{'sku': product.sku, 'quantity': new_stock}], user=request.user)
+			if result.status == 'error':
+				messages.error(request, f'Could not update stock for {product.name}: {result.error}')
+			else:
+				messages.success(request, f'Stock updated for {product.name}')
 	
 	return redirect('dashboard:admin_products')
 
+@admin_required
+def admin_bulk_inventory(request):
+	"""
+	Apply a batch of stock changes from an uploaded CSV (``file``) or a JSON
+	body, and return the result of every row. ``dry_run`` validates only.
+	"""
+	if request.method != 'POST':
+		return JsonResponse({'error': 'POST required'}, status=405)
+	try:
+		if request.content_type == 'application/json':
+			payload = json.loads(request.body or b'null')
+			dry_run = bool(payload.get('dry_run')) if isinstance(payload, dict) else False
+			rows = parse_rows(payload, 'json')
+		else:
+			upload = request.FILES.get('file')
+			if upload is None:
+				return JsonResponse({'error': 'Upload a CSV or JSON file as "file"'}, status=400)
+			fmt = 'json' if upload.name.lower().endswith('.json') else 'csv'
+			dry_run = bool(request.POST.get('dry_run'))
+			rows = parse_rows(upload.read(), fmt)
+	except (InventoryFormatError, ValueError, UnicodeDecodeError) as exc:
+		return JsonResponse({'error': str(exc)}, status=400)
+	results = apply_stock_changes(rows, dry_run=dry_run, user=request.user)
+	return JsonResponse({
+		'dry_run': dry_run,
+		'summary': summarize(results),
+		'results': [result.as_dict() for result in results],
+	})
 
 @admin_required
 def admin_customer_detail(request, customer_id):
@@ -579,19 +724,17 @@ def admin_customer_detail(request, customer_id):
 	feedbacks = Feedback.objects.filter(user=customer).order_by('-created_at')
 	
 	# Stats
-	total_orders = orders.count()
-	total_spent = orders.filter(payment_status='paid').aggregate(total=Sum('total'))['total'] or 0
-	avg_order = total_spent / total_orders if total_orders > 0 else 0
-	wishlist_count = customer.wishlist.products.count() if hasattr(customer, 'wishlist') and customer.wishlist else 0
+	stats = get_customer_stats(customer)
 	
 	context = {
 		'customer': customer,
 		'orders': orders,
 		'feedbacks': feedbacks,
-		'total_orders': total_orders,
-		'total_spent': total_spent,
-		'avg_order': avg_order,
-		'wishlist_count': wishlist_count,
+		'stats': stats,
+		'total_orders': stats.order_count,
+		'total_spent': stats.paid_total,
+		'avg_order': stats.average_order_value,
+		'wishlist_count': stats.wishlist_size,
 		'title': f'Customer: {customer.get_full_name()}',
 		'admin_active': 'customers',
 		**get_admin_sidebar_context(),
@@ -968,7 +1111,6 @@ def admin_product_edit(request, product_id):
 		product.full_description = request.POST.get('full_description', '')
 		product.price = request.POST.get('price', product.price)
 		product.compare_price = request.POST.get('compare_price') or None
-		product.stock_quantity = request.POST.get('stock_quantity', product.stock_quantity)
 		product.top_notes = request.POST.get('top_notes', '')
 		product.heart_notes = request.POST.get('heart_notes', '')
 		product.base_notes = request.POST.get('base_notes', '')
@@ -978,7 +1120,18 @@ def admin_product_edit(request, product_id):
 		product.is_bestseller = request.POST.get('is_bestseller') == 'on'
 		product.is_new = request.POST.get('is_new') == 'on'
 		product.is_available = request.POST.get('is_available') == 'on'
-		product.save()
+		save_without_stock(product)
+		
+		# Stock moves through the ledger, relative to the level the form
+		# showed, so sales made while the form was open are kept.
+		quantity = request.POST.get('stock_quantity', '')
+		if quantity != '':
+			result = edit_stock(
+				product, quantity, shown=request.POST.get('stock_quantity_shown'),
+				user=request.user, reference='Product form',
+			)
+			if result.status == 'error':
+				messages.error(request, f'Stock not updated: {result.error}')
 		
 		# Handle new product images
 		if 'images' in request.FILES:
@@ -0,0 +1,37 @@
+from django.contrib import admin
+from orders.models import ArchivedOrder, PaymentEvent, ShippingRate, TaxRate
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+	list_display = ['reference', 'gateway', 'event_type', 'source', 'status', 'attempts', 'received_at', 'processed_at']
+	list_filter = ['gateway', 'event_type', 'status', 'source']
+	search_fields = ['reference']
+	readonly_fields = ['received_at', 'processed_at']
+	actions = ['requeue']
+
+	def requeue(self, request, queryset):
+		count = queryset.exclude(status='processed').update(status='pending', attempts=0, last_error='')
+		self.message_user(request, f"{count} payment events queued for processing")
+	requeue.short_description = "Queue selected events for processing again"
+
+@admin.register(ShippingRate)
+class ShippingRateAdmin(admin.ModelAdmin):
+	list_display = ['country', 'state', 'shipping_method', 'rate', 'minimum_order_amount', 'free_shipping_threshold', 'is_active']
+	list_filter = ['country', 'shipping_method', 'is_active']
+	list_editable = ['rate', 'is_active']
+
+@admin.register(TaxRate)
+class TaxRateAdmin(admin.ModelAdmin):
+	list_display = ['country', 'state', 'city', 'rate', 'is_active']
+	list_filter = ['country', 'is_active']
+	search_fields = ['state', 'city']
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+	list_display = ['order_number', 'customer_email', 'status', 'payment_status', 'total', 'created_at', 'archived_at']
+	list_filter = ['status', 'payment_status', 'created_at']
+	search_fields = ['order_number', 'customer_email']
+	readonly_fields = [field.name for field in ArchivedOrder._meta.fields]
+
+	def has_add_permission(self, request):
+		return False
@@ -0,0 +1,176 @@
+"""
+Archiving of finished orders and a read API spanning live and archived orders.
+
+Delivered, cancelled and refunded orders with no activity for
+``ORDER_ARCHIVE_AFTER_DAYS`` are copied, together with their items, notes and
+payments, into ``ArchivedOrder`` rows and removed from the live tables. Each
+batch runs in its own transaction, so an interrupted run loses nothing and a
+rerun simply carries on with the orders that are still live.
+
+Orders still referenced by feedback or coupon usages stay live: those
+foreign keys would otherwise be nulled by the delete and the links lost.
+
+Archived orders are read back as display-only ``Order`` instances with their
+items attached, so existing templates render them unchanged.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from store.models import Product
+from .models import ArchivedOrder, Order, OrderItem, OrderNote, Payment
+
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled', 'refunded')
+
+
+def _snapshot(instance):
+    return {
+        field.attname: field.get_prep_value(field.value_from_object(instance))
+        for field in instance._meta.concrete_fields
+    }
+
+
+def _restore(model, data):
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.attname in data:
+            values[field.attname] = field.to_python(data[field.attname])
+    instance = model(**values)
+    instance._state.adding = False
+    return instance
+
+
+def archivable_orders(older_than=None):
+    """Live orders eligible for archiving."""
+    if older_than is None:
+        older_than = timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    return Order.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        updated_at__lt=timezone.now() - older_than,
+    ).exclude(_referenced())
+
+
+def _referenced():
+    """Orders that feedback or coupon usages point at (both ``SET_NULL`` on delete)."""
+    from cart.models import CouponUsage
+    from feedback.models import Feedback
+
+    return Q(pk__in=Feedback.objects.filter(order__isnull=False).values('order_id')) | Q(
+        pk__in=CouponUsage.objects.filter(order__isnull=False).values('order_id')
+    )
+
+
+def archive_batch(order_ids):
+    """Archive the given orders (re-checking eligibility) and return how many moved."""
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids, status__in=ARCHIVABLE_STATUSES)
+            .exclude(_referenced())
+            .prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.order_by('id')),
+                Prefetch('notes', queryset=OrderNote.objects.order_by('id')),
+                Prefetch('payments', queryset=Payment.objects.order_by('id')),
+            )
+        )
+        if not orders:
+            return 0
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                order_id=order.pk,
+                order_number=order.order_number,
+                user_id=order.user_id,
+                status=order.status,
+                payment_status=order.payment_status,
+                customer_email=order.customer_email,
+                total=order.total,
+                created_at=order.created_at,
+                order_data=_snapshot(order),
+                items=[_snapshot(item) for item in order.items.all()],
+                notes=[_snapshot(note) for note in order.notes.all()],
+                payments=[_snapshot(payment) for payment in order.payments.all()],
+            )
+            for order in orders
+        ], ignore_conflicts=True)
+        archived_ids = set(
+            ArchivedOrder.objects.filter(order_id__in=[order.pk for order in orders])
+            .values_list('order_id', flat=True)
+        )
+        Order.objects.filter(pk__in=archived_ids).delete()
+    return len(archived_ids)
+
+
+def archive_orders(older_than=None, batch_size=500, limit=None):
+    """
+    Archive eligible orders in batches of ``batch_size``, oldest id first.
+    Yields the number of orders moved by each batch.
+    """
+    queryset = archivable_orders(older_than).order_by('pk').values_list('pk', flat=True)
+    last_id, done = 0, 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        ids = list(queryset.filter(pk__gt=last_id)[:size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        moved = archive_batch(ids)
+        done += len(ids)
+        yield moved
+
+
+def restore_order(archived, with_products=True):
+    """
+    Rebuild an ``Order`` (with ``items``, ``notes`` and ``payments`` prefetched)
+    from an archived snapshot. The result is for display only.
+    """
+    order = _restore(Order, archived.order_data)
+    order.is_archived = True
+    items = [_restore(OrderItem, data) for data in archived.items]
+    if with_products:
+        products = Product.objects.in_bulk({item.product_id for item in items if item.product_id})
+        for item in items:
+            item.product = products.get(item.product_id)
+    related = {
+        'items': items,
+        'notes': [_restore(OrderNote, data) for data in archived.notes],
+        'payments': [_restore(Payment, data) for data in archived.payments],
+    }
+    order._prefetched_objects_cache = {}
+    for name, objects in related.items():
+        queryset = getattr(order, name).none()
+        queryset._result_cache = objects
+        queryset._prefetch_done = True
+        order._prefetched_objects_cache[name] = queryset
+    return order
+
+
+def get_order(order_id):
+    """Return the order with ``order_id`` from either store, or ``None``."""
+    order = Order.objects.filter(pk=order_id).first()
+    if order is not None:
+        return order
+    archived = ArchivedOrder.objects.filter(order_id=order_id).first()
+    return restore_order(archived) if archived else None
+
+
+def get_user_order(user, order_id):
+    """Return the user's order with ``order_id`` from either store, or ``None``."""
+    order = Order.objects.filter(pk=order_id, user=user).first()
+    if order is not None:
+        return order
+    archived = ArchivedOrder.objects.filter(order_id=order_id, user=user).first()
+    return restore_order(archived) if archived else None
+
+
+def user_order_history(user):
+    """All of the user's orders, live and archived, newest first."""
+    live = list(Order.objects.filter(user=user).prefetch_related('items').order_by('-created_at'))
+    archived = [
+        restore_order(archived, with_products=False)
+        for archived in ArchivedOrder.objects.filter(user=user).order_by('-created_at')
+    ]
+    # Open live orders can be older than archived ones, so merge by date.
+    return sorted(live + archived, key=lambda order: order.created_at, reverse=True)
@@ -2,6 +2,8 @@ from django import forms
 from django_countries.fields import CountryField
 from django_countries.widgets import CountrySelectWidget
 
+from .models import Order
+
 
 class CheckoutForm(forms.Form):
     """Form for checkout process"""
@@ -80,12 +82,7 @@ class CheckoutForm(forms.Form):
     )
     
     # Shipping Method
-    SHIPPING_CHOICES = [
-        ('standard', 'Standard Shipping - ₦2,500 (5-7 business days)'),
-        ('express', 'Express Shipping - ₦5,000 (2-3 business days)'),
-        ('next_day', 'Next Day Delivery - ₦10,000 (1 business day)'),
-        ('pickup', 'Store Pickup - Free (Ready in 24 hours)'),
-    ]
+    SHIPPING_CHOICES = Order.SHIPPING_METHOD_CHOICES
     
     shipping_method = forms.ChoiceField(
         label='Shipping Method',
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.archive import archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move old delivered, cancelled and refunded orders into the order archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+                            help='Archive finished orders not updated for this many days.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--limit', type=int, help='Maximum number of orders to archive in this run.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many orders are eligible.')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days'])
+        if options['dry_run']:
+            count = archivable_orders(older_than).count()
+            self.stdout.write(f'{count} orders eligible for archiving.')
+            return
+        total = 0
+        for moved in archive_orders(older_than, batch_size=options['batch_size'], limit=options['limit']):
+            total += moved
+            self.stdout.write(f'Archived {total} orders so far...')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} orders.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from orders.purchases import backfill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the purchase index from delivered orders, live and archived.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Customers indexed per transaction.')
+
+    def handle(self, *args, **options):
+        written = sum(backfill(chunk_size=max(1, options['chunk_size'])))
+        self.stdout.write(self.style.SUCCESS(f'Indexed {written} purchased product(s).'))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.payments.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Apply stored payment webhooks and pending verifications to orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100,
+                            help='Maximum number of events to process per pass.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new events instead of exiting.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep between passes when looping.')
+
+    def handle(self, *args, **options):
+        while True:
+            counts = process_pending_events(limit=options['limit'])
+            if counts:
+                summary = ', '.join(f'{status}: {count}' for status, count in sorted(counts.items()))
+                self.stdout.write(self.style.SUCCESS(f'Processed payment events ({summary})'))
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,71 @@
+import csv
+import json
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from orders.payments.client import build_paystack_client
+from orders.payments.reconcile import reconcile_pending_payments
+
+REPORT_FIELDS = ['order_id', 'order_number', 'total', 'gateway_status', 'amount', 'outcome', 'detail']
+
+
+class Command(BaseCommand):
+    help = 'Verify orders stuck in pending payment against the gateway and apply the results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Concurrent verification requests.')
+        parser.add_argument('--older-than', type=int, default=15, metavar='MINUTES',
+                            help='Only check orders created at least this long ago.')
+        parser.add_argument('--limit', type=int, help='Maximum number of orders to check.')
+        parser.add_argument('--base-url', help='Gateway base URL, e.g. a local payment stub.')
+        parser.add_argument('--dry-run', action='store_true', help='Verify without writing anything.')
+        parser.add_argument('--report', help='Write a per-order report to this .csv or .json file.')
+
+    def handle(self, *args, **options):
+        overrides = {'pool_size': options['workers']}
+        if options['base_url']:
+            overrides['base_url'] = options['base_url']
+        client = build_paystack_client(**overrides)
+
+        started = time.monotonic()
+        rows = []
+        counts = Counter()
+        for result in reconcile_pending_payments(
+            client,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            older_than=timedelta(minutes=options['older_than']),
+            limit=options['limit'],
+            dry_run=options['dry_run'],
+        ):
+            counts[result.outcome] += 1
+            if options['report'] or result.outcome in ('amount_mismatch', 'error'):
+                rows.append(result.as_row())
+
+        if options['report']:
+            self._write_report(options['report'], rows)
+        else:
+            for row in rows:
+                self.stdout.write(self.style.WARNING(f"{row['order_number']}: {row['outcome']} {row['detail']}"))
+
+        elapsed = time.monotonic() - started
+        summary = ', '.join(f'{outcome}: {count}' for outcome, count in sorted(counts.items())) or 'nothing to do'
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}checked {sum(counts.values())} orders in {elapsed:.1f}s ({summary})'
+        ))
+
+    def _write_report(self, path, rows):
+        with open(path, 'w', newline='') as handle:
+            if path.endswith('.json'):
+                json.dump(rows, handle, indent=2)
+            else:
+                writer = csv.DictWriter(handle, fieldnames=REPORT_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+        self.stdout.write(f'Report written to {path}')
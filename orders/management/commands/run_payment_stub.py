@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.payments.stub import serve
+
+
+class Command(BaseCommand):
+    help = 'Run a local Paystack stub so checkout and verification work offline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--outcome', default='success', choices=['success', 'failed', 'abandoned'],
+                            help='Status given to transactions when the checkout page is visited.')
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='Seconds to wait before answering API calls.')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Fraction of API calls answered with HTTP 503.')
+        parser.add_argument('--verify-unknown', action='store_true',
+                            help='Report unknown references as settled instead of not found.')
+        parser.add_argument('--webhook-url',
+                            help='Post signed charge.success events here, e.g. '
+                                 'http://127.0.0.1:8000/orders/pay/paystack/webhook/')
+
+    def handle(self, *args, **options):
+        server = serve(
+            host=options['host'],
+            port=options['port'],
+            outcome=options['outcome'],
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            verify_unknown=options['verify_unknown'],
+            webhook_url=options['webhook_url'],
+            secret_key=settings.PAYSTACK_SECRET_KEY,
+        )
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(
+            f'Payment stub listening on http://{host}:{port} '
+            f'(set PAYSTACK_BASE_URL=http://{host}:{port})'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-19 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_alter_orderitem_options_remove_orderitem_price_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gateway', models.CharField(choices=[('paystack', 'Paystack'), ('flutterwave', 'Flutterwave'), ('bank_transfer', 'Bank Transfer'), ('cash', 'Cash')], max_length=20)),
+                ('event_type', models.CharField(max_length=50)),
+                ('reference', models.CharField(max_length=100)),
+                ('source', models.CharField(choices=[('webhook', 'Webhook'), ('callback', 'Callback')], default='webhook', max_length=20)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='orders_paym_status_2f6867_idx'), models.Index(fields=['reference'], name='orders_paym_referen_647c49_idx')],
+                'unique_together': {('gateway', 'event_type', 'reference')},
+            },
+        ),
+    ]
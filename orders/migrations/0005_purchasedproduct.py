@@ -0,0 +1,33 @@
+# Generated by Django 4.2.11 on 2026-10-19 07:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_product_rating_sums'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('orders', '0004_archivedorder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchasedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('first_purchased_at', models.DateTimeField()),
+                ('last_purchased_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='store.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchased_products', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_purchased_at'], name='orders_purc_user_id_610a20_idx')],
+                'unique_together': {('user', 'product')},
+            },
+        ),
+    ]
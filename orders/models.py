@@ -2,12 +2,14 @@ from django.db import models
 from store.models import Product
 from django.conf import settings
 from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django_countries.fields import CountryField
 import uuid
 from decimal import Decimal
+from aniscents.tracking import TrackedFieldsMixin
 
-class Order(models.Model):
+class Order(TrackedFieldsMixin, models.Model):
 	"""Main order model."""
 	STATUS_CHOICES = (
 		('pending', 'Pending'),
@@ -35,6 +37,8 @@ class Order(models.Model):
 		('express', 'Express Delivery (2 days - Lagos/Benin/Warri)'),
 		('pickup', 'Store Pickup'),
 	)
+	# Fields whose transitions fire hooks (see orders.transitions)
+	tracked_fields = ('status', 'payment_status')
 	# Order identification
 	order_number = models.CharField(max_length=20, unique=True, editable=False)
 	user = models.ForeignKey(
@@ -263,6 +267,20 @@ class OrderItem(models.Model):
 			return f"{self.product_name} - {self.variant_name}"
 		return self.product_name
 
+class PurchasedProduct(models.Model):
+	"""A product a customer has received in a delivered order (see orders.purchases)."""
+	user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='purchased_products')
+	product = models.ForeignKey('store.Product', on_delete=models.CASCADE, related_name='purchases')
+	order_count = models.PositiveIntegerField(default=0)
+	quantity = models.PositiveIntegerField(default=0)
+	first_purchased_at = models.DateTimeField()
+	last_purchased_at = models.DateTimeField()
+	class Meta:
+		unique_together = ['user', 'product']
+		indexes = [models.Index(fields=['user', '-last_purchased_at'])]
+	def __str__(self):
+		return f"{self.user_id} bought {self.product_id} x{self.quantity}"
+
 class OrderNote(models.Model):
 	"""Internal notes for orders."""
 	NOTE_TYPE_CHOICES = (
@@ -495,3 +513,66 @@ class Payment(models.Model):
     
 	class Meta:
 		ordering = ['-created_at']
+
+class PaymentEvent(models.Model):
+	"""Gateway notification stored on receipt and applied later by a worker."""
+	STATUS_CHOICES = (
+		('pending', 'Pending'),
+		('processed', 'Processed'),
+		('ignored', 'Ignored'),
+		('failed', 'Failed'),
+	)
+	SOURCE_CHOICES = (
+		('webhook', 'Webhook'),
+		('callback', 'Callback'),
+	)
+	gateway = models.CharField(max_length=20, choices=Payment.PAYMENT_GATEWAY_CHOICES)
+	event_type = models.CharField(max_length=50)
+	reference = models.CharField(max_length=100)
+	source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='webhook')
+	payload = models.JSONField(default=dict, blank=True)
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+	attempts = models.PositiveIntegerField(default=0)
+	last_error = models.TextField(blank=True)
+	received_at = models.DateTimeField(auto_now_add=True)
+	processed_at = models.DateTimeField(null=True, blank=True)
+	class Meta:
+		ordering = ['received_at']
+		unique_together = ['gateway', 'event_type', 'reference']
+		indexes = [
+			models.Index(fields=['status', 'received_at']),
+			models.Index(fields=['reference']),
+		]
+	def __str__(self):
+		return f"{self.gateway} {self.event_type} {self.reference} ({self.get_status_display()})"
+
+class ArchivedOrder(models.Model):
+	"""Completed order moved out of the live order tables (see orders.archive)."""
+	order_id = models.BigIntegerField(unique=True)
+	order_number = models.CharField(max_length=20, unique=True)
+	user = models.ForeignKey(
+		settings.AUTH_USER_MODEL,
+		on_delete=models.SET_NULL,
+		null=True,
+		blank=True,
+		related_name='archived_orders'
+	)
+	status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+	payment_status = models.CharField(max_length=20, choices=Order.PAYMENT_STATUS_CHOICES)
+	customer_email = models.EmailField()
+	total = models.DecimalField(max_digits=10, decimal_places=2)
+	created_at = models.DateTimeField()
+	archived_at = models.DateTimeField(auto_now_add=True)
+	# Field-by-field snapshots of the order and its related rows
+	order_data = models.JSONField(encoder=DjangoJSONEncoder)
+	items = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+	notes = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+	payments = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+	class Meta:
+		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['user', 'created_at']),
+			models.Index(fields=['created_at']),
+		]
+	def __str__(self):
+		return f"Archived order #{self.order_number} - {self.customer_email}"
@@ -0,0 +1,200 @@
+"""
+HTTP clients for payment gateways.
+
+Each gateway gets one long-lived ``requests.Session`` so connections (and
+their TLS sessions) are kept alive and reused across requests. Calls use
+bounded timeouts, idempotent calls are retried with jittered exponential
+backoff, and a circuit breaker stops hammering a gateway that keeps failing.
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """Raised when a gateway call fails or returns an unusable response."""
+
+
+class CircuitOpenError(GatewayError):
+    """Raised when calls are short-circuited after repeated failures."""
+
+
+class CircuitBreaker:
+    """
+    Open after ``failure_threshold`` consecutive failures and reject calls for
+    ``reset_timeout`` seconds. After that a single trial call is let through
+    while every other caller is still rejected; its success closes the
+    circuit and its failure opens it again. A trial that never reports back
+    is replaced by another one after ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            waiting = now - self._opened_at < self.reset_timeout
+            trial_running = (
+                self._trial_started_at is not None and now - self._trial_started_at < self.reset_timeout
+            )
+            if waiting or trial_running:
+                raise CircuitOpenError('Payment gateway is temporarily unavailable.')
+            # Half-open: this caller is the trial.
+            self._trial_started_at = now
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_started_at is not None:
+                self._trial_started_at = None
+                self._opened_at = time.monotonic()
+                logger.warning('Payment gateway trial call failed; circuit reopened')
+            elif self._failures >= self.failure_threshold and self._opened_at is None:
+                self._opened_at = time.monotonic()
+                logger.warning('Payment gateway circuit opened after %s failures', self._failures)
+
+
+class GatewayClient:
+    """Pooled, retrying JSON client for a single gateway base URL."""
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, base_url, secret_key='', connect_timeout=3.05, read_timeout=10,
+                 max_retries=2, backoff=0.5, pool_size=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {secret_key}',
+            'Content-Type': 'application/json',
+        })
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter keeps concurrent retries from synchronising.
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def request(self, method, path, idempotent=None, **kwargs):
+        """
+        Send a request and return the response.
+
+        Only idempotent requests are retried. Connection errors, timeouts,
+        429 and 5xx responses count as failures; other responses are returned
+        to the caller as-is.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in self.IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        error = cause = None
+        for attempt in range(attempts):
+            self.breaker.before_call()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as exc:
+                error, cause = f'{method} {path} failed: {exc}', exc
+            else:
+                if response.status_code < 500 and response.status_code != 429:
+                    self.breaker.record_success()
+                    return response
+                error, cause = f'{method} {path} returned HTTP {response.status_code}', None
+            self.breaker.record_failure()
+            if attempt + 1 < attempts:
+                self._sleep_before_retry(attempt)
+        raise GatewayError(error) from cause
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+class PaystackClient(GatewayClient):
+    """Paystack transaction API."""
+
+    def _data(self, response):
+        try:
+            payload = response.json()
+        except ValueError as exc:
+            raise GatewayError('Paystack returned an invalid response.') from exc
+        if response.status_code != 200 or not payload.get('status'):
+            raise GatewayError(payload.get('message') or f'Paystack returned HTTP {response.status_code}')
+        return payload.get('data') or {}
+
+    def initialize_transaction(self, email, amount, reference, callback_url, metadata=None):
+        """Start a transaction; ``amount`` is in kobo. Returns the ``data`` payload."""
+        response = self.post('transaction/initialize', json={
+            'email': email,
+            'amount': amount,
+            'reference': reference,
+            'callback_url': callback_url,
+            'metadata': metadata or {},
+        })
+        return self._data(response)
+
+    def verify_transaction(self, reference):
+        """Look up a transaction by reference. Returns the ``data`` payload."""
+        return self._data(self.get(f'transaction/verify/{reference}'))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def build_paystack_client(**overrides):
+    """Create a Paystack client from settings, with optional keyword overrides."""
+    options = {
+        'base_url': settings.PAYSTACK_BASE_URL,
+        'secret_key': settings.PAYSTACK_SECRET_KEY,
+        'connect_timeout': settings.PAYMENT_GATEWAY_CONNECT_TIMEOUT,
+        'read_timeout': settings.PAYMENT_GATEWAY_READ_TIMEOUT,
+        'max_retries': settings.PAYMENT_GATEWAY_MAX_RETRIES,
+        'pool_size': settings.PAYMENT_GATEWAY_POOL_SIZE,
+    }
+    options.update(overrides)
+    if 'breaker' not in options:
+        options['breaker'] = CircuitBreaker(
+            failure_threshold=settings.PAYMENT_GATEWAY_CIRCUIT_THRESHOLD,
+            reset_timeout=settings.PAYMENT_GATEWAY_CIRCUIT_RESET,
+        )
+    return PaystackClient(**options)
+
+
+def get_paystack_client():
+    """Return the process-wide Paystack client, creating it on first use."""
+    with _clients_lock:
+        client = _clients.get('paystack')
+        if client is None:
+            client = _clients['paystack'] = build_paystack_client()
+        return client
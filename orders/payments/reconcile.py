@@ -0,0 +1,136 @@
+"""
+Batch reconciliation of orders left with ``payment_status='pending'``.
+
+Orders are read in keyset-paginated chunks, verified against the gateway
+concurrently, and the results for each chunk are written with bulk
+statements. Transition hooks still run for every order whose status
+changed, as they would after a regular save.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from orders.models import Order, Payment
+from orders.transitions import dispatch_transitions
+from .client import GatewayError
+from .webhooks import charged_amount, payment_defaults
+
+ORDER_FIELDS = ['payment_status', 'status', 'transaction_id', 'payment_reference', 'paid_at', 'confirmed_at', 'updated_at']
+
+
+@dataclass
+class ReconciliationResult:
+    order_id: int
+    order_number: str
+    total: object
+    gateway_status: str = ''
+    amount: object = None
+    outcome: str = 'unchanged'
+    detail: str = ''
+    data: dict = field(default_factory=dict, repr=False)
+
+    def as_row(self):
+        return {
+            'order_id': self.order_id,
+            'order_number': self.order_number,
+            'total': str(self.total),
+            'gateway_status': self.gateway_status,
+            'amount': '' if self.amount is None else str(self.amount),
+            'outcome': self.outcome,
+            'detail': self.detail,
+        }
+
+
+def _verify(client, order):
+    result = ReconciliationResult(order.id, order.order_number, order.total)
+    try:
+        data = client.verify_transaction(order.order_number)
+    except GatewayError as exc:
+        result.outcome, result.detail = 'error', str(exc)
+        return result
+    result.data = data
+    result.gateway_status = data.get('status') or ''
+    result.amount = charged_amount(data)
+    if result.gateway_status == 'success':
+        if result.amount < order.total:
+            result.outcome = 'amount_mismatch'
+            result.detail = f'Charged {result.amount} but order total is {order.total}'
+        else:
+            result.outcome = 'paid'
+    elif result.gateway_status == 'failed':
+        result.outcome = 'failed'
+    return result
+
+
+def _apply(orders, results, gateway):
+    """Write one chunk's outcomes and return the orders that were changed."""
+    now = timezone.now()
+    by_id = {order.id: order for order in orders}
+    actionable = [r for r in results if r.outcome in ('paid', 'failed')]
+    if not actionable:
+        return []
+    with transaction.atomic():
+        # Skip orders a webhook or callback settled while we were verifying.
+        still_pending = set(
+            Order.objects.select_for_update()
+            .filter(pk__in=[r.order_id for r in actionable], payment_status='pending')
+            .values_list('pk', flat=True)
+        )
+        changed, payments = [], []
+        for result in actionable:
+            if result.order_id not in still_pending:
+                result.outcome, result.detail = 'unchanged', 'Settled concurrently'
+                continue
+            order = by_id[result.order_id]
+            if result.outcome == 'paid':
+                order.payment_status = 'paid'
+                order.transaction_id = result.order_number
+                order.payment_reference = str(result.data.get('id', ''))
+                order.paid_at = parse_datetime(result.data.get('paid_at') or '') or now
+                if order.status == 'pending':
+                    order.status = 'confirmed'
+                    order.confirmed_at = now
+                status = 'successful'
+            else:
+                order.payment_status = 'failed'
+                status = 'failed'
+            order.updated_at = now
+            changed.append(order)
+            payments.append(Payment(
+                order=order,
+                payment_gateway=gateway,
+                gateway_reference=result.order_number,
+                **payment_defaults(result.data, status),
+            ))
+        Order.objects.bulk_update(changed, ORDER_FIELDS)
+        Payment.objects.bulk_create(payments)
+    return changed
+
+
+def reconcile_pending_payments(client, chunk_size=200, workers=8, older_than=None, limit=None,
+                               dry_run=False, gateway='paystack'):
+    """
+    Verify pending orders for ``gateway`` and yield a ``ReconciliationResult``
+    per order. With ``dry_run`` nothing is written.
+    """
+    queryset = Order.objects.filter(payment_status='pending', payment_method=gateway)
+    if older_than is not None:
+        queryset = queryset.filter(created_at__lt=timezone.now() - older_than)
+    queryset = queryset.only('id', 'order_number', 'total', *ORDER_FIELDS).order_by('id')
+    last_id, seen = 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while limit is None or seen < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - seen)
+            orders = list(queryset.filter(id__gt=last_id)[:size])
+            if not orders:
+                break
+            last_id, seen = orders[-1].id, seen + len(orders)
+            results = list(executor.map(lambda order: _verify(client, order), orders))
+            if not dry_run:
+                for order in _apply(orders, results, gateway):
+                    dispatch_transitions(order, order.tracked_changes())
+                    order.reset_tracking()
+            yield from results
@@ -0,0 +1,172 @@
+"""
+Local stand-in for the Paystack transaction API.
+
+Used for offline development and load tests of the full checkout flow:
+run ``python manage.py run_payment_stub`` and point ``PAYSTACK_BASE_URL`` at
+it. ``/transaction/initialize`` returns an authorization URL on the stub;
+visiting it settles the transaction and redirects back to the shop's
+callback URL, after which ``/transaction/verify/<reference>`` reports the
+outcome. Given a webhook URL and secret, settled transactions are also
+posted there as signed ``charge.success`` events.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlparse, parse_qs
+from urllib.request import Request, urlopen
+
+
+class StubGateway:
+    """In-memory transaction store shared by the stub's request handlers."""
+
+    def __init__(self, outcome='success', latency=0.0, error_rate=0.0, verify_unknown=False,
+                 webhook_url=None, secret_key=''):
+        self.outcome = outcome
+        self.webhook_url = webhook_url
+        self.secret_key = secret_key
+        self.latency = latency
+        self.error_rate = error_rate
+        self.verify_unknown = verify_unknown
+        self.transactions = {}
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def initialize(self, payload, base_url):
+        reference = payload.get('reference') or f'stub-{time.time_ns()}'
+        with self._lock:
+            if reference in self.transactions:
+                return 400, {'status': False, 'message': 'Duplicate Transaction Reference'}
+            self.transactions[reference] = {
+                'id': self._next_id,
+                'reference': reference,
+                'amount': payload.get('amount', 0),
+                'email': payload.get('email', ''),
+                'callback_url': payload.get('callback_url', ''),
+                'metadata': payload.get('metadata', {}),
+                'status': 'abandoned',
+                'paid_at': None,
+            }
+            self._next_id += 1
+        return 200, {
+            'status': True,
+            'message': 'Authorization URL created',
+            'data': {
+                'authorization_url': f'{base_url}/checkout/{reference}',
+                'access_code': reference,
+                'reference': reference,
+            },
+        }
+
+    def settle(self, reference, outcome=None):
+        with self._lock:
+            transaction = self.transactions.get(reference)
+            if transaction is None:
+                return None
+            transaction['status'] = outcome or self.outcome
+            if transaction['status'] == 'success':
+                transaction['paid_at'] = datetime.now(timezone.utc).isoformat()
+            transaction = dict(transaction)
+        if transaction['status'] == 'success' and self.webhook_url:
+            threading.Thread(target=self.send_webhook, args=('charge.success', transaction), daemon=True).start()
+        return transaction
+
+    def send_webhook(self, event, transaction):
+        body = json.dumps({'event': event, 'data': {**transaction, 'currency': 'NGN'}}).encode()
+        signature = hmac.new(self.secret_key.encode(), body, hashlib.sha512).hexdigest()
+        request = Request(self.webhook_url, data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'X-Paystack-Signature': signature,
+        })
+        try:
+            urlopen(request, timeout=10).close()
+        except OSError:
+            pass
+
+    def verify(self, reference):
+        with self._lock:
+            transaction = self.transactions.get(reference)
+            if transaction is None and self.verify_unknown:
+                transaction = {
+                    'id': 0, 'reference': reference, 'amount': 0, 'metadata': {},
+                    'status': self.outcome, 'paid_at': datetime.now(timezone.utc).isoformat(),
+                }
+        if transaction is None:
+            return 400, {'status': False, 'message': 'Transaction reference not found'}
+        data = {key: transaction[key] for key in ('id', 'reference', 'amount', 'status', 'paid_at', 'metadata')}
+        data.update({'currency': 'NGN', 'channel': 'card', 'gateway_response': data['status'].title()})
+        return 200, {'status': True, 'message': 'Verification successful', 'data': data}
+
+
+def make_handler(gateway):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _base_url(self):
+            return f'http://{self.headers.get("Host") or "%s:%s" % self.server.server_address}'
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _simulate_network(self):
+            if gateway.latency:
+                time.sleep(gateway.latency)
+            if gateway.error_rate and random.random() < gateway.error_rate:
+                self._send_json(503, {'status': False, 'message': 'Simulated gateway error'})
+                return False
+            return True
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._send_json(400, {'status': False, 'message': 'Invalid JSON'})
+            if not self._simulate_network():
+                return
+            if urlparse(self.path).path.rstrip('/') == '/transaction/initialize':
+                return self._send_json(*gateway.initialize(payload, self._base_url()))
+            self._send_json(404, {'status': False, 'message': 'Not found'})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            if parts[:2] == ['transaction', 'verify'] and len(parts) == 3:
+                if not self._simulate_network():
+                    return
+                return self._send_json(*gateway.verify(parts[2]))
+            if parts[0] == 'checkout' and len(parts) == 2:
+                outcome = parse_qs(url.query).get('outcome', [None])[0]
+                transaction = gateway.settle(parts[1], outcome)
+                if transaction is None:
+                    return self._send_json(404, {'status': False, 'message': 'Transaction not found'})
+                query = urlencode({'trxref': parts[1], 'reference': parts[1]})
+                self.send_response(302)
+                self.send_header('Location', f"{transaction['callback_url']}?{query}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self._send_json(404, {'status': False, 'message': 'Not found'})
+
+    return StubHandler
+
+
+def serve(host='127.0.0.1', port=8765, **options):
+    """Run the stub gateway until interrupted."""
+    gateway = StubGateway(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(gateway))
+    server.daemon_threads = True
+    server.gateway = gateway
+    return server
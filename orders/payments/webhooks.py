@@ -0,0 +1,197 @@
+"""
+Durable, idempotent payment confirmation.
+
+Webhooks (and callbacks that still need confirming) are stored as
+``PaymentEvent`` rows as soon as they arrive; ``process_pending_events``
+applies them later. Events are unique per gateway, type and reference, and
+applying a successful charge to an order that is already paid is a no-op, so
+redelivered webhooks and repeated worker runs are harmless.
+"""
+import hashlib
+import hmac
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from orders.models import Order, Payment, PaymentEvent
+from .client import GatewayError, get_paystack_client
+
+logger = logging.getLogger(__name__)
+
+VERIFY_EVENT = 'verify'
+
+
+class EventError(Exception):
+    """Raised when an event cannot be applied and should not be retried."""
+
+
+def verify_paystack_signature(body, signature):
+    """Check the ``X-Paystack-Signature`` HMAC-SHA512 of a webhook body."""
+    secret = settings.PAYSTACK_SECRET_KEY
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def record_event(gateway, event_type, reference, payload=None, source='webhook'):
+    """Store an event unless an identical one is already recorded. Returns ``(event, created)``."""
+    try:
+        with transaction.atomic():
+            event = PaymentEvent.objects.create(
+                gateway=gateway,
+                event_type=event_type,
+                reference=reference,
+                payload=payload or {},
+                source=source,
+            )
+        return event, True
+    except IntegrityError:
+        event = PaymentEvent.objects.get(gateway=gateway, event_type=event_type, reference=reference)
+        return event, False
+
+
+def charged_amount(data):
+    """Amount of a gateway transaction in naira (Paystack reports kobo)."""
+    return Decimal(data.get('amount') or 0) / 100
+
+
+def payment_defaults(data, status):
+    """Field values for the ``Payment`` row recording a gateway transaction."""
+    authorization = data.get('authorization') or {}
+    return {
+        'amount': charged_amount(data),
+        'currency': data.get('currency') or 'NGN',
+        'status': status,
+        'gateway_response': data,
+        'card_last4': authorization.get('last4') or '',
+        'card_brand': authorization.get('brand') or '',
+        'bank_name': authorization.get('bank') or '',
+    }
+
+
+def apply_successful_charge(reference, data, gateway='paystack'):
+    """
+    Mark the order for ``reference`` as paid and record the payment.
+
+    Returns ``False`` if the order was already paid. Must run inside a
+    transaction.
+    """
+    order = Order.objects.select_for_update().filter(order_number=reference).first()
+    if order is None:
+        raise EventError(f'No order with reference {reference}')
+    if order.is_paid:
+        return False
+    amount = charged_amount(data)
+    if amount < order.total:
+        raise EventError(f'Charged {amount} but order total is {order.total}')
+    Payment.objects.update_or_create(
+        order=order,
+        payment_gateway=gateway,
+        gateway_reference=reference,
+        defaults=payment_defaults(data, 'successful'),
+    )
+    order.payment_reference = str(data.get('id', ''))
+    order.mark_as_paid(gateway, transaction_id=reference)
+    return True
+
+
+def apply_failed_charge(reference, data, gateway='paystack'):
+    """Record a failed charge without touching an order that is already paid."""
+    order = Order.objects.select_for_update().filter(order_number=reference).first()
+    if order is None or order.is_paid:
+        return False
+    Payment.objects.update_or_create(
+        order=order,
+        payment_gateway=gateway,
+        gateway_reference=reference,
+        defaults=payment_defaults(data, 'failed'),
+    )
+    order.payment_status = 'failed'
+    order.save(update_fields=['payment_status', 'updated_at'])
+    return True
+
+
+def _webhook_data(event):
+    return event.payload.get('data') or {}
+
+
+def _verify_transaction(event):
+    return get_paystack_client().verify_transaction(event.reference)
+
+
+def _handle_charge_success(event, data):
+    apply_successful_charge(event.reference, data, event.gateway)
+    return 'processed'
+
+
+def _handle_verify(event, data):
+    if data.get('status') == 'success':
+        apply_successful_charge(event.reference, data, event.gateway)
+        return 'processed'
+    if data.get('status') == 'failed':
+        apply_failed_charge(event.reference, data, event.gateway)
+        return 'processed'
+    # Still abandoned/ongoing: leave pending so a later run checks again.
+    return 'pending'
+
+
+# event type -> (fetch the transaction data, apply it to the order)
+HANDLERS = {
+    'charge.success': (_webhook_data, _handle_charge_success),
+    VERIFY_EVENT: (_verify_transaction, _handle_verify),
+}
+
+
+def process_event(event):
+    """
+    Apply one pending event and return its new status. Gateway calls are made
+    before the event and its order are locked, so no transaction stays open
+    across the network round trip.
+    """
+    fetch, handler = HANDLERS.get(event.event_type, (None, None))
+    data = error = None
+    if handler is not None and event.status == 'pending':
+        try:
+            data = fetch(event)
+        except GatewayError as exc:
+            error = exc
+    with transaction.atomic():
+        event = PaymentEvent.objects.select_for_update().get(pk=event.pk)
+        if event.status != 'pending':
+            return event.status
+        event.attempts += 1
+        if handler is None:
+            event.status = 'ignored'
+        elif error is not None:
+            event.last_error = str(error)
+            if event.attempts >= settings.PAYMENT_EVENT_MAX_ATTEMPTS:
+                event.status = 'failed'
+        else:
+            try:
+                with transaction.atomic():
+                    event.status = handler(event, data)
+                event.last_error = ''
+            except EventError as exc:
+                event.status, event.last_error = 'failed', str(exc)
+        if event.status == 'pending' and event.attempts >= settings.PAYMENT_EVENT_MAX_ATTEMPTS:
+            event.status = 'ignored'
+        if event.status != 'pending':
+            event.processed_at = timezone.now()
+        event.save(update_fields=['status', 'attempts', 'last_error', 'processed_at'])
+    if event.status == 'failed':
+        logger.warning('Payment event %s failed: %s', event, event.last_error)
+    return event.status
+
+
+def process_pending_events(limit=100):
+    """Process up to ``limit`` pending events, oldest first. Returns counts per outcome."""
+    counts = {}
+    events = PaymentEvent.objects.filter(status='pending').order_by('received_at')[:limit]
+    for event in list(events):
+        status = process_event(event)
+        counts[status] = counts.get(status, 0) + 1
+    return counts
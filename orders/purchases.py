@@ -0,0 +1,161 @@
+"""
+Index of the products each customer has received.
+
+A ``PurchasedProduct`` row exists for every ``(user, product)`` pair found in
+a delivered order, live or archived. Rows are recomputed for the customer
+and the order's products whenever an order moves to or away from
+``delivered``, so checks such as "may this customer leave a verified
+review" are a single indexed lookup instead of a join over order history.
+``backfill`` rebuilds the whole index in keyset-paginated chunks.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Min, Sum
+
+from .models import ArchivedOrder, OrderItem, PurchasedProduct
+
+DELIVERED = 'delivered'
+
+
+def compute_purchases(user_ids, product_ids=None):
+    """Unsaved ``PurchasedProduct`` rows for ``user_ids``, optionally limited to ``product_ids``."""
+    user_ids = set(user_ids)
+    product_ids = None if product_ids is None else set(product_ids)
+    figures = defaultdict(lambda: {'orders': set(), 'quantity': 0, 'first': None, 'last': None})
+
+    def add(user_id, product_id, order_id, quantity, created_at):
+        entry = figures[user_id, product_id]
+        entry['orders'].add(order_id)
+        entry['quantity'] += quantity
+        entry['first'] = min(filter(None, (entry['first'], created_at)))
+        entry['last'] = max(filter(None, (entry['last'], created_at)))
+
+    items = OrderItem.objects.filter(
+        order__user_id__in=user_ids, order__status=DELIVERED, product__isnull=False,
+    )
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+    rows = (
+        items.order_by()
+        .values('order__user_id', 'product_id', 'order_id')
+        .annotate(quantity=Sum('quantity'), created_at=Min('order__created_at'))
+    )
+    for row in rows:
+        add(row['order__user_id'], row['product_id'], row['order_id'], row['quantity'], row['created_at'])
+    archived = ArchivedOrder.objects.filter(user_id__in=user_ids, status=DELIVERED).values_list(
+        'user_id', 'order_id', 'created_at', 'items',
+    )
+    for user_id, order_id, created_at, order_items in archived.iterator():
+        for item in order_items:
+            product_id = item.get('product_id')
+            if product_id and (product_ids is None or product_id in product_ids):
+                add(user_id, product_id, order_id, item.get('quantity') or 0, created_at)
+    return [
+        PurchasedProduct(
+            user_id=user_id,
+            product_id=product_id,
+            order_count=len(entry['orders']),
+            quantity=entry['quantity'],
+            first_purchased_at=entry['first'],
+            last_purchased_at=entry['last'],
+        )
+        for (user_id, product_id), entry in figures.items()
+    ]
+
+
+def refresh_purchases(user_ids, product_ids=None):
+    """
+    Recompute the index rows of ``user_ids`` (for ``product_ids`` only, if
+    given), removing pairs no longer backed by a delivered order. Returns
+    rows written.
+    """
+    from store.models import Product
+
+    rows = compute_purchases(user_ids, product_ids)
+    # Archived snapshots may name products deleted since.
+    existing = set(Product.objects.filter(pk__in={row.product_id for row in rows}).values_list('pk', flat=True))
+    rows = [row for row in rows if row.product_id in existing]
+    kept = {(row.user_id, row.product_id) for row in rows}
+    indexed = PurchasedProduct.objects.filter(user_id__in=set(user_ids))
+    if product_ids is not None:
+        indexed = indexed.filter(product_id__in=set(product_ids))
+    with transaction.atomic():
+        stale = [pk for pk, user_id, product_id in indexed.values_list('pk', 'user_id', 'product_id')
+                 if (user_id, product_id) not in kept]
+        if stale:
+            PurchasedProduct.objects.filter(pk__in=stale).delete()
+        PurchasedProduct.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user', 'product'],
+            update_fields=['order_count', 'quantity', 'first_purchased_at', 'last_purchased_at'],
+        )
+    return len(rows)
+
+
+def order_delivery_changed(order, old_status, new_status):
+    """Transition hook: reindex the products of ``order`` for its customer."""
+    if order.user_id:
+        product_ids = order.items.filter(product__isnull=False).values_list('product_id', flat=True)
+        refresh_purchases([order.user_id], list(product_ids))
+
+
+def purchased_product_ids(user):
+    """Ids of every product ``user`` has received, loaded once per user instance."""
+    if not getattr(user, 'is_authenticated', False):
+        return frozenset()
+    ids = getattr(user, '_purchased_product_ids', None)
+    if ids is None:
+        ids = user._purchased_product_ids = frozenset(
+            PurchasedProduct.objects.filter(user=user).values_list('product_id', flat=True)
+        )
+    return ids
+
+
+def has_purchased(user_id, product_id):
+    """Whether the user has received the product in a delivered order."""
+    return PurchasedProduct.objects.filter(user_id=user_id, product_id=product_id).exists()
+
+
+def annotate_purchased(products, user):
+    """Set ``purchased`` on each of ``products`` for ``user`` with at most one query."""
+    products = list(products)
+    if not getattr(user, 'is_authenticated', False):
+        bought = frozenset()
+    elif getattr(user, '_purchased_product_ids', None) is not None:
+        bought = user._purchased_product_ids
+    else:
+        bought = set(
+            PurchasedProduct.objects.filter(user=user, product__in=[product.pk for product in products])
+            .values_list('product_id', flat=True)
+        )
+    for product in products:
+        product.purchased = product.pk in bought
+    return products
+
+
+def buy_again(user, limit=4):
+    """Available products ``user`` has bought, most recently bought first."""
+    from store.models import Product
+
+    return (
+        Product.objects.filter(purchases__user=user, is_available=True)
+        .prefetch_related('images')
+        .order_by('-purchases__last_purchased_at')[:limit]
+    )
+
+
+def backfill(chunk_size=500):
+    """Rebuild the index for every customer. Yields the rows written per chunk."""
+    from accounts.models import User
+
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return
+        last_id = user_ids[-1]
+        yield refresh_purchases(user_ids)
@@ -0,0 +1,202 @@
+"""
+Shipping and tax rating from the ``ShippingRate`` and ``TaxRate`` tables.
+
+Active rates are loaded once into an immutable ``RateTable`` kept in process
+memory, so pricing a cart queries nothing. Saving or deleting a rate
+replaces a version token in the shared cache; each process reads that token
+at most once every ``CHECK_INTERVAL`` seconds and reloads its table when the
+token has changed, so other processes pick up new rates within that delay.
+"""
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from types import MappingProxyType
+import threading
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'orders:rates:version'
+CHECK_INTERVAL = 5  # seconds between reads of the shared version token
+WILDCARD = '*'
+CENTS = Decimal('0.01')
+
+# Used for methods with no matching ShippingRate row.
+DEFAULT_SHIPPING = {
+    'standard': (Decimal('2500'), 3, 5),
+    'express': (Decimal('5000'), 1, 2),
+    'pickup': (Decimal('0'), 0, 1),
+}
+
+
+@dataclass(frozen=True)
+class ShippingEntry:
+    rate: Decimal
+    minimum_order_amount: Decimal
+    free_shipping_threshold: Decimal
+    days_min: int
+    days_max: int
+
+    def fee(self, subtotal):
+        if self.free_shipping_threshold is not None and subtotal >= self.free_shipping_threshold:
+            return Decimal('0')
+        return self.rate
+
+
+@dataclass(frozen=True)
+class Quote:
+    shipping_method: str
+    subtotal: Decimal
+    shipping_fee: Decimal
+    tax_rate: Decimal
+    tax_amount: Decimal
+    total: Decimal
+    days_min: int
+    days_max: int
+
+    def as_dict(self):
+        return {
+            'shipping_method': self.shipping_method,
+            'subtotal': str(self.subtotal),
+            'shipping_fee': str(self.shipping_fee),
+            'tax_rate': str(self.tax_rate),
+            'tax_amount': str(self.tax_amount),
+            'total': str(self.total),
+            'days_min': self.days_min,
+            'days_max': self.days_max,
+        }
+
+
+_STATE_ALIASES = {}
+
+
+def normalize_state(state):
+    """Map free-text states ("Lagos State", "lagos", "LAG") to ``ShippingRate`` codes."""
+    if not _STATE_ALIASES:
+        from .models import ShippingRate
+        for code, label in ShippingRate.STATE_CHOICES:
+            _STATE_ALIASES[code.lower()] = code
+            _STATE_ALIASES[label.lower()] = code
+    value = (state or '').strip().lower()
+    if value.endswith(' state'):
+        value = value[:-len(' state')]
+    return _STATE_ALIASES.get(value, WILDCARD)
+
+
+class RateTable:
+    """Read-only view of the active shipping and tax rates."""
+
+    def __init__(self, shipping, tax):
+        # shipping: {(country, state, method): ShippingEntry}
+        # tax: {(country, state, city): Decimal percent}, lower-cased state/city
+        self._shipping = MappingProxyType(dict(shipping))
+        self._tax = MappingProxyType(dict(tax))
+
+    @classmethod
+    def load(cls):
+        from .models import ShippingRate, TaxRate
+        shipping = {
+            (country, state, method): ShippingEntry(rate, minimum or Decimal('0'), threshold, days_min, days_max)
+            for country, state, method, rate, minimum, threshold, days_min, days_max in
+            ShippingRate.objects.filter(is_active=True).values_list(
+                'country', 'state', 'shipping_method', 'rate', 'minimum_order_amount',
+                'free_shipping_threshold', 'estimated_days_min', 'estimated_days_max',
+            )
+        }
+        tax = {
+            (str(country).upper(), state.strip().lower(), city.strip().lower()): rate
+            for country, state, city, rate in
+            TaxRate.objects.filter(is_active=True).values_list('country', 'state', 'city', 'rate')
+        }
+        return cls(shipping, tax)
+
+    def shipping_entry(self, method, subtotal, country='NG', state=''):
+        """Most specific applicable rate for ``method``, falling back to wildcards."""
+        country = (country or '').upper()
+        state = normalize_state(state)
+        for key in ((country, state), (country, WILDCARD), (WILDCARD, state), (WILDCARD, WILDCARD)):
+            entry = self._shipping.get((*key, method))
+            if entry is not None and subtotal >= entry.minimum_order_amount:
+                return entry
+        default = DEFAULT_SHIPPING.get(method)
+        if default is None:
+            return None
+        rate, days_min, days_max = default
+        return ShippingEntry(rate, Decimal('0'), None, days_min, days_max)
+
+    def tax_rate(self, country='NG', state='', city=''):
+        """Percentage tax rate for the most specific matching location, or 0."""
+        country = (country or '').upper()
+        state = (state or '').strip().lower()
+        city = (city or '').strip().lower()
+        for key in ((country, state, city), (country, state, ''), (country, '', '')):
+            if key in self._tax:
+                return self._tax[key]
+        return Decimal('0')
+
+    def quote(self, subtotal, method, country='NG', state='', city=''):
+        """Shipping, tax and total for a cart subtotal; ``None`` for unknown methods."""
+        subtotal = Decimal(subtotal)
+        entry = self.shipping_entry(method, subtotal, country, state)
+        if entry is None:
+            return None
+        shipping_fee = entry.fee(subtotal)
+        tax_rate = self.tax_rate(country, state, city)
+        tax_amount = (subtotal * tax_rate / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+        return Quote(
+            shipping_method=method,
+            subtotal=subtotal,
+            shipping_fee=shipping_fee,
+            tax_rate=tax_rate,
+            tax_amount=tax_amount,
+            total=subtotal + shipping_fee + tax_amount,
+            days_min=entry.days_min,
+            days_max=entry.days_max,
+        )
+
+    def quotes(self, subtotal, country='NG', state='', city=''):
+        """Quotes for every shipping method, in ``Order.SHIPPING_METHOD_CHOICES`` order."""
+        from .models import Order
+        return [
+            self.quote(subtotal, method, country, state, city)
+            for method, _ in Order.SHIPPING_METHOD_CHOICES
+        ]
+
+
+_current = (None, None, 0.0)  # (version, RateTable, monotonic time of the last version check)
+_lock = threading.Lock()
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_rate_table():
+    """Return the current ``RateTable``, reloading it if the rates have changed."""
+    global _current
+    current_version, table, checked = _current
+    now = time.monotonic()
+    if table is not None and now - checked < CHECK_INTERVAL:
+        return table
+    version = _shared_version()
+    with _lock:
+        current_version, table, _ = _current
+        if table is None or current_version != version:
+            table = RateTable.load()
+        _current = (version, table, now)
+        return table
+
+
+def invalidate_rates():
+    """Make this process reload its rate table now and every other one within ``CHECK_INTERVAL``."""
+    global _current
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    _current = (None, None, 0.0)
+
+
+def quote(subtotal, method, country='NG', state='', city=''):
+    """Shortcut for ``get_rate_table().quote(...)``."""
+    return get_rate_table().quote(subtotal, method, country, state, city)
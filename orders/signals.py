@@ -1,7 +1,11 @@
 """Signal handlers for order-related events."""
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Order
+from .models import Order, ShippingRate, TaxRate
+from .purchases import order_delivery_changed
+from .rates import invalidate_rates
+from .transitions import on_transition, dispatch_transitions
 
 
 @receiver(post_save, sender=Order)
@@ -12,21 +16,38 @@ def order_created_handler(sender, instance, created, **kwargs):
         send_order_confirmation_email(instance)
 
 
-@receiver(pre_save, sender=Order)
-def order_status_changed_handler(sender, instance, **kwargs):
-    """Send emails when order status changes."""
-    if instance.pk:
-        try:
-            old_order = Order.objects.get(pk=instance.pk)
-            
-            # Check if status changed to shipped
-            if old_order.status != 'shipped' and instance.status == 'shipped':
-                from accounts.utils import send_order_shipped_email
-                send_order_shipped_email(instance)
-            
-            # Check if status changed to delivered
-            if old_order.status != 'delivered' and instance.status == 'delivered':
-                from accounts.utils import send_order_delivered_email
-                send_order_delivered_email(instance)
-        except Order.DoesNotExist:
-            pass
+@receiver(post_save, sender=Order)
+def order_status_changed_handler(sender, instance, created, update_fields=None, **kwargs):
+    """Fire transition hooks using the values captured when the order was loaded."""
+    if created:
+        return
+    dispatch_transitions(instance, instance.tracked_changes(fields=update_fields))
+
+
+@on_transition('shipped')
+def send_shipped_email(order, old_status, new_status):
+    """Send shipping notification when an order is shipped."""
+    from accounts.utils import send_order_shipped_email
+    send_order_shipped_email(order)
+
+
+@on_transition('delivered')
+def send_delivered_email(order, old_status, new_status):
+    """Send delivery confirmation when an order is delivered."""
+    from accounts.utils import send_order_delivered_email
+    send_order_delivered_email(order)
+
+
+# Keep the purchase index in step with deliveries, including reversals
+# such as a delivered order later marked refunded.
+on_transition('delivered', order_delivery_changed)
+for _status, _label in Order.STATUS_CHOICES:
+    if _status != 'delivered':
+        on_transition(_status, order_delivery_changed, from_value='delivered')
+
+
+@receiver([post_save, post_delete], sender=ShippingRate)
+@receiver([post_save, post_delete], sender=TaxRate)
+def rates_changed_handler(sender, **kwargs):
+    """Reload the in-memory rate table once the change is committed."""
+    transaction.on_commit(invalidate_rates)
@@ -0,0 +1,36 @@
+"""
+Hooks fired when an order's status or payment status changes.
+
+Handlers are registered with ``on_transition`` and receive
+``(order, old_value, new_value)`` after the order has been saved::
+
+    @on_transition('shipped')
+    def notify_customer(order, old_status, new_status):
+        ...
+"""
+from collections import defaultdict
+
+_handlers = defaultdict(list)
+
+
+def on_transition(to_value, handler=None, field='status', from_value=None):
+    """
+    Register ``handler`` to run when ``field`` changes to ``to_value``.
+
+    Pass ``from_value`` to only react to transitions out of a given value.
+    Can be used directly or as a decorator.
+    """
+    def register(func):
+        _handlers[(field, to_value)].append((from_value, func))
+        return func
+    if handler is not None:
+        return register(handler)
+    return register
+
+
+def dispatch_transitions(order, changes):
+    """Run the handlers matching ``changes`` (``{field: (old, new)}``)."""
+    for field, (old_value, new_value) in changes.items():
+        for from_value, handler in _handlers.get((field, new_value), ()):
+            if from_value is None or from_value == old_value:
+                handler(order, old_value, new_value)
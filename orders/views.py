@@ -1,16 +1,44 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-from django.conf import settings
 from django.urls import reverse
 from decimal import Decimal
+import json
 import uuid
 
 from .models import Order, OrderItem
+from .archive import get_user_order
 from .forms import CheckoutForm
 from cart.cart import get_cart, clear_cart
+from store.inventory import record_movements
+from .payments.client import GatewayError, get_paystack_client
+from .rates import get_rate_table
+from .payments.webhooks import VERIFY_EVENT, record_event, verify_paystack_signature
+
+
+SHIPPING_ICONS = {
+    'standard': 'fa-truck',
+    'express': 'fa-rocket',
+    'pickup': 'fa-store',
+}
+
+
+def _shipping_options(quotes):
+    """Display data for the shipping method choices on the checkout page."""
+    labels = dict(Order.SHIPPING_METHOD_CHOICES)
+    return [
+        {
+            'id': quote.shipping_method,
+            'name': labels[quote.shipping_method].split(' (')[0],
+            'price': quote.shipping_fee,
+            'time': f'{quote.days_min}-{quote.days_max} working days' if quote.days_max else 'Same day',
+            'icon': SHIPPING_ICONS.get(quote.shipping_method, 'fa-truck'),
+        }
+        for quote in quotes
+    ]
 
 
 def checkout(request):
@@ -62,20 +90,22 @@ def checkout(request):
             if request.user.is_authenticated:
                 order.user = request.user
             
-            # Calculate shipping fee
-            shipping_fees = {
-                'standard': Decimal('2500'),
-                'express': Decimal('5000'),
-                'pickup': Decimal('0'),
-            }
-            order.shipping_fee = shipping_fees.get(order.shipping_method, Decimal('2500'))
-            
-            # Calculate total
-            order.total = order.subtotal + order.shipping_fee
+            # Calculate shipping, tax and total
+            quote = get_rate_table().quote(
+                order.subtotal,
+                order.shipping_method,
+                country=str(order.shipping_country),
+                state=order.shipping_state,
+                city=order.shipping_city,
+            )
+            order.shipping_fee = quote.shipping_fee
+            order.tax_amount = quote.tax_amount
+            order.total = quote.total
             
             order.save()
             
             # Create order items
+            sales = []
             for cart_item in cart_items:
                 OrderItem.objects.create(
                     order=order,
@@ -89,13 +119,10 @@ def checkout(request):
                     total=cart_item.total_price,
                 )
                 
-                # Update product stock
-                if cart_item.variant:
-                    cart_item.variant.stock_quantity -= cart_item.quantity
-                    cart_item.variant.save()
-                else:
-                    cart_item.product.stock_quantity -= cart_item.quantity
-                    cart_item.product.save()
+                sales.append((cart_item.variant or cart_item.product, 'sale', -cart_item.quantity, order.order_number))
+            
+            # Take the items out of stock with atomic increments and ledger rows
+            record_movements(sales, user=order.user)
             
             # Clear the cart
             clear_cart(request)
@@ -129,24 +156,45 @@ def checkout(request):
         form = CheckoutForm(initial=initial_data)
     
     # Calculate shipping options
-    shipping_options = [
-        {'id': 'standard', 'name': 'Standard Shipping', 'price': 2500, 'time': '5-7 business days'},
-        {'id': 'express', 'name': 'Express Shipping', 'price': 5000, 'time': '2-3 business days'},
-        {'id': 'next_day', 'name': 'Next Day Delivery', 'price': 10000, 'time': '1 business day'},
-        {'id': 'pickup', 'name': 'Store Pickup', 'price': 0, 'time': 'Ready in 24 hours'},
-    ]
+    quotes = get_rate_table().quotes(subtotal, country='NG')
     
     context = {
         'cart': cart,
         'cart_items': cart_items,
         'subtotal': subtotal,
         'form': form,
-        'shipping_options': shipping_options,
+        'shipping_options': _shipping_options(quotes),
+        'quote': quotes[0],
     }
     
     return render(request, 'orders/checkout.html', context)
 
 
+def shipping_estimate(request):
+    """
+    Price every shipping method (and tax) for a cart subtotal and destination.
+    
+    Served entirely from the in-memory rate table, so the cart and checkout
+    pages can call it on every change without a database hit.
+    """
+    try:
+        subtotal = Decimal(request.GET.get('subtotal', '0'))
+    except ArithmeticError:
+        return JsonResponse({'error': 'Invalid subtotal.'}, status=400)
+    if not subtotal.is_finite() or subtotal < 0:
+        return JsonResponse({'error': 'Invalid subtotal.'}, status=400)
+    
+    country = request.GET.get('country', 'NG')
+    state = request.GET.get('state', '')
+    city = request.GET.get('city', '')
+    quotes = get_rate_table().quotes(subtotal, country=country, state=state, city=city)
+    selected = request.GET.get('method', 'standard')
+    return JsonResponse({
+        'options': [quote.as_dict() for quote in quotes],
+        'selected': next((q.as_dict() for q in quotes if q.shipping_method == selected), quotes[0].as_dict()),
+    })
+
+
 def order_confirmation(request, order_id):
     """Display order confirmation page"""
     order = get_object_or_404(Order, id=order_id)
@@ -170,7 +218,9 @@ def order_confirmation(request, order_id):
 @login_required
 def order_detail(request, order_id):
     """Display order detail page for authenticated users"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_user_order(request.user, order_id)
+    if order is None:
+        raise Http404('Order not found.')
     
     context = {
         'order': order,
@@ -189,105 +239,76 @@ def initiate_paystack(request, order_id):
         messages.error(request, 'You do not have permission to access this order.')
         return redirect('store:home')
     
-    # Paystack integration
-    import requests
-    
-    headers = {
-        'Authorization': f'Bearer {settings.PAYSTACK_SECRET_KEY}',
-        'Content-Type': 'application/json',
-    }
-    
     callback_url = request.build_absolute_uri(reverse('orders:paystack_callback'))
     
-    data = {
-        'email': order.customer_email,
-        'amount': int(order.total * 100),  # Convert to kobo (Paystack uses kobo)
-        'reference': order.order_number,
-        'callback_url': callback_url,
-        'metadata': {
-            'order_id': order.id,
-            'order_number': order.order_number,
-            'customer_name': order.shipping_full_name,
-        }
-    }
-    
     try:
-        response = requests.post(
-            'https://api.paystack.co/transaction/initialize',
-            headers=headers,
-            json=data,
-            timeout=30
+        payment_data = get_paystack_client().initialize_transaction(
+            email=order.customer_email,
+            amount=int(order.total * 100),  # Convert to kobo (Paystack uses kobo)
+            reference=order.order_number,
+            callback_url=callback_url,
+            metadata={
+                'order_id': order.id,
+                'order_number': order.order_number,
+                'customer_name': order.shipping_full_name,
+            },
         )
-        
-        if response.status_code == 200:
-            payment_data = response.json()
-            if payment_data.get('status'):
-                # Redirect to Paystack checkout page
-                return redirect(payment_data['data']['authorization_url'])
-        
-        # If we get here, something went wrong
-        messages.error(request, 'Payment initiation failed. Please try again.')
-        return redirect('orders:order_confirmation', order_id=order.id)
-        
-    except requests.exceptions.RequestException as e:
+    except GatewayError:
         messages.error(request, 'Could not connect to payment gateway. Please try again.')
         return redirect('orders:order_confirmation', order_id=order.id)
+    
+    authorization_url = payment_data.get('authorization_url')
+    if not authorization_url:
+        messages.error(request, 'Payment initiation failed. Please try again.')
+        return redirect('orders:order_confirmation', order_id=order.id)
+    
+    # Redirect to Paystack checkout page
+    return redirect(authorization_url)
 
 
 def paystack_callback(request):
-    """Handle Paystack payment callback"""
+    """
+    Handle the buyer returning from Paystack.
+    
+    Only local state is read here; confirmation itself comes from the
+    webhook, or from a queued verification if the webhook hasn't arrived yet.
+    """
     reference = request.GET.get('reference')
     
     if not reference:
         messages.error(request, 'Invalid payment reference.')
         return redirect('store:home')
     
-    # Verify payment with Paystack API
-    import requests
-    
-    headers = {
-        'Authorization': f'Bearer {settings.PAYSTACK_SECRET_KEY}',
-    }
+    order = Order.objects.filter(order_number=reference).first()
+    if order is None:
+        messages.error(request, 'Order not found.')
+        return redirect('store:home')
     
+    if order.is_paid:
+        messages.success(request, 'Payment successful! Your order has been confirmed.')
+    elif order.payment_status == 'failed':
+        messages.warning(request, 'Payment was not successful. Please try again.')
+    else:
+        record_event('paystack', VERIFY_EVENT, reference, source='callback')
+        messages.info(request, 'We are confirming your payment. Your order will be updated shortly.')
+    return redirect('orders:order_confirmation', order_id=order.id)
+
+
+@csrf_exempt
+@require_POST
+def paystack_webhook(request):
+    """Store a signed Paystack event for the payment worker and acknowledge it."""
+    if not verify_paystack_signature(request.body, request.headers.get('X-Paystack-Signature', '')):
+        return HttpResponse(status=400)
     try:
-        response = requests.get(
-            f'https://api.paystack.co/transaction/verify/{reference}',
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            payment_data = response.json()
-            
-            if payment_data.get('status') and payment_data['data']['status'] == 'success':
-                # Payment successful - update order
-                try:
-                    order = Order.objects.get(order_number=reference)
-                    order.payment_status = 'paid'
-                    order.transaction_id = payment_data['data']['reference']
-                    order.payment_reference = payment_data['data'].get('id', '')
-                    order.status = 'confirmed'
-                    order.save()
-                    
-                    messages.success(request, 'Payment successful! Your order has been confirmed.')
-                    return redirect('orders:order_confirmation', order_id=order.id)
-                    
-                except Order.DoesNotExist:
-                    messages.error(request, 'Order not found.')
-                    return redirect('store:home')
-            else:
-                # Payment failed or pending
-                messages.warning(request, 'Payment was not successful. Please try again.')
-                try:
-                    order = Order.objects.get(order_number=reference)
-                    return redirect('orders:order_confirmation', order_id=order.id)
-                except Order.DoesNotExist:
-                    return redirect('store:home')
-                    
-    except requests.exceptions.RequestException:
-        messages.error(request, 'Could not verify payment. Please contact support.')
-    
-    return redirect('store:home')
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+    event_type = payload.get('event')
+    reference = (payload.get('data') or {}).get('reference')
+    if event_type and reference:
+        record_event('paystack', event_type, reference, payload)
+    return HttpResponse(status=200)
 
 
 def initiate_flutterwave(request, order_id):
@@ -28,11 +28,6 @@ class ReviewAdmin(admin.ModelAdmin):
             'fields': ('helpful_count', 'verified_purchase', 'created_at', 'updated_at')
         }),
     )
-    
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        # Update product rating when review is saved
-        obj.product.update_rating()
 
 
 @admin.register(ReviewHelpful)
@@ -0,0 +1,127 @@
+"""
+Cached review list pages.
+
+The AJAX review list of a product (``reviews:product_reviews``) is cached as
+rendered HTML plus its pagination metadata, keyed by product, sort, rating
+filter, requested page and the product's review version, so a hit costs two
+cache reads and no query. The version lives in the shared default cache and
+every review write replaces it after commit, so stale pages are never served
+and simply expire. The fragment is rendered without the request and holds
+nothing user-specific: the review list script fetches the visitor's votes,
+authorship and the current helpful counts from ``reviews:helpful_votes``
+(helpful votes therefore leave the cached pages alone) and reads the CSRF
+token from its cookie.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count
+from django.template.loader import render_to_string
+
+SORTS = {
+    'newest': ('-created_at',),
+    'oldest': ('created_at',),
+    'highest': ('-rating', '-created_at'),
+    'lowest': ('rating', '-created_at'),
+    'helpful': ('-helpful_count', '-created_at'),
+}
+PAGE_SIZE = 5
+
+
+def _version_key(product_id):
+    return f'reviews:version:{product_id}'
+
+
+def review_version(product_id):
+    version = cache.get(_version_key(product_id))
+    if version is None:
+        cache.add(_version_key(product_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(product_id))
+    return version
+
+
+def bump_version(*product_ids):
+    """Retire the cached review pages of ``product_ids`` once the transaction commits."""
+    def bump():
+        for product_id in set(product_ids):
+            if product_id is not None:
+                cache.set(_version_key(product_id), time.time_ns(), timeout=None)
+    transaction.on_commit(bump)
+
+
+def rating_breakdown(product):
+    """``{stars: {'count', 'percentage'}}`` for stars 1-5 from one grouped query."""
+    counts = dict(
+        product.reviews.filter(is_approved=True)
+        .order_by()
+        .values_list('rating')
+        .annotate(count=Count('id'))
+    )
+    total = sum(counts.values())
+    return {
+        stars: {
+            'count': counts.get(stars, 0),
+            'percentage': round((counts.get(stars, 0) / total * 100) if total > 0 else 0),
+        }
+        for stars in range(1, 6)
+    }
+
+
+def _reviews_page(product, sort_by, rating_filter, page):
+    reviews = product.reviews.filter(is_approved=True).select_related('user').order_by(*SORTS[sort_by])
+    if rating_filter:
+        reviews = reviews.filter(rating=rating_filter)
+    return Paginator(reviews, PAGE_SIZE).get_page(page)
+
+
+def review_page_context(product, sort_by, rating_filter, page, reviews_page=None):
+    if reviews_page is None:
+        reviews_page = _reviews_page(product, sort_by, rating_filter, page)
+    return {
+        'product': product,
+        'reviews': reviews_page,
+        'rating_breakdown': rating_breakdown(product),
+        'sort_by': sort_by,
+        'rating_filter': rating_filter,
+    }
+
+
+def _page_number(page):
+    try:
+        return max(int(page), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _page_key(product_id, sort_by, rating_filter, number):
+    return 'reviews:page:{}:{}:{}:{}:{}'.format(
+        product_id, review_version(product_id), sort_by, rating_filter or '', number,
+    )
+
+
+def review_page(product, sort_by, rating_filter, page):
+    """The rendered review list page with its pagination metadata, from the cache when current."""
+    number = _page_number(page)
+    key = _page_key(product.pk, sort_by, rating_filter, number)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+    reviews_page = _reviews_page(product, sort_by, rating_filter, number)
+    if reviews_page.number != number:
+        # Out of range: serve the last page's entry, never one per requested number.
+        key = _page_key(product.pk, sort_by, rating_filter, reviews_page.number)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+    context = review_page_context(product, sort_by, rating_filter, page, reviews_page)
+    payload = {
+        'html': render_to_string('reviews/_review_list.html', context),
+        'has_next': reviews_page.has_next(),
+        'total_pages': reviews_page.paginator.num_pages,
+        'current_page': reviews_page.number,
+    }
+    cache.set(key, payload, settings.REVIEW_FRAGMENT_TTL)
+    return payload
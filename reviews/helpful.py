@@ -0,0 +1,92 @@
+"""
+Helpful votes on reviews without lost updates.
+
+A vote is a ``ReviewHelpful`` row inserted with insert-or-ignore semantics
+(the unique ``(review, user)`` constraint decides, inside a savepoint), and
+``Review.helpful_count`` only ever moves by an ``F()`` increment of the rows
+actually inserted or deleted, so concurrent votes on the same review all
+count. ``recount`` rebuilds the counters from the vote table for writes that
+bypass these functions (cascading user deletes, queryset deletes).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .fragments import bump_version
+from .models import Review, ReviewHelpful
+
+
+def _count(review_id):
+    return Review.objects.filter(pk=review_id).values_list('helpful_count', flat=True).first() or 0
+
+
+def add_vote(review_id, user):
+    """Record ``user``'s vote unless already recorded. Returns ``(added, helpful_count)``."""
+    try:
+        with transaction.atomic():
+            ReviewHelpful.objects.create(review_id=review_id, user=user)
+            Review.objects.filter(pk=review_id).update(helpful_count=F('helpful_count') + 1)
+    except IntegrityError:
+        return False, _count(review_id)
+    return True, _count(review_id)
+
+
+def remove_vote(review_id, user):
+    """Withdraw ``user``'s vote if there is one. Returns ``(removed, helpful_count)``."""
+    with transaction.atomic():
+        deleted, _ = ReviewHelpful.objects.filter(review_id=review_id, user=user).delete()
+        if deleted:
+            Review.objects.filter(pk=review_id, helpful_count__gt=0).update(helpful_count=F('helpful_count') - 1)
+    return bool(deleted), _count(review_id)
+
+
+def toggle_vote(review_id, user):
+    """Add ``user``'s vote, or withdraw it when already cast. Returns ``(voted, helpful_count)``."""
+    added, count = add_vote(review_id, user)
+    if added:
+        return True, count
+    _, count = remove_vote(review_id, user)
+    return False, count
+
+
+def voted_review_ids(user, review_ids):
+    """The subset of ``review_ids`` ``user`` has voted helpful, in one query."""
+    if not getattr(user, 'is_authenticated', False) or not review_ids:
+        return set()
+    return set(
+        ReviewHelpful.objects.filter(user=user, review_id__in=review_ids).values_list('review_id', flat=True)
+    )
+
+
+def recount(review_ids=None, chunk_size=500):
+    """
+    Reset ``helpful_count`` from the vote table for ``review_ids`` (every
+    review by default) in keyset-paginated chunks. Returns the number of
+    reviews corrected.
+    """
+    votes = (
+        ReviewHelpful.objects.filter(review=OuterRef('pk'))
+        .order_by()
+        .values('review')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    reviews = Review.objects.all()
+    if review_ids is not None:
+        reviews = reviews.filter(pk__in=review_ids)
+    corrected = 0
+    last_id = 0
+    while True:
+        chunk = list(
+            reviews.filter(pk__gt=last_id)
+            .order_by('pk')
+            .annotate(votes=Coalesce(Subquery(votes), Value(0)))
+            .values_list('pk', 'product_id', 'helpful_count', 'votes')[:chunk_size]
+        )
+        if not chunk:
+            return corrected
+        last_id = chunk[-1][0]
+        drifted = [(pk, product_id, actual) for pk, product_id, stored, actual in chunk if stored != actual]
+        Review.objects.bulk_update([Review(pk=pk, helpful_count=actual) for pk, _, actual in drifted], ['helpful_count'])
+        bump_version(*(product_id for _, product_id, _ in drifted))
+        corrected += len(drifted)
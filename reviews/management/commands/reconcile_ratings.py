@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from reviews.ratings import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute product rating figures from the approved reviews and fix any that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Products checked per transaction.')
+
+    def handle(self, *args, **options):
+        corrected = reconcile(chunk_size=max(1, options['chunk_size']))
+        self.stdout.write(self.style.SUCCESS(f'Corrected the rating figures of {corrected} product(s).'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from reviews.helpful import recount
+
+
+class Command(BaseCommand):
+    help = 'Reset review helpful counts from the recorded votes and report how many drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Reviews checked per query.')
+
+    def handle(self, *args, **options):
+        corrected = recount(chunk_size=max(1, options['chunk_size']))
+        self.stdout.write(self.style.SUCCESS(f'Corrected the helpful count of {corrected} review(s).'))
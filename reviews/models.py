@@ -1,11 +1,14 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from aniscents.tracking import TrackedFieldsMixin
 from store.models import Product
 
 
-class Review(models.Model):
+class Review(TrackedFieldsMixin, models.Model):
     """Product review model."""
+    # Rating inputs; reviews.ratings applies their changes to the product
+    tracked_fields = ('product', 'is_approved', 'rating', 'longevity_rating', 'sillage_rating', 'value_rating')
     
     product = models.ForeignKey(
         Product, 
@@ -61,17 +64,9 @@ class Review(models.Model):
     
     def save(self, *args, **kwargs):
         # Check if user has purchased this product
-        from orders.models import Order, OrderItem
-        has_purchased = OrderItem.objects.filter(
-            order__user=self.user,
-            product=self.product,
-            order__status='delivered'
-        ).exists()
-        self.verified_purchase = has_purchased
+        from orders.purchases import has_purchased
+        self.verified_purchase = has_purchased(self.user_id, self.product_id)
         super().save(*args, **kwargs)
-        
-        # Update product average rating
-        self.product.update_rating()
 
 
 class ReviewHelpful(models.Model):
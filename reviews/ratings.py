@@ -0,0 +1,146 @@
+"""
+Rating figures of products maintained incrementally from review writes.
+
+Every product stores the count and sum of its approved ratings and, per
+aspect (longevity, sillage, value), the sum and count of the reviews that
+rated it. A review write applies only the difference between the review's
+contribution before and after the change, with ``F()`` increments in a
+single ``UPDATE`` that also recomputes ``average_rating``, so concurrent
+reviews never overwrite each other and no write aggregates the product's
+reviews. ``reconcile`` rebuilds the figures from the reviews to correct
+drift from writes that bypass the signals (queryset updates, raw SQL).
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from store.models import Product
+
+from .fragments import bump_version
+
+ASPECTS = (('longevity_rating', 'longevity'), ('sillage_rating', 'sillage'), ('value_rating', 'value'))
+COUNTERS = ['review_count', 'rating_sum'] + [
+    f'{prefix}_{suffix}' for _, prefix in ASPECTS for suffix in ('sum', 'count')
+]
+PRODUCT_FIELDS = ['average_rating'] + COUNTERS
+REVIEW_FIELDS = ('product', 'is_approved', 'rating') + tuple(field for field, _ in ASPECTS)
+CENT = Decimal('0.01')
+
+
+def contribution(state):
+    """What a review in ``state`` (``{field: value}``) adds to its product's counters."""
+    figures = Counter()
+    if not state or not state['is_approved']:
+        return figures
+    figures['review_count'] = 1
+    figures['rating_sum'] = state['rating']
+    for field, prefix in ASPECTS:
+        if state[field]:
+            figures[f'{prefix}_sum'] = state[field]
+            figures[f'{prefix}_count'] = 1
+    return figures
+
+
+def _average(count_delta, sum_delta):
+    """SQL for ``average_rating`` after adding the deltas, from the row's current values."""
+    average = Cast(F('rating_sum') + sum_delta, FloatField()) / Cast(F('review_count') + count_delta, FloatField())
+    return Case(
+        When(review_count__gt=-count_delta, then=Cast(average, DecimalField(max_digits=3, decimal_places=2))),
+        default=Value(Decimal('0')),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def apply_delta(product_id, delta):
+    """Add ``delta`` (``{counter: change}``) to a product's counters in one ``UPDATE``."""
+    delta = {field: change for field, change in delta.items() if change}
+    if not delta:
+        return
+    updates = {field: F(field) + change for field, change in delta.items()}
+    if 'review_count' in delta or 'rating_sum' in delta:
+        updates['average_rating'] = _average(delta.get('review_count', 0), delta.get('rating_sum', 0))
+    Product.objects.filter(pk=product_id).update(**updates)
+
+
+def _state(review, original=False):
+    state = {}
+    changes = review.tracked_changes(fields=REVIEW_FIELDS) if original else {}
+    for name in REVIEW_FIELDS:
+        attname = review._meta.get_field(name).attname
+        state[name] = changes[name][0] if name in changes else getattr(review, attname)
+    return state
+
+
+def review_saved(review, created):
+    """Apply a saved review's change to its product's (or products') counters."""
+    new = _state(review)
+    old = None if created else _state(review, original=True)
+    if old is None or old['product'] == new['product']:
+        delta = contribution(new)
+        delta.subtract(contribution(old))
+        apply_delta(new['product'], delta)
+        return
+    with transaction.atomic():
+        apply_delta(old['product'], {field: -value for field, value in contribution(old).items()})
+        apply_delta(new['product'], contribution(new))
+
+
+def review_deleted(review):
+    old = _state(review, original=True)
+    apply_delta(old['product'], {field: -value for field, value in contribution(old).items()})
+
+
+def compute_ratings(product_ids):
+    """``{product_id: {field: value}}`` recomputed from the approved reviews."""
+    from .models import Review
+
+    aggregates = {'review_count': Count('id'), 'rating_sum': Sum('rating')}
+    for field, prefix in ASPECTS:
+        aggregates[f'{prefix}_sum'] = Sum(field)
+        aggregates[f'{prefix}_count'] = Count(field)
+    figures = {product_id: dict.fromkeys(COUNTERS, 0) for product_id in product_ids}
+    rows = (
+        Review.objects.filter(product_id__in=product_ids, is_approved=True)
+        .order_by()
+        .values('product_id')
+        .annotate(**aggregates)
+    )
+    for row in rows:
+        figures[row.pop('product_id')].update({field: value or 0 for field, value in row.items()})
+    for entry in figures.values():
+        count = entry['review_count']
+        entry['average_rating'] = (Decimal(entry['rating_sum']) / count).quantize(CENT) if count else Decimal('0.00')
+    return figures
+
+
+def reconcile(product_ids=None, chunk_size=500):
+    """
+    Recompute the rating figures of ``product_ids`` (every product by
+    default) in keyset-paginated chunks and write those that drifted.
+    Returns the number of products corrected.
+    """
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    corrected = 0
+    last_id = 0
+    while True:
+        stored = list(products.filter(pk__gt=last_id).order_by('pk').only(*PRODUCT_FIELDS)[:chunk_size])
+        if not stored:
+            return corrected
+        last_id = stored[-1].pk
+        with transaction.atomic():
+            figures = compute_ratings([product.pk for product in stored])
+            drifted = []
+            for product in stored:
+                expected = figures[product.pk]
+                if any(getattr(product, field) != value for field, value in expected.items()):
+                    for field, value in expected.items():
+                        setattr(product, field, value)
+                    drifted.append(product)
+            Product.objects.bulk_update(drifted, PRODUCT_FIELDS)
+            bump_version(*(product.pk for product in drifted))
+        corrected += len(drifted)
@@ -0,0 +1,24 @@
+"""Signal handlers keeping product rating figures and cached review pages current."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .fragments import bump_version
+from .models import Review
+from .ratings import REVIEW_FIELDS, review_deleted, review_saved
+
+
+@receiver(post_save, sender=Review)
+def review_saved_handler(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        moved = instance.tracked_changes(fields=['product']).get('product')
+        bump_version(instance.product_id, *(moved or ()))
+    # Saves of other columns only (helpful votes) leave the ratings alone.
+    if raw or update_fields is not None and not set(update_fields) & set(REVIEW_FIELDS):
+        return
+    review_saved(instance, created)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted_handler(sender, instance, **kwargs):
+    bump_version(instance.product_id)
+    review_deleted(instance)
@@ -8,5 +8,6 @@ urlpatterns = [
     path('<int:review_id>/edit/', views.edit_review, name='edit_review'),
     path('<int:review_id>/delete/', views.delete_review, name='delete_review'),
     path('<int:review_id>/helpful/', views.mark_helpful, name='mark_helpful'),
+    path('helpful/', views.helpful_votes, name='helpful_votes'),
     path('product/<slug:product_slug>/', views.product_reviews, name='product_reviews'),
 ]
@@ -3,10 +3,10 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.core.paginator import Paginator
-from django.db.models import Avg
 
-from .models import Review, ReviewHelpful
+from .fragments import SORTS, review_page, review_page_context
+from .helpful import toggle_vote, voted_review_ids
+from .models import Review
 from store.models import Product
 
 
@@ -87,6 +87,7 @@ def add_review(request, product_slug):
     review.save()
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        product.refresh_from_db(fields=['average_rating', 'review_count'])
         return JsonResponse({
             'success': True,
             'message': 'Thank you for your review!',
@@ -170,10 +171,8 @@ def delete_review(request, review_id):
     product = review.product
     review.delete()
     
-    # Update product rating
-    product.update_rating()
-    
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        product.refresh_from_db(fields=['average_rating', 'review_count'])
         return JsonResponse({
             'success': True,
             'message': 'Review deleted successfully.',
@@ -194,97 +193,61 @@ def mark_helpful(request, review_id):
     review = get_object_or_404(Review, id=review_id)
     
     # Can't mark own review as helpful
-    if review.user == request.user:
+    if review.user_id == request.user.pk:
         return JsonResponse({
             'success': False,
             'error': "You can't mark your own review as helpful."
         }, status=400)
     
-    # Check if already marked
-    helpful, created = ReviewHelpful.objects.get_or_create(
-        review=review,
-        user=request.user
-    )
-    
-    if created:
-        review.helpful_count += 1
-        review.save(update_fields=['helpful_count'])
-        return JsonResponse({
-            'success': True,
-            'helpful_count': review.helpful_count,
-            'message': 'Marked as helpful!'
-        })
-    else:
-        # Toggle off
-        helpful.delete()
-        review.helpful_count = max(0, review.helpful_count - 1)
-        review.save(update_fields=['helpful_count'])
-        return JsonResponse({
-            'success': True,
-            'helpful_count': review.helpful_count,
-            'message': 'Removed helpful vote.'
-        })
+    voted, helpful_count = toggle_vote(review.pk, request.user)
+    return JsonResponse({
+        'success': True,
+        'voted': voted,
+        'helpful_count': helpful_count,
+        'message': 'Marked as helpful!' if voted else 'Removed helpful vote.'
+    })
+
+
+def helpful_votes(request):
+    """
+    The current user's id and helpful votes among the reviews in ``?ids=``,
+    with the reviews' current helpful counts (AJAX).
+    """
+    review_ids = []
+    for value in request.GET.get('ids', '').split(',')[:100]:
+        try:
+            review_ids.append(int(value))
+        except ValueError:
+            continue
+    return JsonResponse({
+        'user_id': request.user.pk,
+        'voted': sorted(voted_review_ids(request.user, review_ids)),
+        'counts': dict(Review.objects.filter(pk__in=review_ids).values_list('pk', 'helpful_count')),
+    })
 
 
 def product_reviews(request, product_slug):
     """Get paginated reviews for a product (AJAX)."""
     product = get_object_or_404(Product, slug=product_slug)
-    reviews = product.reviews.filter(is_approved=True).select_related('user')
     
     # Sorting
     sort_by = request.GET.get('sort', 'newest')
-    if sort_by == 'oldest':
-        reviews = reviews.order_by('created_at')
-    elif sort_by == 'highest':
-        reviews = reviews.order_by('-rating', '-created_at')
-    elif sort_by == 'lowest':
-        reviews = reviews.order_by('rating', '-created_at')
-    elif sort_by == 'helpful':
-        reviews = reviews.order_by('-helpful_count', '-created_at')
-    else:  # newest
-        reviews = reviews.order_by('-created_at')
+    if sort_by not in SORTS:
+        sort_by = 'newest'
     
     # Filter by rating
     rating_filter = request.GET.get('rating')
-    if rating_filter:
-        try:
-            rating_filter = int(rating_filter)
-            reviews = reviews.filter(rating=rating_filter)
-        except ValueError:
-            pass
+    try:
+        rating_filter = int(rating_filter)
+    except (TypeError, ValueError):
+        rating_filter = None
+    if rating_filter not in range(1, 6):
+        rating_filter = None
     
-    # Pagination
-    paginator = Paginator(reviews, 5)
     page = request.GET.get('page', 1)
-    reviews_page = paginator.get_page(page)
-    
-    # Calculate rating breakdown
-    rating_breakdown = {}
-    all_reviews = product.reviews.filter(is_approved=True)
-    total = all_reviews.count()
-    for i in range(1, 6):
-        count = all_reviews.filter(rating=i).count()
-        rating_breakdown[i] = {
-            'count': count,
-            'percentage': round((count / total * 100) if total > 0 else 0)
-        }
-    
-    context = {
-        'product': product,
-        'reviews': reviews_page,
-        'rating_breakdown': rating_breakdown,
-        'sort_by': sort_by,
-        'rating_filter': rating_filter,
-    }
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        from django.template.loader import render_to_string
-        html = render_to_string('reviews/_review_list.html', context, request=request)
-        return JsonResponse({
-            'html': html,
-            'has_next': reviews_page.has_next(),
-            'total_pages': paginator.num_pages,
-            'current_page': reviews_page.number,
-        })
+        return JsonResponse(review_page(product, sort_by, rating_filter, page))
     
+    context = review_page_context(product, sort_by, rating_filter, page)
     return render(request, 'reviews/product_reviews.html', context)
@@ -212,6 +212,12 @@ class CartManager {
 
     // Initialize cart page functionality
     initCartPage() {
+        // Live shipping/tax estimate for the current subtotal
+        const estimateEl = document.querySelector('[data-shipping-estimate-url]');
+        if (estimateEl) {
+            this.refreshShippingEstimate(parseFloat(estimateEl.dataset.subtotal) || 0);
+        }
+
         // Quantity increment/decrement buttons
         document.addEventListener('click', (e) => {
             const btn = e.target.closest('[data-quantity-btn]');
@@ -422,6 +428,33 @@ class CartManager {
         }
     }
 
+    // Fetch shipping and tax for a subtotal and update the summary
+    async refreshShippingEstimate(subtotal) {
+        const estimateEl = document.querySelector('[data-shipping-estimate-url]');
+        if (!estimateEl) return;
+        try {
+            const params = new URLSearchParams({subtotal: subtotal.toFixed(2), method: 'standard'});
+            const response = await fetch(`${estimateEl.dataset.shippingEstimateUrl}?${params}`);
+            const quote = (await response.json()).selected;
+            const shipping = parseFloat(quote.shipping_fee);
+            const tax = parseFloat(quote.tax_amount);
+            estimateEl.textContent = shipping === 0 ? 'FREE' : `₦${shipping.toLocaleString('en-NG', {minimumFractionDigits: 2})}`;
+            const taxEl = document.querySelector('[data-tax-amount]');
+            if (taxEl) {
+                taxEl.textContent = `₦${tax.toLocaleString('en-NG', {minimumFractionDigits: 2})}`;
+            }
+            const totalEl = document.querySelector('[data-cart-total]');
+            const discountEl = document.querySelector('[data-discount-amount]');
+            if (totalEl) {
+                const discount = discountEl ? parseFloat(discountEl.textContent.replace(/[-₦,]/g, '')) || 0 : 0;
+                const total = parseFloat(quote.total) - discount;
+                totalEl.textContent = `₦${total.toLocaleString('en-NG', {minimumFractionDigits: 2})}`;
+            }
+        } catch (error) {
+            console.error('Shipping estimate error:', error);
+        }
+    }
+
     // Update cart summary totals
     updateCartSummary(subtotal) {
         const subtotalEl = document.querySelector('[data-cart-subtotal]');
@@ -442,6 +475,7 @@ class CartManager {
             }
             totalEl.textContent = `₦${total.toLocaleString('en-NG', {minimumFractionDigits: 2})}`;
         }
+        this.refreshShippingEstimate(subtotal);
     }
 
     // Show empty cart state
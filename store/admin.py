@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from .models import Category, Product, ProductImage
+from .inventory import edit_stock, save_without_stock
+from .models import Category, InventoryMovement, Product, ProductImage
 from .cms_models import SiteSettings, HeroSection, HomepageSection, PromotionalBanner, ShopPageContent, PageContent, NewsletterSubscriber
 
 class ProductImageInline(admin.TabularInline):
@@ -46,6 +47,24 @@ class ProductAdmin(admin.ModelAdmin):
     )
     inlines = [ProductImageInline]
     actions = ['mark_as_featured', 'mark_as_not_featured', 'activate_products', 'deactivate_products']
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        field = super().formfield_for_dbfield(db_field, request, **kwargs)
+        if db_field.name == 'stock_quantity':
+            # Post back the level the form showed, so edits apply as a change from it.
+            field.show_hidden_initial = True
+        return field
+    def save_model(self, request, obj, form, change):
+        """Save stock edits through the inventory ledger, not over concurrent sales."""
+        if not change:
+            return super().save_model(request, obj, form, change)
+        save_without_stock(obj)
+        if 'stock_quantity' in form.changed_data:
+            field = form.fields['stock_quantity']
+            shown = field.widget.value_from_datadict(form.data, form.files, form.add_initial_prefix('stock_quantity'))
+            result = edit_stock(obj, obj.stock_quantity, shown=shown, user=request.user, reference='Django admin')
+            if result.status == 'error':
+                obj.stock_quantity = obj.get_original_value('stock_quantity')
+                self.message_user(request, f"Stock of {obj} not updated: {result.error}", messages.ERROR)
     def mark_as_featured(self, request, queryset):
         queryset.update(is_featured=True)
         self.message_user(request, f"{queryset.count()} products marked as featured")
@@ -184,11 +203,46 @@ class PageContentAdmin(admin.ModelAdmin):
     search_fields = ('title', 'content')
 
 
+@admin.register(InventoryMovement)
+class InventoryMovementAdmin(admin.ModelAdmin):
+    """Read-only view of the inventory ledger."""
+    list_display = ('created_at', 'product', 'variant', 'kind', 'quantity', 'reference', 'created_by')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('product__name', 'product__sku', 'variant__sku', 'reference')
+    list_select_related = ('product__brand', 'variant__product__brand', 'created_by')
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class CustomerSegmentFilter(admin.SimpleListFilter):
+    """Target subscribers by the RFM segment of the customer account with the same e-mail."""
+    title = 'customer segment'
+    parameter_name = 'segment'
+
+    def lookups(self, request, model_admin):
+        from accounts.models import CustomerSegment
+        return CustomerSegment.SEGMENT_CHOICES + (('prospect', 'Prospects (no purchase)'),)
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        from accounts.segments import segment_users
+        return queryset.filter(email__in=segment_users([self.value()]).values('email'))
+
+
 @admin.register(NewsletterSubscriber)
 class NewsletterSubscriberAdmin(admin.ModelAdmin):
     """Admin for Newsletter Subscribers."""
     list_display = ('email', 'name', 'is_active', 'source', 'subscribed_at')
-    list_filter = ('is_active', 'source', 'subscribed_at')
+    list_filter = ('is_active', CustomerSegmentFilter, 'source', 'subscribed_at')
     search_fields = ('email', 'name')
     list_editable = ('is_active',)
     readonly_fields = ('unsubscribe_token', 'subscribed_at', 'unsubscribed_at')
@@ -0,0 +1,382 @@
+"""
+Stock changes for products and variants, recorded in an insert-only ledger.
+
+Every change is an ``InventoryMovement`` row. ``record_movement`` and
+``record_movements`` insert the rows and apply them to ``stock_quantity``
+with atomic ``F()`` increments, so concurrent sales never overwrite each
+other. ``take_snapshot`` periodically stores stock levels computed from the
+ledger, and ``stock_at`` answers point-in-time queries from the latest
+snapshot plus the movements after it.
+
+``apply_stock_changes`` takes rows of ``sku``, optional ``variant_sku`` and
+either an absolute ``quantity`` or a ``delta``. It resolves every SKU with one
+query per table, locks the rows, applies the changes in memory and writes
+them back with a single ``bulk_update`` of ``stock_quantity`` plus one
+insert of ledger rows, inside one transaction. Every row gets a result;
+invalid rows are reported and skipped without failing the batch.
+
+Stock crossing a threshold is reported once per batch, after commit, through
+the ``stock_levels_changed`` signal with ``low_stock``, ``out_of_stock``,
+``back_in_stock`` and ``restocked`` (back above the low-stock threshold)
+lists of the affected products and variants.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import InventoryMovement, InventorySnapshot, Product, ProductVariant
+
+stock_levels_changed = Signal()
+KINDS = dict(InventoryMovement.KIND_CHOICES)
+# Movements younger than this are left for the next snapshot, so writers
+# still in flight when a snapshot is taken are never skipped.
+SNAPSHOT_LAG = timedelta(minutes=1)
+
+
+class InventoryFormatError(ValueError):
+    """The uploaded stock file could not be parsed."""
+
+
+@dataclass
+class StockResult:
+    row: int
+    sku: str
+    variant_sku: str = ''
+    status: str = 'updated'
+    old: int = None
+    new: int = None
+    error: str = ''
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def _int(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError
+    return int(value)
+
+
+def parse_rows(data, fmt='csv'):
+    """
+    Rows from CSV text (``sku,variant_sku,quantity,delta`` columns, a header
+    row required) or a JSON list of objects with the same keys.
+    """
+    if fmt == 'json':
+        try:
+            rows = json.loads(data) if isinstance(data, (str, bytes)) else data
+        except ValueError as exc:
+            raise InventoryFormatError(f'Invalid JSON: {exc}')
+        if isinstance(rows, dict):
+            rows = rows.get('rows')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise InventoryFormatError('Expected a list of objects.')
+        return rows
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    reader = csv.DictReader(io.StringIO(data))
+    if not reader.fieldnames or 'sku' not in reader.fieldnames and 'variant_sku' not in reader.fieldnames:
+        raise InventoryFormatError('CSV needs a header row with a sku or variant_sku column.')
+    return [{key.strip(): (value or '').strip() for key, value in row.items() if key} for row in reader]
+
+
+def _target_fields(target):
+    if isinstance(target, ProductVariant):
+        return {'product_id': target.product_id, 'variant_id': target.pk}
+    return {'product_id': target.pk, 'variant_id': None}
+
+
+def _crossings(target, old, new, threshold, events):
+    if old <= 0 < new:
+        events['back_in_stock'].append(target)
+    if old <= threshold < new:
+        events['restocked'].append(target)
+    if new <= 0 < old:
+        events['out_of_stock'].append(target)
+    elif 0 < new <= threshold < old:
+        events['low_stock'].append(target)
+
+
+def _send_crossings(changes):
+    """Queue one ``stock_levels_changed`` for ``(target, old, new, threshold)`` changes."""
+    events = {'low_stock': [], 'out_of_stock': [], 'back_in_stock': [], 'restocked': []}
+    for target, old, new, threshold in changes:
+        _crossings(target, old, new, threshold, events)
+    if any(events.values()):
+        transaction.on_commit(lambda: stock_levels_changed.send(sender=Product, **events))
+
+
+def record_movements(entries, user=None):
+    """
+    Record ``(target, kind, quantity[, reference[, note]])`` entries, where
+    ``target`` is a ``Product`` or ``ProductVariant`` and ``quantity`` the
+    signed change. Inserts the ledger rows in one query and applies them
+    with one ``F()`` update per target. The targets' ``stock_quantity`` is
+    set to the resulting level. Returns the movements.
+    """
+    entries = [tuple(entry) + ('',) * (5 - len(entry)) for entry in entries]
+    for _, kind, quantity, _, _ in entries:
+        if kind not in KINDS:
+            raise ValueError(f'Unknown inventory movement kind {kind!r}')
+    totals = {}
+    for target, _, quantity, _, _ in entries:
+        key = (type(target), target.pk)
+        totals[key] = (target, totals.get(key, (target, 0))[1] + quantity)
+    with transaction.atomic():
+        movements = InventoryMovement.objects.bulk_create([
+            InventoryMovement(
+                kind=kind, quantity=quantity, reference=reference, note=note,
+                created_by=user, **_target_fields(target),
+            )
+            for target, kind, quantity, reference, note in entries
+        ])
+        for (model, pk), (_, total) in totals.items():
+            if total:
+                model.objects.filter(pk=pk).update(stock_quantity=F('stock_quantity') + total)
+        levels = {}
+        for model, threshold in ((Product, 'low_stock_threshold'), (ProductVariant, 'product__low_stock_threshold')):
+            ids = [pk for kind, pk in totals if kind is model]
+            if ids:
+                for pk, level, limit in model.objects.filter(pk__in=ids).values_list('pk', 'stock_quantity', threshold):
+                    levels[model, pk] = (level, limit)
+        changes = []
+        for key, (target, total) in totals.items():
+            new, threshold = levels[key]
+            changes.append((target, new - total, new, threshold))
+            target.stock_quantity = new
+            target.reset_tracking(fields=['stock_quantity'])
+        _send_crossings(changes)
+    return movements
+
+
+def record_movement(target, kind, quantity, reference='', note='', user=None):
+    """Record a single stock change; see ``record_movements``."""
+    return record_movements([(target, kind, quantity, reference, note)], user=user)[0]
+
+
+def take_snapshot(now=None):
+    """
+    Store the stock of every product and variant as of ``now`` minus
+    ``SNAPSHOT_LAG``: the previous snapshot plus the movements since it.
+    Returns the number of rows written.
+    """
+    taken_at = (now or timezone.now()) - SNAPSHOT_LAG
+    with transaction.atomic():
+        previous = InventorySnapshot.objects.aggregate(run=Max('taken_at'))['run']
+        if previous is not None and previous >= taken_at:
+            return 0
+        levels = defaultdict(int)
+        watermark = 0
+        if previous is not None:
+            for product_id, variant_id, quantity, last_id in InventorySnapshot.objects.filter(
+                taken_at=previous,
+            ).values_list('product_id', 'variant_id', 'quantity', 'last_movement_id'):
+                levels[product_id, variant_id] = quantity
+                watermark = max(watermark, last_id)
+        new_watermark = InventoryMovement.objects.filter(
+            id__gt=watermark, created_at__lte=taken_at,
+        ).aggregate(last=Max('id'))['last'] or watermark
+        moved = (
+            InventoryMovement.objects.filter(id__gt=watermark, id__lte=new_watermark)
+            .order_by()
+            .values_list('product_id', 'variant_id')
+            .annotate(total=Sum('quantity'))
+        )
+        for product_id, variant_id, total in moved:
+            levels[product_id, variant_id] += total
+        # Products and variants added since the last snapshot start from zero.
+        for product_id in Product.objects.values_list('pk', flat=True):
+            levels.setdefault((product_id, None), 0)
+        for variant_id, product_id in ProductVariant.objects.values_list('pk', 'product_id'):
+            levels.setdefault((product_id, variant_id), 0)
+        InventorySnapshot.objects.bulk_create(
+            [
+                InventorySnapshot(
+                    product_id=product_id, variant_id=variant_id, quantity=quantity,
+                    last_movement_id=new_watermark, taken_at=taken_at,
+                )
+                for (product_id, variant_id), quantity in levels.items()
+            ],
+            batch_size=2000,
+        )
+    return len(levels)
+
+
+def stock_at(when, product_ids=None):
+    """
+    Stock levels at ``when`` as ``{(product_id, variant_id): quantity}``
+    (``variant_id`` is ``None`` for product-level stock), from the latest
+    snapshot taken by then plus the later movements up to ``when``.
+    """
+    snapshots = InventorySnapshot.objects.filter(taken_at__lte=when)
+    movements = InventoryMovement.objects.filter(created_at__lte=when)
+    if product_ids is not None:
+        snapshots = snapshots.filter(product_id__in=product_ids)
+        movements = movements.filter(product_id__in=product_ids)
+    run = snapshots.aggregate(run=Max('taken_at'))['run']
+    levels = {}
+    watermark = 0
+    if run is not None:
+        for product_id, variant_id, quantity, last_id in snapshots.filter(taken_at=run).values_list(
+            'product_id', 'variant_id', 'quantity', 'last_movement_id',
+        ):
+            levels[product_id, variant_id] = quantity
+            watermark = max(watermark, last_id)
+    moved = (
+        movements.filter(id__gt=watermark)
+        .order_by()
+        .values_list('product_id', 'variant_id')
+        .annotate(total=Sum('quantity'))
+    )
+    for product_id, variant_id, total in moved:
+        levels[product_id, variant_id] = levels.get((product_id, variant_id), 0) + total
+    return levels
+
+
+def stock_level_at(target, when):
+    """Stock of one product or variant at ``when``."""
+    fields = _target_fields(target)
+    return stock_at(when, [fields['product_id']]).get((fields['product_id'], fields['variant_id']), 0)
+
+
+def apply_stock_changes(rows, dry_run=False, user=None, reference=''):
+    """
+    Apply stock ``rows`` (dicts, see module docstring; optional ``kind`` and
+    ``reference`` keys label the ledger rows). Returns a list of
+    ``StockResult`` in input order. With ``dry_run`` nothing is written and
+    no events are sent.
+    """
+    results = []
+    changes = []
+    for index, row in enumerate(rows, start=1):
+        sku = str(row.get('sku') or '').strip()
+        variant_sku = str(row.get('variant_sku') or '').strip()
+        result = StockResult(row=index, sku=sku, variant_sku=variant_sku)
+        results.append(result)
+        try:
+            quantity, delta = _int(row.get('quantity')), _int(row.get('delta'))
+        except (TypeError, ValueError):
+            result.status, result.error = 'error', 'quantity and delta must be whole numbers'
+            continue
+        kind = str(row.get('kind') or '').strip()
+        if not kind:
+            kind = 'restock' if delta is not None and delta > 0 else 'adjustment'
+        if not sku and not variant_sku:
+            result.status, result.error = 'error', 'sku or variant_sku is required'
+        elif kind not in KINDS:
+            result.status, result.error = 'error', f'unknown kind {kind!r}'
+        elif (quantity is None) == (delta is None):
+            result.status, result.error = 'error', 'give exactly one of quantity or delta'
+        elif quantity is not None and quantity < 0:
+            result.status, result.error = 'error', 'quantity cannot be negative'
+        else:
+            changes.append((result, quantity, delta, kind, str(row.get('reference') or reference)))
+
+    with transaction.atomic():
+        product_skus = {result.sku for result, *_ in changes if result.sku and not result.variant_sku}
+        variant_skus = {result.variant_sku for result, *_ in changes if result.variant_sku}
+        products = {
+            product.sku: product
+            for product in Product.objects.select_for_update().filter(sku__in=product_skus).only(
+                'id', 'sku', 'name', 'stock_quantity', 'low_stock_threshold', 'allow_backorder',
+            )
+        } if product_skus else {}
+        variants = {
+            variant.sku: variant
+            for variant in ProductVariant.objects.select_for_update(of=('self',)).select_related('product').filter(sku__in=variant_skus)
+        } if variant_skus else {}
+
+        touched = {}
+        movements = []
+        for result, quantity, delta, kind, row_reference in changes:
+            if result.variant_sku:
+                target = variants.get(result.variant_sku)
+                if target is not None and result.sku and target.product.sku != result.sku:
+                    result.status, result.error = 'error', f'variant {result.variant_sku} does not belong to {result.sku}'
+                    continue
+            else:
+                target = products.get(result.sku)
+            if target is None:
+                result.status, result.error = 'error', 'unknown SKU'
+                continue
+            product = target.product if isinstance(target, ProductVariant) else target
+            new = quantity if quantity is not None else target.stock_quantity + delta
+            if new < 0 and not product.allow_backorder:
+                result.status, result.error = 'error', f'stock would fall to {new}'
+                continue
+            result.old, result.new = target.stock_quantity, new
+            if new == target.stock_quantity:
+                result.status = 'unchanged'
+                continue
+            touched.setdefault((type(target), target.pk), (target, target.stock_quantity, product.low_stock_threshold))
+            movements.append(InventoryMovement(
+                kind=kind, quantity=new - target.stock_quantity, reference=row_reference[:100],
+                created_by=user, **_target_fields(target),
+            ))
+            target.stock_quantity = new
+
+        if dry_run:
+            transaction.set_rollback(True)
+            return results
+
+        for model in (Product, ProductVariant):
+            objs = [target for (kind, _), (target, *_) in touched.items() if kind is model]
+            if objs:
+                model.objects.bulk_update(objs, ['stock_quantity'], batch_size=1000)
+        InventoryMovement.objects.bulk_create(movements, batch_size=1000)
+        _send_crossings([
+            (target, old, target.stock_quantity, threshold)
+            for target, old, threshold in touched.values()
+        ])
+    return results
+
+
+def save_without_stock(instance):
+    """Save every field of ``instance`` but ``stock_quantity``, which only the ledger moves."""
+    instance.save(update_fields=[
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name != 'stock_quantity'
+    ])
+
+
+def edit_stock(target, quantity, shown=None, user=None, reference=''):
+    """
+    Apply a stock level typed into a form for ``target`` (a ``Product`` or
+    ``ProductVariant``) through ``apply_stock_changes``. The change is the
+    difference from ``shown``, the level the form displayed, so sales
+    recorded since the form was loaded are kept; without ``shown`` the level
+    is set outright under the row lock. Returns the ``StockResult``.
+    """
+    row = {'variant_sku': target.sku} if isinstance(target, ProductVariant) else {'sku': target.sku}
+    row.update(kind='adjustment', reference=reference, quantity=quantity)
+    if shown is not None:
+        try:
+            row['delta'] = _int(row.pop('quantity')) - _int(shown)
+        except (TypeError, ValueError):
+            return StockResult(row=1, sku=row.get('sku', ''), variant_sku=row.get('variant_sku', ''),
+                               status='error', error='quantity must be a whole number')
+    result = apply_stock_changes([row], user=user)[0]
+    if result.status == 'updated':
+        target.stock_quantity = result.new
+        target.reset_tracking(fields=['stock_quantity'])
+    return result
+
+
+def summarize(results):
+    """Count of results per status."""
+    summary = {'updated': 0, 'unchanged': 0, 'error': 0}
+    for result in results:
+        summary[result.status] += 1
+    return summary
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.stock_alerts import send_digest
+
+
+class Command(BaseCommand):
+    help = 'Report every product newly out of stock or low in one admin notification and e-mail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sending digests instead of exiting.')
+        parser.add_argument('--interval', type=float, default=3600.0,
+                            help='Seconds to sleep between digests when looping.')
+
+    def handle(self, *args, **options):
+        while True:
+            reported = send_digest()
+            if reported:
+                self.stdout.write(self.style.SUCCESS(f'Reported {reported} low-stock product(s)'))
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.inventory import take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Store the current stock of every product and variant, computed from the inventory ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep taking snapshots instead of exiting.')
+        parser.add_argument('--interval', type=float, default=86400.0,
+                            help='Seconds to sleep between snapshots when looping.')
+
+    def handle(self, *args, **options):
+        while True:
+            written = take_snapshot()
+            if written:
+                self.stdout.write(self.style.SUCCESS(f'Snapshot of {written} stock levels stored.'))
+            else:
+                self.stdout.write('A snapshot was taken less than a minute ago; nothing to do.')
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.inventory import InventoryFormatError, apply_stock_changes, parse_rows, summarize
+
+
+class Command(BaseCommand):
+    help = 'Apply a stock take or stock adjustments from a CSV or JSON file (sku, variant_sku, quantity or delta).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to read, or - for standard input.')
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help='Input format (default: from the file extension, else csv).')
+        parser.add_argument('--reference', default='',
+                            help='Reference stored on the ledger rows, e.g. a stock take name.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the rows without saving.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('json' if path.lower().endswith('.json') else 'csv')
+        try:
+            if path == '-':
+                data = sys.stdin.read()
+            else:
+                with open(path, encoding='utf-8-sig') as handle:
+                    data = handle.read()
+            rows = parse_rows(data, fmt)
+        except (OSError, InventoryFormatError) as exc:
+            raise CommandError(str(exc))
+        results = apply_stock_changes(rows, dry_run=options['dry_run'], reference=options['reference'])
+        for result in results:
+            if result.status == 'error':
+                target = result.variant_sku or result.sku or '?'
+                self.stderr.write(f'Row {result.row} ({target}): {result.error}')
+        summary = summarize(results)
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{summary['updated']} updated, {summary['unchanged']} unchanged, {summary['error']} failed."
+        ))
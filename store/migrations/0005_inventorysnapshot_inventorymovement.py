@@ -0,0 +1,66 @@
+# Generated by Django 4.2.11 on 2026-10-19 07:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def baseline_snapshot(apps, schema_editor):
+    """Start the ledger from the stock levels at the time of migration."""
+    Product = apps.get_model('store', 'Product')
+    ProductVariant = apps.get_model('store', 'ProductVariant')
+    InventorySnapshot = apps.get_model('store', 'InventorySnapshot')
+    now = timezone.now()
+    rows = [
+        InventorySnapshot(product_id=pk, variant_id=None, quantity=quantity, taken_at=now)
+        for pk, quantity in Product.objects.values_list('pk', 'stock_quantity')
+    ] + [
+        InventorySnapshot(product_id=product_id, variant_id=pk, quantity=quantity, taken_at=now)
+        for pk, product_id, quantity in ProductVariant.objects.values_list('pk', 'product_id', 'stock_quantity')
+    ]
+    InventorySnapshot.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('store', '0004_newslettersubscriber'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField(default=0)),
+                ('taken_at', models.DateTimeField(db_index=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='store.product')),
+                ('variant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='store.productvariant')),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('restock', 'Restock'), ('adjustment', 'Adjustment'), ('reservation', 'Reservation'), ('return', 'Return')], max_length=20)),
+                ('quantity', models.IntegerField(help_text='Signed change in stock')),
+                ('reference', models.CharField(blank=True, help_text='Order number or stock take reference', max_length=100)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_movements', to='store.product')),
+                ('variant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_movements', to='store.productvariant')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', 'variant', 'id'], name='store_inven_product_6c8522_idx')],
+            },
+        ),
+        migrations.RunPython(baseline_snapshot, migrations.RunPython.noop),
+    ]
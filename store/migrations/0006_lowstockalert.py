@@ -0,0 +1,26 @@
+# Generated by Django 4.2.11 on 2026-10-19 07:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_inventorysnapshot_inventorymovement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='low_stock_alert', serialize=False, to='store.product')),
+                ('stock_quantity', models.IntegerField(help_text='Stock when the product was found low')),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'ordering': ['stock_quantity'],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.11 on 2026-10-19 07:19
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_sums(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Review = apps.get_model('reviews', 'Review')
+    rows = (
+        Review.objects.filter(is_approved=True)
+        .order_by()
+        .values('product_id')
+        .annotate(
+            review_count=Count('id'), rating_sum=Sum('rating'),
+            longevity_sum=Sum('longevity_rating'), longevity_count=Count('longevity_rating'),
+            sillage_sum=Sum('sillage_rating'), sillage_count=Count('sillage_rating'),
+            value_sum=Sum('value_rating'), value_count=Count('value_rating'),
+        )
+    )
+    for row in rows:
+        figures = {field: value or 0 for field, value in row.items() if field != 'product_id'}
+        figures['average_rating'] = (Decimal(figures['rating_sum']) / figures['review_count']).quantize(Decimal('0.01'))
+        Product.objects.filter(pk=row['product_id']).update(**figures)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+        ('store', '0006_lowstockalert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='longevity_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='longevity_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sillage_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sillage_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='value_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='value_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_sums, migrations.RunPython.noop),
+    ]
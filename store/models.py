@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.db import models
 from django.utils.text import slugify
 from django.urls import reverse
 from ckeditor.fields import RichTextField
+from aniscents.tracking import TrackedFieldsMixin
 import uuid
 
 class Category(models.Model):
@@ -83,8 +85,9 @@ class ScentNote(models.Model):
 			self.slug = slugify(self.name)
 		super().save(*args, **kwargs)
 
-class Product(models.Model):
+class Product(TrackedFieldsMixin, models.Model):
 	"""Main product model for perfumes."""
+	tracked_fields = ('stock_quantity', 'price')
 	CONCENTRATION_CHOICES = (
 		('parfum', 'Parfum (Extrait)'),
 		('edp', 'Eau de Parfum (EDP)'),
@@ -152,9 +155,16 @@ class Product(models.Model):
 	# Analytics
 	view_count = models.IntegerField(default=0)
 	purchase_count = models.IntegerField(default=0)
-	# Ratings (updated by reviews)
+	# Ratings of approved reviews, kept current by reviews.ratings
 	average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
 	review_count = models.IntegerField(default=0)
+	rating_sum = models.IntegerField(default=0)
+	longevity_sum = models.IntegerField(default=0)
+	longevity_count = models.IntegerField(default=0)
+	sillage_sum = models.IntegerField(default=0)
+	sillage_count = models.IntegerField(default=0)
+	value_sum = models.IntegerField(default=0)
+	value_count = models.IntegerField(default=0)
 	# Timestamps
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
@@ -204,16 +214,21 @@ class Product(models.Model):
 		self.purchase_count += 1
 		self.save(update_fields=['purchase_count'])
 	
+	@property
+	def longevity_average(self):
+		return round(self.longevity_sum / self.longevity_count, 1) if self.longevity_count else None
+	@property
+	def sillage_average(self):
+		return round(self.sillage_sum / self.sillage_count, 1) if self.sillage_count else None
+	@property
+	def value_average(self):
+		return round(self.value_sum / self.value_count, 1) if self.value_count else None
+	
 	def update_rating(self):
-		"""Update average rating from reviews."""
-		from django.db.models import Avg, Count
-		stats = self.reviews.filter(is_approved=True).aggregate(
-			avg_rating=Avg('rating'),
-			count=Count('id')
-		)
-		self.average_rating = stats['avg_rating'] or 0
-		self.review_count = stats['count'] or 0
-		self.save(update_fields=['average_rating', 'review_count'])
+		"""Recompute the rating figures from every approved review."""
+		from reviews.ratings import PRODUCT_FIELDS, reconcile
+		reconcile([self.pk])
+		self.refresh_from_db(fields=PRODUCT_FIELDS)
 
 class ProductScentNote(models.Model):
 	"""Intermediate model for product scent notes with intensity."""
@@ -246,8 +261,9 @@ class ProductImage(models.Model):
 			ProductImage.objects.filter(product=self.product, is_primary=True).update(is_primary=False)
 		super().save(*args, **kwargs)
 
-class ProductVariant(models.Model):
+class ProductVariant(TrackedFieldsMixin, models.Model):
 	"""Product variants (different sizes, concentrations)."""
+	tracked_fields = ('stock_quantity',)
 	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
 	size_ml = models.IntegerField()
 	concentration = models.CharField(max_length=20, choices=Product.CONCENTRATION_CHOICES)
@@ -270,6 +286,69 @@ class ProductVariant(models.Model):
 	def variant_name(self):
 		return f"{self.size_ml}ml {self.get_concentration_display()}"
 
+class InventoryMovement(models.Model):
+	"""
+	One change to the stock of a product or variant. Rows are only ever
+	inserted; ``stock_quantity`` is kept equal to the sum of the movements
+	(see ``store.inventory.record_movement``).
+	"""
+	KIND_CHOICES = (
+		('sale', 'Sale'),
+		('restock', 'Restock'),
+		('adjustment', 'Adjustment'),
+		('reservation', 'Reservation'),
+		('return', 'Return'),
+	)
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_movements')
+	variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, null=True, blank=True, related_name='inventory_movements')
+	kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+	quantity = models.IntegerField(help_text="Signed change in stock")
+	reference = models.CharField(max_length=100, blank=True, help_text="Order number or stock take reference")
+	note = models.CharField(max_length=255, blank=True)
+	created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+	class Meta:
+		app_label = 'store'
+		ordering = ['-id']
+		indexes = [
+			models.Index(fields=['product', 'variant', 'id']),
+		]
+	def __str__(self):
+		return f"{self.get_kind_display()} {self.quantity:+d} ({self.product_id})"
+
+class InventorySnapshot(models.Model):
+	"""
+	Stock of a product or variant at ``taken_at``, covering every movement up
+	to ``last_movement_id``. Point-in-time stock is the latest snapshot plus
+	the movements after it.
+	"""
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_snapshots')
+	variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, null=True, blank=True, related_name='inventory_snapshots')
+	quantity = models.IntegerField()
+	last_movement_id = models.BigIntegerField(default=0)
+	taken_at = models.DateTimeField(db_index=True)
+	class Meta:
+		app_label = 'store'
+		ordering = ['-taken_at']
+	def __str__(self):
+		return f"{self.product_id}/{self.variant_id or '-'} = {self.quantity} at {self.taken_at:%Y-%m-%d %H:%M}"
+
+class LowStockAlert(models.Model):
+	"""
+	A product found at or below its low-stock threshold. The row is kept
+	while the product stays low, so it is reported once, and removed when
+	the product is restocked so a later drop is reported again.
+	"""
+	product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='low_stock_alert')
+	stock_quantity = models.IntegerField(help_text="Stock when the product was found low")
+	detected_at = models.DateTimeField(auto_now_add=True)
+	notified_at = models.DateTimeField(null=True, blank=True, db_index=True)
+	class Meta:
+		app_label = 'store'
+		ordering = ['stock_quantity']
+	def __str__(self):
+		return f"{self.product_id} low at {self.stock_quantity}"
+
 class Collection(models.Model):
 	"""Product collections."""
 	name = models.CharField(max_length=100)
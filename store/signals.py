@@ -0,0 +1,48 @@
+"""Signal handlers for store events."""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .inventory import _send_crossings, stock_levels_changed
+from .models import InventoryMovement, Product, ProductVariant
+from .stock_alerts import check_low_stock
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+def stock_edited_handler(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Record stock set directly on the model (new products, scripts calling
+    ``save()``) in the inventory ledger and report threshold crossings like
+    any other stock change. ``store.inventory`` writes its own movements and
+    never goes through ``save()``; the product form and the Django admin
+    edit stock through ``edit_stock``.
+    """
+    if raw:
+        return
+    if created:
+        old, new = 0, instance.stock_quantity
+    else:
+        change = instance.tracked_changes(fields=update_fields).get('stock_quantity')
+        if change is None:
+            return
+        old, new = change
+    quantity = int(new or 0) - int(old or 0)
+    if quantity:
+        is_variant = isinstance(instance, ProductVariant)
+        InventoryMovement.objects.create(
+            product_id=instance.product_id if is_variant else instance.pk,
+            variant=instance if is_variant else None,
+            kind='adjustment',
+            quantity=quantity,
+            note='Initial stock' if created else 'Edited on the product form',
+        )
+        threshold = instance.product.low_stock_threshold if is_variant else instance.low_stock_threshold
+        _send_crossings([(instance, int(old or 0), int(new or 0), threshold)])
+
+
+@receiver(stock_levels_changed)
+def low_stock_monitor(sender, low_stock, out_of_stock, restocked, **kwargs):
+    """Remember newly low products and forget restocked ones; reporting is periodic."""
+    items = low_stock + out_of_stock + restocked
+    if items:
+        check_low_stock({getattr(item, 'product_id', item.pk) for item in items})
@@ -0,0 +1,91 @@
+"""
+Low-stock monitoring with one alert per product until it is restocked.
+
+``check_low_stock`` compares ``stock_quantity`` with ``low_stock_threshold``
+for the whole catalogue (or the products a stock batch touched) in one
+query, remembers newly low products as ``LowStockAlert`` rows and drops the
+rows of restocked ones. It runs after every batch that moves stock across a
+threshold. ``send_digest`` reports every product not yet reported in a
+single admin notification and e-mail; it is meant to run periodically (the
+``send_low_stock_digest`` command), never inside a request.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import LowStockAlert, Product
+
+
+def check_low_stock(product_ids=None):
+    """
+    Record available products at or below their threshold and forget
+    restocked ones, limited to ``product_ids`` when given. Returns
+    ``(low, cleared)`` counts.
+    """
+    products = Product.objects.all()
+    alerts = LowStockAlert.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        alerts = alerts.filter(product_id__in=product_ids)
+    low = products.filter(is_available=True, stock_quantity__lte=F('low_stock_threshold'))
+    with transaction.atomic():
+        cleared, _ = alerts.filter(
+            Q(product__stock_quantity__gt=F('product__low_stock_threshold')) | Q(product__is_available=False)
+        ).delete()
+        rows = [
+            LowStockAlert(product_id=pk, stock_quantity=quantity)
+            for pk, quantity in low.values_list('pk', 'stock_quantity')
+        ]
+        # Products already alerted keep their row, and so their notified_at.
+        LowStockAlert.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows), cleared
+
+
+def pending_alerts():
+    return LowStockAlert.objects.filter(notified_at__isnull=True)
+
+
+def _notify_admins(low_stock, out_of_stock):
+    """One ``AdminNotification`` listing the products of a digest."""
+    from dashboard.notifications import notify
+
+    names = [product.name for product in out_of_stock + low_stock]
+    shown = ', '.join(names[:5]) + (f' and {len(names) - 5} more' if len(names) > 5 else '')
+    return notify(
+        None,
+        notification_type='inventory',
+        priority='high' if out_of_stock else 'medium',
+        title=f"Stock update: {len(out_of_stock)} out of stock, {len(low_stock)} low",
+        message=f"Affected items: {shown}",
+        data={
+            'out_of_stock': [{'id': product.pk, 'sku': product.sku} for product in out_of_stock],
+            'low_stock': [{'id': product.pk, 'sku': product.sku} for product in low_stock],
+        },
+        action_url="/dashboard/admin/products/?stock=low",
+        action_label="Review Inventory"
+    )
+
+
+def send_digest():
+    """
+    Refresh the alerts, then report every product not reported yet in one
+    ``AdminNotification`` and one e-mail. Returns the number of products.
+    """
+    from accounts.utils import send_low_stock_digest_email
+
+    check_low_stock()
+    with transaction.atomic():
+        alerts = list(
+            pending_alerts().select_for_update(of=('self',))
+            .select_related('product')
+            .order_by('product__stock_quantity', 'product__name')
+        )
+        if not alerts:
+            return 0
+        products = [alert.product for alert in alerts]
+        out_of_stock = [product for product in products if product.stock_quantity <= 0]
+        low_stock = [product for product in products if product.stock_quantity > 0]
+        _notify_admins(low_stock, out_of_stock)
+        LowStockAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(notified_at=timezone.now())
+    send_low_stock_digest_email(out_of_stock, low_stock)
+    return len(alerts)
@@ -1,6 +1,7 @@
 
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, DetailView
+from orders.purchases import annotate_purchased
 from .models import Product, Category
 from .cms_models import ShopPageContent
 
@@ -10,7 +11,7 @@ def category_list(request):
 
 def category_detail(request, slug):
 	category = get_object_or_404(Category, slug=slug, is_active=True)
-	products = Product.objects.filter(category=category, is_available=True)
+	products = annotate_purchased(Product.objects.filter(category=category, is_available=True), request.user)
 	return render(request, 'store/category_detail.html', {'category': category, 'products': products})
 
 class ProductListView(ListView):
@@ -58,6 +59,8 @@ class ProductListView(ListView):
 
 	def get_context_data(self, **kwargs):
 		context = super().get_context_data(**kwargs)
+		# Flag the products on this page the customer has received, in one query.
+		context['products'] = annotate_purchased(context['products'], self.request.user)
 		context['categories'] = Category.objects.filter(is_active=True)
 		context['selected_category'] = self.kwargs.get('category_slug', '')
 		# Get filter parameters
@@ -101,20 +104,11 @@ class ProductDetailView(DetailView):
 		context['related_products'] = related_products
 		
 		# Reviews data
+		from reviews.fragments import rating_breakdown
 		from reviews.models import Review
 		reviews = product.reviews.filter(is_approved=True).select_related('user').order_by('-created_at')
-		
-		# Rating breakdown for display
-		rating_breakdown = {}
-		total = reviews.count()
-		for i in range(1, 6):
-			count = reviews.filter(rating=i).count()
-			rating_breakdown[i] = {
-				'count': count,
-				'percentage': round((count / total * 100) if total > 0 else 0)
-			}
 		context['reviews'] = reviews[:5]  # First 5 reviews
-		context['rating_breakdown'] = rating_breakdown
+		context['rating_breakdown'] = rating_breakdown(product)
 		
 		# Check if current user has already reviewed
 		if self.request.user.is_authenticated:
@@ -122,6 +116,8 @@ class ProductDetailView(DetailView):
 				product=product, 
 				user=self.request.user
 			).exists()
+			from orders.purchases import purchased_product_ids
+			context['user_has_purchased'] = product.pk in purchased_product_ids(self.request.user)
 		
 		return context
 
@@ -144,6 +140,7 @@ def search(request):
 	paginator = Paginator(products, 12)
 	page_number = request.GET.get('page')
 	page_obj = paginator.get_page(page_number)
+	page_obj.object_list = annotate_purchased(page_obj.object_list, request.user)
 	context = {
 		'products': page_obj,
 		'query': query,